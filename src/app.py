@@ -3,10 +3,10 @@ import os
 import json
 from pathlib import Path
 import tempfile
-from main import run_validation, run_batch_processing
-from validators.validator import validate_instruction, check_contradicting_instructions, analyze_instruction_statuses_by_turn
-import requests
+from validators.validator import validate_instruction, analyze_instruction_statuses_by_turn
+from pipeline import validate_cell
 from data_loader import conflict_dict
+from json_io import find_json, read_json
 
 st.set_page_config(
     page_title="Turing Amazon Task Parser VIF",
@@ -15,35 +15,16 @@ st.set_page_config(
 )
 
 def call_nova_api(user_content, system_content="You are a chatbot", temperature=0.7, seed=42, top_p=1, top_k=40, max_tokens=1000):
-    url = "https://kong.turing.com/api/llm-gateway"
-    headers = {
-        "x-api-key": os.getenv("TURING_API_KEY"),
-        "x-api-gw-key": os.getenv("TURING_API_GW_KEY"),
-        "Authorization": os.getenv("TURING_AUTH_TOKEN"),
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "modelName": "us.amazon.nova-premier-v1:0",
-        "provider": "Amazon",
-        "messages": [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": user_content}
-        ],
-        "params": {
-            "temperature": temperature,
-            "seed": seed,
-            "top_p": top_p,
-            "top_k": top_k,
-            "max_tokens": max_tokens
-        },
-        "images": []
-    }
-    response = requests.post(url, headers=headers, json=payload)
-    if response.status_code in (200, 201):
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
-    else:
-        return f"Error: {response.status_code} - {response.text}"
+    # Shared pooled client: keep-alive connections, rate limiting and retries with backoff on 429/5xx.
+    # Imported here so pages that never call Nova do not load http.client, ssl and asyncio.
+    from nova.client import default_client, NovaError, ReplayMiss
+    try:
+        return default_client().complete(user_content, system_content=system_content, temperature=temperature,
+                                         seed=seed, top_p=top_p, top_k=top_k, max_tokens=max_tokens)
+    except NovaError as e:
+        return f"Error: {e.status} - {e.text}"
+    except ReplayMiss as e:
+        return f"Error: {e}"
 
 def main():
     st.title("Turing Amazon Task Parser VIF")
@@ -85,6 +66,7 @@ def show_batch_processing():
                             f.write(uploaded_file.getbuffer())
 
                     # Process the notebooks
+                    from main import run_batch_processing
                     run_batch_processing(temp_dir, temp_dir)
 
                     # Display results
@@ -108,10 +90,9 @@ def show_batch_processing():
                                 st.text('\n'.join(log_content[:-2]))
 
                             # Display validation report
-                            validation_path = os.path.join(result_dir, "validation_report.json")
-                            if os.path.exists(validation_path):
-                                with open(validation_path, 'r', encoding='utf-8') as f:
-                                    validation_data = json.load(f)
+                            validation_path = find_json(os.path.join(result_dir, "validation_report.json"))
+                            if validation_path is not None:
+                                validation_data = read_json(validation_path)
                                 task_data = analyze_instruction_statuses_by_turn(validation_data)
 
                                 st.subheader("Classification Summary")
@@ -129,11 +110,10 @@ def show_batch_processing():
                                 st.subheader("Detailed report")
                                 st.json(validation_data)
                             # Display metadata change report
-                            metadata_report_path = os.path.join(result_dir, "metadata_change_report.json")
-                            if os.path.exists(metadata_report_path):
+                            metadata_report_path = find_json(os.path.join(result_dir, "metadata_change_report.json"))
+                            if metadata_report_path is not None:
                                 st.markdown("#### Metadata Change Report")
-                                with open(metadata_report_path, 'r', encoding='utf-8') as f:
-                                    metadata_report = json.load(f)
+                                metadata_report = read_json(metadata_report_path)
                                 st.json(metadata_report)
 
 def show_single_cell_validation():
@@ -181,56 +161,14 @@ def show_single_cell_validation():
             try:
                 # Parse instructions JSON
                 instructions = json.loads(instructions_json)
-                
-                # Validate schema
-                if not isinstance(instructions, dict):
-                    st.error("Instructions must be a JSON object")
-                    return
-                    
-                if "metadata" not in instructions or "instructions" not in instructions:
-                    st.error("Instructions must contain 'metadata' and 'instructions' fields")
-                    return
-                    
-                if not isinstance(instructions["metadata"], list):
-                    st.error("'metadata' must be a list")
-                    return
-                    
-                if not isinstance(instructions["instructions"], list):
-                    st.error("'instructions' must be a list")
-                    return
-                    
-                for instruction in instructions["instructions"]:
-                    if not isinstance(instruction, dict):
-                        st.error("Each instruction must be an object")
-                        return
-                    if "instruction_id" not in instruction:
-                        st.error("Each instruction must have an 'instruction_id' field")
-                        return
-                    
-                contradiction_errors = check_contradicting_instructions(instructions["instructions"])
-                if contradiction_errors:
-                    st.error("Contradicting instructions found: " + str(contradiction_errors))
+                report = validate_cell(assistant_response, instructions)
+                if "error" in report:
+                    st.error(report["error"])
                     return
 
-                # Validate each instruction
-                results = []
-                for instruction in instructions["instructions"]:
-                    inst_id = instruction["instruction_id"]
-                    # Remove instruction_id from kwargs
-                    kwargs = {k: v for k, v in instruction.items() if k != "instruction_id"}
-                    valid, message = validate_instruction(assistant_response, inst_id, kwargs, instructions)
-                    results.append({
-                        "instruction": inst_id,
-                        "status": "Passed" if valid else "Failed",
-                        "message": message
-                    })
-
                 # Display results
                 st.success("Validation complete!")
-                st.json({
-                    "response": assistant_response[:100] + "..." if len(assistant_response) > 100 else assistant_response,
-                    "results": results
-                })
+                st.json(report)
 
             except json.JSONDecodeError as e:
                 st.error(f"Invalid JSON format: {str(e)}")
@@ -342,17 +280,19 @@ def show_nova_batch():
     if uploaded_file:
         with st.spinner("Processing notebook and calling Nova model for each turn..."):
             from notebook_processing.processor import process_notebook
+            from nova.client import default_client, NovaError
             notebook_data = process_notebook(uploaded_file)
             results = []
-            for turn in notebook_data["turns"]:
-                prompt = turn.get("prompt", "")
-                instructions = turn.get("instructions", {})
-                if not prompt or not instructions:
-                    continue
-                try:
-                    nova_response = call_nova_api(prompt)
-                except Exception as e:
-                    nova_response = f"Nova error: {e}"
+            turns = [turn for turn in notebook_data["turns"] if turn.get("prompt", "") and turn.get("instructions", {})]
+            # All turns are sent concurrently over the shared client's connection pool
+            responses = default_client().complete_many([turn["prompt"] for turn in turns])
+            for turn, nova_response in zip(turns, responses):
+                prompt = turn["prompt"]
+                instructions = turn["instructions"]
+                if isinstance(nova_response, NovaError):
+                    nova_response = f"Error: {nova_response.status} - {nova_response.text}"
+                elif isinstance(nova_response, Exception):
+                    nova_response = f"Nova error: {nova_response}"
                 turn_result = {"prompt": prompt, "instructions": instructions, "nova_response": nova_response, "validation": []}
                 # Validate
                 try:
@@ -0,0 +1,3 @@
+"""
+Batch processing module for running the notebook pipeline over many notebooks.
+"""
\ No newline at end of file
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, List
+from batch_processing.result_cache import rules_fingerprint
+
+JOURNAL_FILE = "batch_journal.jsonl"
+# Completed notebooks recorded between two fsyncs of the journal, and the longest gap between them
+DEFAULT_SYNC_EVERY = 64
+DEFAULT_SYNC_INTERVAL = 2.0
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+class CheckpointJournal:
+    """
+    Append-only record of the notebooks a batch has finished, one JSON line per notebook:
+    {"name", "hash", "rules", "strict", "outputs", "time"}, where outputs are the written files
+    relative to the journal's directory. A line is only appended once all of a notebook's files
+    have been written, so a notebook without a line was interrupted and has to be redone.
+    Every line reaches the OS as soon as it is recorded, but is only fsynced in batches of
+    sync_every (or every sync_interval seconds): a killed process loses nothing, and a machine
+    crash at most the unsynced lines, whose notebooks are then simply redone. Safe to share
+    between threads.
+    """
+
+    def __init__(self, output_dir: str, sync_every: int = DEFAULT_SYNC_EVERY,
+                 sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, JOURNAL_FILE)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.lines = 0
+        self.entries = self._load()
+        self.rules = rules_fingerprint()
+        self._file = None
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        """Latest entry per notebook; a line torn by a crash is ignored."""
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.lines += 1
+                    try:
+                        entry = json.loads(line)
+                        entries[entry["name"]] = entry
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+        return entries
+
+    def compact(self) -> None:
+        """Atomically rewrite the journal with only the latest line of every notebook."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.lines = len(self.entries)
+
+    def is_complete(self, name: str, digest: str, strict: bool = False) -> bool:
+        """Whether name was finished with this content, these rules and strictness, and its files still exist."""
+        entry = self.entries.get(name)
+        if entry is None or entry["hash"] != digest or entry["rules"] != self.rules or entry["strict"] != strict:
+            return False
+        return all(os.path.exists(os.path.join(self.output_dir, path)) for path in entry["outputs"])
+
+    def record(self, name: str, digest: str, outputs: List[str], strict: bool = False) -> None:
+        """Append the completion of a notebook whose files (absolute or relative paths) are all written."""
+        entry = {"name": name, "hash": digest, "rules": self.rules, "strict": strict,
+                 "outputs": [os.path.relpath(path, self.output_dir) for path in outputs],
+                 "time": round(time.time(), 3)}
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                if self.lines > 2 * len(self.entries):
+                    # Mostly lines superseded by later runs
+                    self.compact()
+                os.makedirs(self.output_dir, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+                if self._file.tell() and not self._ends_with_newline():
+                    # The previous run died mid-line: start on a fresh one
+                    self._file.write("\n")
+            # Written through at once so a killed process loses nothing; only the fsync is batched
+            self._file.write(line)
+            self._file.flush()
+            self.entries[name] = entry
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+                self._sync()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
@@ -0,0 +1,141 @@
+"""
+Flat, columnar export of batch results for analytics.
+
+One row per (response, instruction) validation result, plus one row per metadata change:
+
+    dialogue_id, turn_index, response_type, instruction_id, status, message, classification
+
+Metadata change rows have response_type "turn_metadata" and the change ("add", "modify",
+"remove") as their status. classification is the dialogue's task classification from
+analyze_instruction_statuses_by_turn. The table is written as Parquet or an Arrow IPC file
+with every string column dictionary-encoded; without pyarrow it falls back to CSV.
+
+Run from the src directory:
+
+    python -m batch_processing.columnar_export <output_dir> <table.parquet|table.arrow|table.csv>
+"""
+import os
+import csv
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+from validators.validator import analyze_instruction_statuses_by_turn
+from batch_processing.jsonl_sink import JSONL_STREAMS, iter_jsonl_records
+from json_io import find_json, read_json
+
+COLUMNS = ["dialogue_id", "turn_index", "response_type", "instruction_id", "status", "message", "classification"]
+METADATA_RESPONSE_TYPE = "turn_metadata"
+# Output format by file extension; anything else is written as Parquet
+FORMATS_BY_EXTENSION = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow", ".csv": "csv"}
+
+
+def iter_result_rows(dialogue_id: str, validation_report: List[Dict],
+                     metadata_report: Optional[List[Dict]] = None) -> Iterator[Tuple]:
+    """Flatten one dialogue's validation report and metadata change report into table rows."""
+    classification = analyze_instruction_statuses_by_turn(validation_report)["classification"]
+    for entry in validation_report:
+        for result in entry.get("results", []):
+            yield (dialogue_id, entry.get("turn_index"), entry.get("response_type"), result.get("instruction"),
+                   result.get("status"), result.get("message"), classification)
+    for turn in metadata_report or []:
+        for change in turn.get("changes", []):
+            yield (dialogue_id, turn.get("turn_index"), METADATA_RESPONSE_TYPE, change.get("instruction_id"),
+                   change.get("change"), "", classification)
+
+
+def _stream_path(output_dir: str, field: str) -> Optional[str]:
+    path = os.path.join(output_dir, JSONL_STREAMS[field])
+    for candidate in (path, path + ".gz"):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def iter_output_tree(output_dir: str) -> Iterator[Tuple[str, List[Dict], List[Dict]]]:
+    """
+    Yield (dialogue_id, validation_report, metadata_report) for every notebook of a batch run,
+    read from the JSONL streams if output_dir has them, otherwise from the per-notebook directories
+    at any depth below output_dir.
+    """
+    validation_stream = _stream_path(output_dir, "validation_report")
+    if validation_stream is not None:
+        metadata_stream = _stream_path(output_dir, "metadata_report")
+        metadata = {}
+        if metadata_stream is not None:
+            metadata = {r["dialogue_id"]: r["data"] for r in iter_jsonl_records(metadata_stream)}
+        for record in iter_jsonl_records(validation_stream):
+            yield record["dialogue_id"], record["data"], metadata.get(record["dialogue_id"], [])
+        return
+
+    # Imported here: pipeline pulls in the whole conversion and validation stack
+    from pipeline import VALIDATION_REPORT_FILE, METADATA_REPORT_FILE
+    for directory, subdirectories, _ in os.walk(output_dir):
+        # Sorted in place so the walk itself visits the notebooks in name order
+        subdirectories.sort()
+        validation_path = find_json(os.path.join(directory, VALIDATION_REPORT_FILE))
+        if directory == output_dir or validation_path is None:
+            continue
+        validation_report = read_json(validation_path)
+        metadata_path = find_json(os.path.join(directory, METADATA_REPORT_FILE))
+        metadata_report = read_json(metadata_path) if metadata_path is not None else []
+        yield os.path.basename(directory), validation_report, metadata_report
+
+
+def _write_arrow_table(rows: Iterator[Tuple], path: str, fmt: str) -> None:
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) or [()] * len(COLUMNS)
+    string_type = pa.dictionary(pa.int32(), pa.string())
+    arrays = [pa.array(values, type=pa.int32() if name == "turn_index" else string_type)
+              for name, values in zip(COLUMNS, columns)]
+    table = pa.Table.from_arrays(arrays, names=COLUMNS)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, path, use_dictionary=True)
+    else:
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _write_csv(rows: Iterator[Tuple], path: str) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+
+
+def export_results(records: Iterator[Tuple[str, List[Dict], List[Dict]]], path: str,
+                   fmt: Optional[str] = None) -> str:
+    """
+    Write (dialogue_id, validation_report, metadata_report) records as one flat table.
+    fmt is "parquet", "arrow" or "csv" (default: from the file extension). Parquet and Arrow
+    need pyarrow; without it the table is written as CSV next to path instead.
+    return: str - the path actually written
+    """
+    fmt = fmt or FORMATS_BY_EXTENSION.get(os.path.splitext(path)[1].lower(), "parquet")
+    rows = (row for record in records for row in iter_result_rows(*record))
+    if fmt != "csv":
+        try:
+            _write_arrow_table(rows, path, fmt)
+            return path
+        except ImportError:
+            path = os.path.splitext(path)[0] + ".csv"
+            print(f"⚠️ pyarrow is not installed, writing CSV instead: {path}")
+    _write_csv(rows, path)
+    return path
+
+
+def export_output_tree(output_dir: str, path: str, fmt: Optional[str] = None) -> str:
+    """Export every notebook result found in a batch output directory (see iter_output_tree)."""
+    written = export_results(iter_output_tree(output_dir), path, fmt)
+    print(f"✅ Results table saved to: {written}")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the results of a batch run as one flat table.")
+    parser.add_argument("output_dir", help="Batch output directory (per-notebook directories or JSONL streams)")
+    parser.add_argument("table_path", help="Table to write (.parquet, .arrow or .csv)")
+    parser.add_argument("--format", choices=["parquet", "arrow", "csv"], default=None,
+                        help="Table format (default: from the file extension)")
+    args = parser.parse_args()
+    export_output_tree(args.output_dir, args.table_path, args.format)
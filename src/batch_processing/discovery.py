@@ -0,0 +1,124 @@
+"""
+Notebook discovery for batch runs.
+
+The input directory is walked recursively with os.scandir, and notebooks are also read straight
+out of .zip and .tar (.tar.gz, .tgz, .tar.bz2, .tar.xz) archives without extracting them.
+Notebooks are yielded as they are found, never collected into a list first.
+
+Every notebook is a plain dict:
+
+    name    path relative to the input directory, with "/" separators; for an archive member
+            the archive's path without its extension, then the member's path
+            (delivery-17-jun.zip containing day1/a.ipynb -> "delivery-17-jun/day1/a.ipynb")
+    path    the .ipynb file, or the archive holding it
+    member  the member name inside the archive, or None
+    size    content size in bytes
+    raw     the content, only for tar members (a compressed tar cannot be read out of order)
+
+Hidden files and directories (.ipynb_checkpoints, .git, ...) and macOS __MACOSX folders are
+skipped. include/exclude are fnmatch globs matched against the name, where * also matches
+"/"; a directory whose relative path matches an exclude glob is not entered.
+"""
+import os
+import fnmatch
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Sequence
+
+NOTEBOOK_SUFFIX = ".ipynb"
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def archive_stem(file_name: str) -> Optional[str]:
+    """The name of an archive without its extension, or None if file_name is not an archive."""
+    lower = file_name.lower()
+    for suffix in ZIP_SUFFIXES + TAR_SUFFIXES:
+        if lower.endswith(suffix):
+            return file_name[:-len(suffix)]
+    return None
+
+
+def _hidden(name: str) -> bool:
+    """Hidden or macOS metadata path. Also covers ".." parts, whose output would land outside the output directory."""
+    return any(part.startswith(".") or part == "__MACOSX" for part in name.split("/") if part)
+
+
+def _selected(name: str, include: Optional[Sequence[str]], exclude: Optional[Sequence[str]]) -> bool:
+    if not name.endswith(NOTEBOOK_SUFFIX) or _hidden(name):
+        return False
+    if include and not any(fnmatch.fnmatchcase(name, pattern) for pattern in include):
+        return False
+    return not (exclude and any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude))
+
+
+def _zip_members(path: str, prefix: str, include, exclude) -> Iterator[Dict]:
+    import zipfile
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            name = prefix + info.filename.lstrip("/")
+            if not info.is_dir() and _selected(name, include, exclude):
+                yield {"name": name, "path": path, "member": info.filename, "size": info.file_size}
+
+
+def _tar_members(path: str, prefix: str, include, exclude) -> Iterator[Dict]:
+    import tarfile
+    # Stream mode: members are read in archive order and decompressed only once
+    with tarfile.open(path, mode="r|*") as archive:
+        for info in archive:
+            name = prefix + info.name.lstrip("/")
+            if info.isfile() and _selected(name, include, exclude):
+                raw = archive.extractfile(info).read()
+                yield {"name": name, "path": path, "member": info.name, "size": len(raw), "raw": raw}
+
+
+def iter_notebooks(root: str, include: Optional[Sequence[str]] = None,
+                   exclude: Optional[Sequence[str]] = None, archives: bool = True) -> Iterator[Dict]:
+    """Yield every notebook under root (see the module docstring) in the order the directories list them."""
+    def walk(directory: str, relative: str) -> Iterator[Dict]:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = relative + entry.name
+                if entry.name.startswith(".") or entry.name == "__MACOSX":
+                    continue
+                if entry.is_dir():
+                    if not (exclude and any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude)):
+                        yield from walk(entry.path, name + "/")
+                elif not entry.is_file():
+                    continue
+                elif entry.name.endswith(NOTEBOOK_SUFFIX):
+                    if _selected(name, include, exclude):
+                        yield {"name": name, "path": entry.path, "member": None, "size": entry.stat().st_size}
+                elif archives and archive_stem(entry.name) is not None:
+                    prefix = relative + archive_stem(entry.name) + "/"
+                    if entry.name.lower().endswith(ZIP_SUFFIXES):
+                        yield from _zip_members(entry.path, prefix, include, exclude)
+                    else:
+                        yield from _tar_members(entry.path, prefix, include, exclude)
+
+    yield from walk(root, "")
+
+
+@lru_cache(maxsize=8)
+def _open_zip(path: str, mtime: float):
+    import zipfile
+    # Kept open for the following members; ZipFile reads are safe across threads
+    return zipfile.ZipFile(path)
+
+
+def read_notebook(notebook: Dict) -> bytes:
+    """The raw content of a discovered notebook."""
+    if notebook.get("raw") is not None:
+        return notebook["raw"]
+    if notebook["member"] is None:
+        with open(notebook["path"], "rb") as f:
+            return f.read()
+    return _open_zip(notebook["path"], os.path.getmtime(notebook["path"])).read(notebook["member"])
+
+
+def notebook_output_name(notebook: Dict) -> str:
+    """Relative output directory of a notebook: its name without the .ipynb extension."""
+    return notebook["name"][:-len(NOTEBOOK_SUFFIX)]
+
+
+def notebook_dialogue_id(notebook: Dict) -> str:
+    return os.path.basename(notebook_output_name(notebook))
@@ -0,0 +1,100 @@
+import io
+import os
+import gzip
+import time
+from typing import Any, Dict, Iterator
+from json_io import dumps, loads
+
+# One append-only stream per report type, keyed by the pipeline result field it stores
+JSONL_STREAMS = {
+    "converted": "converted_output.jsonl",
+    "schema_log": "notebook_validation.jsonl",
+    "metadata_report": "metadata_change_report.jsonl",
+    "validation_report": "validation_report.jsonl",
+}
+# Streams only opened once a result carries the field (e.g. timings with --profile)
+OPTIONAL_JSONL_STREAMS = {
+    "timings": "timings.jsonl",
+}
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class JsonlSink:
+    """
+    Streams pipeline results into a few append-only JSONL files instead of one directory per notebook.
+    Every notebook adds one compact {"dialogue_id": ..., "data": ...} line to each stream.
+    Lines are buffered and flushed every `flush_every` records or `flush_interval` seconds.
+    """
+
+    def __init__(self, output_dir: str, compress: bool = False, flush_every: int = 100,
+                 flush_interval: float = 5.0):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.compress = compress
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.paths = {}
+        self._streams = {}
+        # The GzipFile under each compressed stream, flushed explicitly so buffered records reach disk
+        self._gzip_files = {}
+        for field, file_name in JSONL_STREAMS.items():
+            self._open(field, file_name)
+
+    def _open(self, field: str, file_name: str) -> None:
+        path = os.path.join(self.output_dir, file_name + (".gz" if self.compress else ""))
+        if self.compress:
+            # Appending to a gzip file adds a new member; gzip readers see one continuous stream
+            raw = gzip.GzipFile(path, mode="ab")
+            stream = io.BufferedWriter(raw, WRITE_BUFFER_SIZE)
+            self._gzip_files[field] = raw
+        else:
+            stream = open(path, "ab", buffering=WRITE_BUFFER_SIZE)
+        self.paths[field] = path
+        self._streams[field] = stream
+
+    def write(self, result: Dict) -> None:
+        """Append one notebook's pipeline result to every stream."""
+        dialogue_id = result["dialogue_id"]
+        for field, file_name in OPTIONAL_JSONL_STREAMS.items():
+            if field in result and field not in self._streams:
+                self._open(field, file_name)
+        for field, stream in self._streams.items():
+            if field not in result:
+                continue
+            record = {"dialogue_id": dialogue_id, "data": result[field]}
+            stream.write(dumps(record, pretty=False) + b"\n")
+        self.records += 1
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        for field, stream in self._streams.items():
+            stream.flush()
+            if field in self._gzip_files:
+                # Only pushes the bytes into the compressor; Z_SYNC_FLUSH writes them to the file
+                self._gzip_files[field].flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        for stream in self._streams.values():
+            stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a JSONL output file, transparently reading .gz files."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
@@ -0,0 +1,123 @@
+import os
+import hashlib
+from functools import lru_cache
+from typing import Dict, Optional
+from json_io import dumps, loads
+
+# Bump when the layout of a cached entry changes
+CACHE_FORMAT_VERSION = "1"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "task_parser")
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Sources whose content decides the pipeline output; packages are hashed file by file
+FINGERPRINT_SOURCES = [
+    "data_loader.py",
+    "pipeline.py",
+    "instruction.json",
+    "conflicting_instructions.json",
+    "notebook_processing",
+    "validators",
+]
+
+
+@lru_cache(maxsize=1)
+def rules_fingerprint() -> str:
+    """Hash the conversion and validation sources so a rule change invalidates every entry."""
+    digest = hashlib.sha256(CACHE_FORMAT_VERSION.encode())
+    for source in FINGERPRINT_SOURCES:
+        path = os.path.join(SRC_DIR, source)
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".py"))
+        else:
+            files = [path] if os.path.exists(path) else []
+        for file_path in files:
+            digest.update(os.path.relpath(file_path, SRC_DIR).encode())
+            with open(file_path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of per-notebook pipeline results.
+    Entries are keyed by the notebook bytes, its dialogue_id and the rules fingerprint,
+    and are evicted least recently used first once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 rebuild: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # When rebuilding, existing entries are ignored and overwritten
+        self.rebuild = rebuild
+
+    def key(self, raw: bytes, dialogue_id: str, strict: bool = False) -> str:
+        """
+        Cache key of a notebook's result. Strict runs use their own keys, since a strict entry
+        is only stored once the notebook has passed nbformat validation.
+        """
+        digest = hashlib.sha256(rules_fingerprint().encode())
+        digest.update(b"strict\0" if strict else b"lenient\0")
+        digest.update(dialogue_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(raw)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached result for key, or None on a miss."""
+        if self.rebuild:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = loads(f.read())
+            # Refresh the access time used for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return result
+
+    def put(self, key: str, result: Dict) -> None:
+        """Store a result atomically so concurrent workers never see a partial entry."""
+        import tempfile
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(dumps(result, pretty=False))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def prune(self) -> int:
+        """Evict the least recently used entries until the cache fits in max_bytes; return how many were removed."""
+        entries, total = [], 0
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,332 @@
+"""
+Staged batch runner: discover -> read -> parse (with conversion and schema check) -> validate -> write.
+
+Every stage has its own workers and takes its items from a bounded queue filled by the stage
+before it. A full queue blocks its producer, so however many notebooks the input folder holds,
+at most queue_size items wait in front of each stage, plus one per busy worker. The read and
+write stages run on threads: on a network volume the next notebooks are read and finished
+reports written while other notebooks are being validated.
+
+With jobs > 1 the CPU-bound stages (parse, validate) hand their items to a shared pool of `jobs`
+worker processes; a stage's worker count then caps how many of its items are in that pool at once.
+With jobs = 1 they run on their own threads in this process. The parsed notebook never leaves the
+worker that parsed it: the parse stage also runs the schema check on it, so only the conversion
+and the schema log are sent back.
+
+Queue depths are sampled while the batch runs. A stage whose input queue stays full is the
+bottleneck; one whose queue stays empty is waiting on the stages before it.
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from pipeline import (parse_notebook, convert_parsed_notebook, schema_check_notebook, validate_converted_notebook,
+                      assemble_result, load_previous_turns, lookup_cached_result, report_reused_turns,
+                      write_notebook_outputs)
+from batch_processing.checkpoint_journal import content_hash
+from batch_processing.discovery import read_notebook, notebook_output_name, notebook_dialogue_id
+from timing import PipelineTimer, stage
+
+STAGE_NAMES = ("read", "parse", "validate", "write")
+# Stages that only wait on the disk; the CPU-bound ones default to one worker per job
+IO_STAGES = ("read", "write")
+DEFAULT_IO_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 16
+QUEUE_SAMPLE_INTERVAL = 0.05
+
+# End-of-input marker, one per worker of the receiving stage
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a staged pipeline: fn(item) -> item, run by `workers` threads.
+    A cpu stage runs fn in the pipeline's process pool when it has one (fn and the items must
+    then be picklable). Items for which when(item) is false are passed on untouched.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Dict], Dict], workers: int = 1, cpu: bool = False,
+                 when: Optional[Callable[[Dict], bool]] = None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.cpu = cpu
+        self.when = when
+        self.queue: Optional[queue.Queue] = None
+        self.active = 0
+        self.stats = {"items": 0, "errors": 0, "busy": 0.0, "depth_max": 0, "depth_total": 0, "samples": 0}
+
+
+class StagePipeline:
+    """Threads, queues and the optional process pool of one run_stages call."""
+
+    def __init__(self, stages: List[Stage], queue_size: int, jobs: int, report_interval: Optional[float]):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.jobs = jobs
+        self.report_interval = report_interval
+        self.failures: List[Dict[str, str]] = []
+        self.discovered = 0
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and any(s.cpu for s in stages) else None
+        for s in stages:
+            s.queue = queue.Queue(maxsize=queue_size)
+            s.active = s.workers
+
+    def _fail(self, item: Any, stage_name: str, error: str) -> None:
+        name = item.get("name", "?") if isinstance(item, dict) else "?"
+        with self.lock:
+            self.failures.append({"name": name, "stage": stage_name, "error": error})
+
+    def _discover(self, source: Iterable[Dict]) -> None:
+        first = self.stages[0]
+        try:
+            for item in source:
+                first.queue.put(item)
+                self.discovered += 1
+        except Exception as e:
+            self._fail({}, "discover", f"{type(e).__name__}: {e}")
+        finally:
+            for _ in range(first.workers):
+                first.queue.put(_DONE)
+
+    def _apply(self, s: Stage, item: Dict) -> Dict:
+        if not s.cpu or self.executor is None:
+            return s.fn(item)
+        executor = self.executor
+        try:
+            return executor.submit(s.fn, item).result()
+        except BrokenProcessPool:
+            # A worker process died (e.g. out of memory): replace the pool for the items still to come
+            with self.lock:
+                if self.executor is executor:
+                    executor.shutdown(wait=False)
+                    self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+            raise
+
+    def _work(self, s: Stage, outbox: Optional[Stage]) -> None:
+        while True:
+            item = s.queue.get()
+            if item is _DONE:
+                break
+            started = time.perf_counter()
+            try:
+                if s.when is None or s.when(item):
+                    item = self._apply(s, item)
+            except Exception as e:
+                self._fail(item, s.name, f"{type(e).__name__}: {e}")
+                item = None
+            with self.lock:
+                s.stats["busy"] += time.perf_counter() - started
+                s.stats["items" if item is not None else "errors"] += 1
+            if item is not None and outbox is not None:
+                outbox.queue.put(item)
+        with self.lock:
+            s.active -= 1
+            last = s.active == 0
+        # The last worker of a stage to finish tells every worker of the next one
+        if last and outbox is not None:
+            for _ in range(outbox.workers):
+                outbox.queue.put(_DONE)
+
+    def _monitor(self) -> None:
+        last_report = time.monotonic()
+        while not self.finished.wait(QUEUE_SAMPLE_INTERVAL):
+            with self.lock:
+                for s in self.stages:
+                    depth = s.queue.qsize()
+                    s.stats["depth_max"] = max(s.stats["depth_max"], depth)
+                    s.stats["depth_total"] += depth
+                    s.stats["samples"] += 1
+            if self.report_interval is not None and time.monotonic() - last_report >= self.report_interval:
+                last_report = time.monotonic()
+                print("⏱️ Queue depth: " + ", ".join(f"{s.name} {s.queue.qsize()}/{self.queue_size}"
+                                                     for s in self.stages))
+
+    def run(self, source: Iterable[Dict]) -> Dict:
+        threads = [threading.Thread(target=self._discover, args=(source,), daemon=True)]
+        for i, s in enumerate(self.stages):
+            outbox = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            threads.extend(threading.Thread(target=self._work, args=(s, outbox), daemon=True) for _ in range(s.workers))
+        monitor = threading.Thread(target=self._monitor, daemon=True)
+        started = time.perf_counter()
+        try:
+            for thread in threads + [monitor]:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.finished.set()
+            monitor.join()
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict:
+        stages = {}
+        for s in self.stages:
+            samples = s.stats["samples"]
+            stages[s.name] = {
+                "workers": s.workers,
+                "process_pool": s.cpu and self.executor is not None,
+                "items": s.stats["items"],
+                "errors": s.stats["errors"],
+                "busy_seconds": round(s.stats["busy"], 3),
+                "queue_max": s.stats["depth_max"],
+                "queue_mean": round(s.stats["depth_total"] / samples, 2) if samples else 0.0,
+            }
+        return {"discovered": self.discovered, "elapsed": round(elapsed, 3), "queue_size": self.queue_size,
+                "stages": stages, "failures": self.failures}
+
+
+def run_stages(source: Iterable[Dict], stages: List[Stage], queue_size: int = DEFAULT_QUEUE_SIZE, jobs: int = 1,
+               report_interval: Optional[float] = None) -> Dict:
+    """
+    Feed the items of source (consumed lazily, on a thread of its own) through the stages.
+    An item whose stage raises is dropped and recorded as a failure. With report_interval,
+    the queue depths are printed every report_interval seconds.
+    return: Dict - {discovered, elapsed, queue_size, stages: {name: {workers, process_pool, items,
+            errors, busy_seconds, queue_max, queue_mean}}, failures: [{name, stage, error}]}
+    """
+    return StagePipeline(stages, queue_size, jobs, report_interval).run(source)
+
+
+def format_stage_report(report: Dict) -> str:
+    lines = [f"📊 Stages over {report['discovered']} notebooks in {report['elapsed']:.2f}s "
+             f"(queues hold {report['queue_size']}):"]
+    for name, s in report["stages"].items():
+        where = "processes" if s["process_pool"] else "threads"
+        lines.append(f"  {name:<9} {s['workers']:>3} {where:<9} {s['items']:>6} done {s['errors']:>4} failed "
+                     f"{s['busy_seconds']:>9.2f}s busy   queue max {s['queue_max']:>3} mean {s['queue_mean']:>6.2f}")
+    return "\n".join(lines)
+
+
+def parse_stage_workers(spec: Optional[str]) -> Dict[str, int]:
+    """Parse "read=8,validate=4" into {"read": 8, "validate": 4}."""
+    workers = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, _, count = part.partition("=")
+        name = name.strip()
+        if name not in STAGE_NAMES:
+            raise ValueError(f"Unknown stage {name!r}, expected one of {', '.join(STAGE_NAMES)}")
+        if not count.strip().isdigit() or int(count) < 1:
+            raise ValueError(f"Worker count of stage {name!r} must be a positive integer")
+        workers[name] = int(count)
+    return workers
+
+
+def _needs_processing(item: Dict) -> bool:
+    return "result" not in item and not item.get("skipped")
+
+
+def _parse_stage(item: Dict) -> Dict:
+    # Parse, convert and schema-check in one task, so the parsed notebook is not pickled between processes
+    timer = item["timer"]
+    with stage(timer, "parse"):
+        nb = parse_notebook(item.pop("raw"), item["strict"])
+    item["conversion"] = convert_parsed_notebook(nb, item["dialogue_id"], timer, item.pop("previous_turns"))
+    item["schema_log"] = schema_check_notebook(nb, timer)
+    return item
+
+
+def _validate_stage(item: Dict) -> Dict:
+    conversion = item.pop("conversion")
+    validation_report = validate_converted_notebook(conversion, item["dialogue_id"], item["timer"])
+    item["result"] = assemble_result(item["dialogue_id"], conversion, item.pop("schema_log"), validation_report)
+    report_reused_turns(item["result"], item["name"])
+    return item
+
+
+def run_staged_batch(notebooks: Iterable[Dict], output_base_dir: Optional[str], jobs: int = 1,
+                     stage_workers: Optional[Dict[str, int]] = None, queue_size: int = DEFAULT_QUEUE_SIZE,
+                     cache=None, strict: bool = False, profile: bool = False, incremental: bool = False,
+                     on_result: Optional[Callable[[str, Dict], None]] = None, journal=None, resume: bool = False,
+                     report_interval: Optional[float] = None, pretty: bool = True,
+                     compression: Optional[str] = None) -> Dict:
+    """
+    Process notebooks (as yielded by batch_processing.discovery.iter_notebooks, consumed as they
+    come) through the staged pipeline. Reports are written to output_base_dir/<notebook name>/
+    as by run_notebook_pipeline; with output_base_dir=None nothing
+    is written and on_result(file name, result) gets each result instead. on_result is called
+    from one thread at a time. cache (a ResultCache), strict, profile and incremental behave as
+    in run_notebook_pipeline; a cached notebook skips the parse and validate stages.
+    Written notebooks are recorded in journal (a CheckpointJournal), if given; with resume=True
+    the notebooks it records as finished are read and hashed but skip every later stage.
+    stage_workers overrides the worker count of any of STAGE_NAMES. pretty and compression set the
+    format of the written JSON files (see pipeline.write_notebook_outputs).
+    return: Dict - the run_stages report, with the number of "skipped" notebooks
+    """
+    workers = {name: DEFAULT_IO_WORKERS if name in IO_STAGES else max(1, jobs) for name in STAGE_NAMES}
+    workers.update(stage_workers or {})
+    result_lock = threading.Lock()
+    skipped = []
+
+    def discover() -> Iterator[Dict]:
+        for notebook in notebooks:
+            output_name = notebook_output_name(notebook)
+            output_dir = os.path.join(output_base_dir, output_name) if output_base_dir is not None else None
+            yield {"name": notebook["name"], "notebook": notebook, "output_dir": output_dir,
+                   "dialogue_id": notebook_dialogue_id(notebook), "strict": strict,
+                   "timer": PipelineTimer() if profile else None}
+
+    def read(item: Dict) -> Dict:
+        timer = item["timer"]
+        with stage(timer, "read"):
+            item["raw"] = read_notebook(item.pop("notebook"))
+        if journal is not None:
+            item["hash"] = content_hash(item["raw"])
+            if resume and journal.is_complete(item["name"], item["hash"], strict):
+                del item["raw"]
+                item["skipped"] = True
+                skipped.append(item["name"])
+                return item
+        print(f"\n📘 Processing notebook: {item['name']}")
+        item["key"], result = lookup_cached_result(cache, item["raw"], item["name"], item["dialogue_id"],
+                                                   strict, incremental, timer)
+        if result is not None:
+            del item["raw"]
+            item["result"], item["cached"] = result, True
+            return item
+        item["previous_turns"] = None
+        if incremental and item["output_dir"] is not None:
+            with stage(timer, "load_previous"):
+                item["previous_turns"] = load_previous_turns(item["output_dir"], item["dialogue_id"])
+        return item
+
+    def write(item: Dict) -> Dict:
+        if item.get("skipped"):
+            return item
+        result, timer = item["result"], item["timer"]
+        if cache is not None and not item.get("cached"):
+            with stage(timer, "cache_store"):
+                cache.put(item["key"], result)
+        if timer is not None:
+            result["timings"] = timer.report()
+        if item["output_dir"] is not None:
+            with stage(timer, "write"):
+                outputs = write_notebook_outputs(result, item["output_dir"], pretty, compression)
+            if journal is not None:
+                journal.record(item["name"], item["hash"], outputs, strict)
+        if timer is not None:
+            result["timings"] = timer.report()
+            result["timing_samples"] = timer.samples()
+        if on_result is not None:
+            with result_lock:
+                on_result(item["name"], result)
+        return item
+
+    stages = [
+        Stage("read", read, workers["read"]),
+        Stage("parse", _parse_stage, workers["parse"], cpu=True, when=_needs_processing),
+        Stage("validate", _validate_stage, workers["validate"], cpu=True, when=_needs_processing),
+        Stage("write", write, workers["write"]),
+    ]
+    report = run_stages(discover(), stages, queue_size, jobs, report_interval)
+    report["skipped"] = len(skipped)
+    return report
@@ -0,0 +1,71 @@
+import os
+import re
+import pytest
+from benchmarks.corpus import generate_corpus
+from batch_processing.checkpoint_journal import CheckpointJournal, JOURNAL_FILE, content_hash
+from main import run_batch_processing
+
+
+def processed(capfd):
+    return sorted(re.findall(r"📘 Processing notebook: (\S+)", capfd.readouterr().out))
+
+
+def test_record_and_is_complete(tmp_path):
+    output = tmp_path / "a" / "report.json"
+    output.parent.mkdir()
+    output.write_text("{}")
+    journal = CheckpointJournal(str(tmp_path))
+    journal.record("a.ipynb", content_hash(b"raw"), [str(output)])
+    journal.close()
+
+    journal = CheckpointJournal(str(tmp_path))
+    assert journal.is_complete("a.ipynb", content_hash(b"raw"))
+    assert not journal.is_complete("a.ipynb", content_hash(b"changed"))
+    assert not journal.is_complete("a.ipynb", content_hash(b"raw"), strict=True)
+    assert not journal.is_complete("b.ipynb", content_hash(b"raw"))
+    journal.rules = "other rules"
+    assert not journal.is_complete("a.ipynb", content_hash(b"raw"))
+    journal.rules = CheckpointJournal(str(tmp_path)).rules
+    output.unlink()
+    assert not journal.is_complete("a.ipynb", content_hash(b"raw"))
+
+
+def test_torn_line_is_ignored(tmp_path):
+    journal = CheckpointJournal(str(tmp_path))
+    journal.record("a.ipynb", "h", [])
+    journal.close()
+    with open(tmp_path / JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write('{"name": "b.ipynb", "ha')
+    journal = CheckpointJournal(str(tmp_path))
+    assert journal.is_complete("a.ipynb", "h") and "b.ipynb" not in journal.entries
+    journal.record("c.ipynb", "h", [])
+    journal.close()
+    assert set(CheckpointJournal(str(tmp_path)).entries) == {"a.ipynb", "c.ipynb"}
+
+
+# Serial, worker pool and staged runs
+@pytest.mark.parametrize("mode", [{"jobs": 1}, {"jobs": 2}, {"jobs": 2, "stage_workers": {}}])
+def test_resume_skips_finished_notebooks(tmp_path, capfd, mode):
+    corpus, output = str(tmp_path / "corpus"), str(tmp_path / "output")
+    paths = generate_corpus(corpus, notebooks=4, turns=2, response_words=40, seed=2)
+    names = sorted(os.path.basename(path) for path in paths)
+    run_batch_processing(corpus, output, **mode)
+    assert processed(capfd) == names
+    with open(os.path.join(output, "synthetic_00000", "validation_report.json"), "rb") as f:
+        report = f.read()
+
+    run_batch_processing(corpus, output, **mode, resume=True)
+    assert processed(capfd) == []
+
+    # A changed notebook and one whose reports were removed are redone; the rest stay skipped
+    with open(paths[1], "a", encoding="utf-8") as f:
+        f.write("\n")
+    os.remove(os.path.join(output, "synthetic_00002", "converted_output.json"))
+    run_batch_processing(corpus, output, **mode, resume=True)
+    assert processed(capfd) == [names[1], names[2]]
+    with open(os.path.join(output, "synthetic_00000", "validation_report.json"), "rb") as f:
+        assert f.read() == report
+
+    # Without --resume every notebook is processed again
+    run_batch_processing(corpus, output, **mode)
+    assert processed(capfd) == names
@@ -0,0 +1,59 @@
+import os
+import pytest
+from benchmarks.corpus import generate_corpus
+from batch_processing.result_cache import ResultCache
+from pipeline import run_notebook_pipeline
+
+
+@pytest.fixture
+def notebook(tmp_path):
+    return generate_corpus(str(tmp_path / "corpus"), notebooks=1, turns=4, response_words=60, seed=1)[0]
+
+
+def read_outputs(output_dir):
+    files = {}
+    for name in sorted(os.listdir(output_dir)):
+        with open(os.path.join(output_dir, name), "rb") as f:
+            files[name] = f.read()
+    return files
+
+
+def without_outputs(result):
+    return {k: v for k, v in result.items() if k not in ("outputs", "content_hash")}
+
+
+def test_cache_hit_matches_full_run(tmp_path, notebook, capsys):
+    cache = ResultCache(str(tmp_path / "cache"))
+    full = run_notebook_pipeline(notebook, output_dir=str(tmp_path / "full"))
+    miss = run_notebook_pipeline(notebook, output_dir=str(tmp_path / "miss"), cache=cache)
+    hit = run_notebook_pipeline(notebook, output_dir=str(tmp_path / "hit"), cache=cache)
+
+    assert "Reusing cached results" in capsys.readouterr().out
+    assert without_outputs(hit) == without_outputs(miss) == without_outputs(full)
+    assert read_outputs(tmp_path / "hit") == read_outputs(tmp_path / "miss") == read_outputs(tmp_path / "full")
+
+
+def test_key_covers_content_dialogue_id_and_strict(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    key = cache.key(b"{}", "a")
+    assert key == cache.key(b"{}", "a")
+    assert len({key, cache.key(b"{ }", "a"), cache.key(b"{}", "b"), cache.key(b"{}", "a", strict=True)}) == 4
+
+
+def test_rebuild_ignores_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.put("ab" * 32, {"dialogue_id": "x"})
+    assert cache.get("ab" * 32) == {"dialogue_id": "x"}
+    assert ResultCache(str(tmp_path / "cache"), rebuild=True).get("ab" * 32) is None
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=0)
+    keys = ["aa" * 32, "bb" * 32, "cc" * 32]
+    for i, key in enumerate(keys):
+        cache.put(key, {"value": "x" * 100})
+        os.utime(cache._path(key), (i, i))
+    cache.max_bytes = os.path.getsize(cache._path(keys[0])) * 2
+    assert cache.prune() == 1
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) is not None and cache.get(keys[2]) is not None
@@ -0,0 +1,152 @@
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Default number of seconds a single notebook may take before its worker is killed
+DEFAULT_NOTEBOOK_TIMEOUT = 300.0
+
+# A task is (name, args) where args are passed positionally to the worker target
+Task = Tuple[str, Tuple[Any, ...]]
+
+
+def order_largest_first(tasks: Sequence[Task], path_index: int = 0) -> List[Task]:
+    """
+    Sort tasks so the largest inputs are scheduled first. The argument at path_index is a file
+    path or a notebook found by batch_processing.discovery, which carries its own "size".
+    """
+    def size(task: Task) -> int:
+        try:
+            source = task[1][path_index]
+            return source["size"] if isinstance(source, dict) else os.path.getsize(source)
+        except (OSError, IndexError, KeyError, TypeError):
+            return 0
+    return sorted(tasks, key=size, reverse=True)
+
+
+def _worker_loop(target: Callable, conn) -> None:
+    """Receive tasks from the parent, run them and report the outcome back."""
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        name, args = message
+        try:
+            value = target(*args)
+            conn.send((name, "ok", None, value))
+        except Exception as e:
+            conn.send((name, "error", f"{type(e).__name__}: {e}", None))
+    conn.close()
+
+
+class _Worker:
+    """A single long-lived worker process and the task it is currently running."""
+
+    def __init__(self, ctx, target: Callable):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_loop, args=(target, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task: Optional[str] = None
+        self.started = 0.0
+
+    def submit(self, task: Task) -> None:
+        self.task = task[0]
+        self.started = time.monotonic()
+        self.conn.send(task)
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def run_worker_pool(target: Callable, tasks: Sequence[Task], jobs: int,
+                    timeout: Optional[float] = DEFAULT_NOTEBOOK_TIMEOUT,
+                    poll_interval: float = 0.5,
+                    on_result: Optional[Callable[[str, Any], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Run target(*args) for every task on a pool of `jobs` worker processes.
+    Each task runs in isolation: a task that raises, crashes its worker or exceeds
+    `timeout` seconds is recorded as failed and its worker is replaced, so the rest
+    of the batch keeps going. If given, on_result(name, value) is called in the parent
+    with the return value of every successful task as soon as it arrives.
+    return: List[Dict] - one {name, status, error, elapsed} entry per task, where status
+            is one of "ok", "error", "crashed" or "timeout"
+    """
+    # Imported here: multiprocessing is a large share of the CLI's startup time and is only
+    # needed once a batch actually runs in parallel
+    import multiprocessing
+    from multiprocessing.connection import wait
+    ctx = multiprocessing.get_context()
+    pending = deque(tasks)
+    workers = [_Worker(ctx, target) for _ in range(max(1, min(jobs, len(pending))))]
+    results = []
+
+    def finish(worker: _Worker, status: str, error: Optional[str]) -> None:
+        results.append({
+            "name": worker.task,
+            "status": status,
+            "error": error,
+            "elapsed": round(time.monotonic() - worker.started, 3)
+        })
+        worker.task = None
+
+    try:
+        while True:
+            for i, worker in enumerate(workers):
+                if worker.task is None and pending:
+                    try:
+                        worker.submit(pending.popleft())
+                    except (BrokenPipeError, OSError):
+                        finish(worker, "crashed", "Worker exited before accepting the task")
+                        worker.kill()
+                        workers[i] = _Worker(ctx, target)
+
+            busy = [w for w in workers if w.task is not None]
+            if not busy:
+                break
+
+            waitables = [w.conn for w in busy] + [w.process.sentinel for w in busy]
+            wait(waitables, timeout=poll_interval)
+
+            now = time.monotonic()
+            for i, worker in enumerate(workers):
+                if worker.task is None:
+                    continue
+                if worker.conn.poll():
+                    try:
+                        name, status, error, value = worker.conn.recv()
+                        finish(worker, status, error)
+                        if status == "ok" and on_result is not None:
+                            on_result(name, value)
+                        continue
+                    except (EOFError, OSError):
+                        pass
+                if not worker.process.is_alive():
+                    finish(worker, "crashed", f"Worker exited with code {worker.process.exitcode}")
+                    worker.kill()
+                    workers[i] = _Worker(ctx, target)
+                elif timeout is not None and now - worker.started > timeout:
+                    finish(worker, "timeout", f"Exceeded {timeout}s timeout")
+                    worker.kill()
+                    workers[i] = _Worker(ctx, target)
+    finally:
+        for worker in workers:
+            worker.stop()
+
+    return results
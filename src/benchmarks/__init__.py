@@ -0,0 +1,3 @@
+"""
+Benchmark suite measuring the throughput of the conversion and validation pipeline.
+"""
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Command line entry point, run from the src directory:
+
+    python -m benchmarks generate <corpus_dir> [--notebooks N --turns N --response-words N ...]
+    python -m benchmarks run [--corpus <corpus_dir>] [--output results.json]
+    python -m benchmarks compare <baseline.json> <current.json> [--threshold 0.10]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+from benchmarks.corpus import generate_corpus
+from benchmarks.runner import run_benchmarks, compare_results, format_comparison, DEFAULT_REGRESSION_THRESHOLD
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--notebooks", type=int, default=20, help="Number of notebooks to generate")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per notebook")
+    parser.add_argument("--response-words", type=int, default=300, help="Approximate words per response")
+    parser.add_argument("--instructions-per-turn", type=int, default=6, help="Instructions per turn")
+    parser.add_argument("--instruction-mix", nargs="*", default=None,
+                        help="Instruction IDs to draw from (default: every instruction in the template)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for a reproducible corpus")
+
+
+def corpus_kwargs(args: argparse.Namespace) -> dict:
+    return {
+        "notebooks": args.notebooks,
+        "turns": args.turns,
+        "response_words": args.response_words,
+        "instructions_per_turn": args.instructions_per_turn,
+        "instruction_mix": args.instruction_mix,
+        "seed": args.seed,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Pipeline throughput benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write a synthetic notebook corpus")
+    generate.add_argument("corpus_dir")
+    add_corpus_arguments(generate)
+
+    run = commands.add_parser("run", help="Benchmark a corpus and write the results as JSON")
+    run.add_argument("--corpus", help="Existing corpus directory (default: generate a temporary one)")
+    run.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    run.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark")
+    add_corpus_arguments(run)
+
+    compare = commands.add_parser("compare", help="Flag regressions against a stored baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                         help="Allowed relative slowdown before a benchmark is flagged (default: 0.10)")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        paths = generate_corpus(args.corpus_dir, **corpus_kwargs(args))
+        print(f"✅ Generated {len(paths)} notebooks in: {args.corpus_dir}")
+        return 0
+
+    if args.command == "run":
+        if args.corpus:
+            paths = sorted(os.path.join(args.corpus, f) for f in os.listdir(args.corpus) if f.endswith(".ipynb"))
+            run_benchmarks(paths, args.output, args.repeat)
+        else:
+            with tempfile.TemporaryDirectory() as corpus_dir:
+                paths = generate_corpus(corpus_dir, **corpus_kwargs(args))
+                run_benchmarks(paths, args.output, args.repeat)
+        print(f"✅ Benchmark results saved to: {args.output}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+    rows = compare_results(baseline, current, args.threshold)
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
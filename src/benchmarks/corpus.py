@@ -0,0 +1,117 @@
+import os
+import json
+import random
+from typing import Any, Dict, List, Optional, Sequence
+from data_loader import template_json, conflict_dict
+from notebook_processing.processor import validate_and_fix_consecutive_metadata_items
+
+VOCABULARY = [
+    "alpha", "beta", "gamma", "delta", "model", "answer", "system", "python", "notebook", "prompt",
+    "result", "value", "quick", "brown", "fox", "lazy", "dog", "data", "turn", "response",
+    "instruction", "check", "format", "title", "section", "keyword", "letter", "frequency",
+]
+RELATIONS = ["at least", "equal to", "less than"]
+TEMPLATE_INSTRUCTIONS = {inst["instruction_id"]: inst for inst in template_json["instructions"]}
+
+
+def make_kwargs(inst_id: str, rng: random.Random) -> Dict[str, Any]:
+    """Fill an instruction with random values of the types declared in template_json."""
+    instruction = {"instruction_id": inst_id}
+    for key, kind in TEMPLATE_INSTRUCTIONS[inst_id].items():
+        if key == "instruction_id":
+            continue
+        if kind == "int":
+            instruction[key] = rng.randint(1, 50)
+        elif kind == "list(str)":
+            instruction[key] = rng.sample(VOCABULARY, rng.randint(1, 4))
+        elif kind.startswith("{"):
+            instruction[key] = rng.choice(RELATIONS)
+        elif key == "letter":
+            instruction[key] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        else:
+            instruction[key] = rng.choice(VOCABULARY)
+    return instruction
+
+
+def choose_instructions(instruction_mix: Sequence[str], count: int, rng: random.Random) -> List[str]:
+    """Pick up to `count` instruction IDs from the mix without any conflicting pair."""
+    chosen = []
+    for inst_id in rng.sample(list(instruction_mix), len(instruction_mix)):
+        if len(chosen) == count:
+            break
+        if not any(other in conflict_dict.get(inst_id, []) or inst_id in conflict_dict.get(other, [])
+                   for other in chosen):
+            chosen.append(inst_id)
+    return chosen
+
+
+def make_response(words: int, rng: random.Random) -> str:
+    """Build a response mixing prose with the structures the instruction checks look for."""
+    lines = [f"<<{rng.choice(VOCABULARY).title()}>>"]
+    written = 0
+    while written < words:
+        kind = rng.random()
+        length = rng.randint(5, 20)
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(length))
+        if kind < 0.15:
+            text = f"{len(lines)}. {text}"
+        elif kind < 0.25:
+            text = f"* {text}"
+        elif kind < 0.3:
+            text = f"Section {len(lines)} {text} [placeholder]"
+        elif kind < 0.4:
+            text = text.upper()
+        else:
+            text = text.capitalize() + ", " + rng.choice(VOCABULARY) + "."
+        lines.append(text)
+        written += length
+    lines.append("P.S. " + rng.choice(VOCABULARY))
+    return "\n".join(lines)
+
+
+def _markdown(source: str) -> Dict:
+    return {"cell_type": "markdown", "metadata": {}, "source": source.splitlines(True)}
+
+
+def make_notebook(turns: int, response_words: int, instructions_per_turn: int,
+                  instruction_mix: Sequence[str], models: Sequence[str], rng: random.Random) -> Dict:
+    """Build one notebook in the **[user]** / **[turn_metadata]** / **[assistant_*]** cell format."""
+    cells = [_markdown("# Metadata\n\n**Domain**: benchmark")]
+    previous: List[Dict] = []
+    for turn in range(turns):
+        if previous and rng.random() < 0.5:
+            instructions = previous
+        else:
+            chosen = choose_instructions(instruction_mix, instructions_per_turn, rng)
+            instructions = [make_kwargs(inst_id, rng) for inst_id in chosen]
+        # Label the turn with the changes it really makes, so the schema check sees valid metadata
+        changes = ["add"] if turn == 0 else sorted(validate_and_fix_consecutive_metadata_items(previous, instructions)[0])
+        metadata = {"metadata": changes, "instructions": instructions}
+        previous = instructions
+
+        cells.append(_markdown(f"**[user]**\n\n{make_response(30, rng)}"))
+        cells.append(_markdown("**[turn_metadata]**\n\n```json\n" + json.dumps(metadata, indent=2) + "\n```"))
+        cells.append(_markdown(f"**[assistant]**\n\n{make_response(response_words, rng)}"))
+        for model in models:
+            cells.append(_markdown(f"**[assistant_{model}]**\n\n{make_response(response_words, rng)}"))
+    return {"cells": cells, "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
+
+
+def generate_corpus(output_dir: str, notebooks: int = 20, turns: int = 5, response_words: int = 300,
+                    instructions_per_turn: int = 6, instruction_mix: Optional[Sequence[str]] = None,
+                    models: Sequence[str] = ("nova", "gpt"), seed: int = 0) -> List[str]:
+    """
+    Write a synthetic corpus of notebooks to output_dir and return their paths.
+    instruction_mix limits the instruction IDs used (default: every instruction in template_json).
+    """
+    rng = random.Random(seed)
+    instruction_mix = list(instruction_mix or TEMPLATE_INSTRUCTIONS)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i in range(notebooks):
+        nb = make_notebook(turns, response_words, instructions_per_turn, instruction_mix, models, rng)
+        path = os.path.join(output_dir, f"synthetic_{i:05d}.ipynb")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(nb, f, indent=1, ensure_ascii=False)
+        paths.append(path)
+    return paths
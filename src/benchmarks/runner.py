@@ -0,0 +1,144 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import statistics
+import contextlib
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence
+from notebook_processing.processor import process_notebook_with_metadata_report
+from validators.batch_validator import BULK_CHECKS, validate_pairs
+from validators.validator import validate_instruction, validate_notebook_schema, extract_notebook_sections_as_dict
+from data_loader import template_json
+from main import run_validation
+from pipeline import validate_corpus
+from validators.conflict_index import corpus_conflicts
+from validators.validation_memo import VALIDATION_MEMO
+
+# A benchmark is flagged as a regression when its median time per item grows by more than this
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+
+def time_call(fn: Callable[[], None], items: int, repeat: int,
+              setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """
+    Run fn `repeat` times and summarise the wall times; per_item divides the median by items.
+    setup, if given, runs untimed before every run.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    return {
+        "items": items,
+        "runs": repeat,
+        "min": min(times),
+        "median": median,
+        "mean": statistics.mean(times),
+        "per_item": median / items if items else 0.0,
+    }
+
+
+def benchmark_corpus(paths: Sequence[str], repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """Time each pipeline stage over the corpus, plus every validate_instruction type separately."""
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir, contextlib.redirect_stdout(io.StringIO()):
+        converted = [process_notebook_with_metadata_report(p)[0] for p in paths]
+        sections = [extract_notebook_sections_as_dict(p) for p in paths]
+        converted_paths = []
+        for i, dialogue in enumerate(converted):
+            path = os.path.join(work_dir, f"converted_{i}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(dialogue, f, ensure_ascii=False)
+            converted_paths.append(path)
+        log_path = os.path.join(work_dir, "notebook_validation.log")
+        report_path = os.path.join(work_dir, "validation_report.json")
+
+        results["process_notebook_with_metadata_report"] = time_call(
+            lambda: [process_notebook_with_metadata_report(p) for p in paths], len(paths), repeat)
+        results["validate_notebook_schema"] = time_call(
+            lambda: [validate_notebook_schema(s, template_json, log_path) for s in sections], len(paths), repeat)
+        # Every run starts from an empty validation memo, except the warm one, which re-validates
+        # a corpus the memo has already seen
+        results["run_validation"] = time_call(
+            lambda: [run_validation(p, report_path) for p in converted_paths], len(paths), repeat,
+            setup=VALIDATION_MEMO.clear)
+        results["run_validation[memo warm]"] = time_call(
+            lambda: [run_validation(p, report_path) for p in converted_paths], len(paths), repeat)
+        results["validate_corpus"] = time_call(lambda: validate_corpus(converted), len(paths), repeat)
+        results["corpus_conflicts"] = time_call(lambda: corpus_conflicts(converted), len(paths), repeat)
+
+        # Every (response, instruction) pair in the corpus, grouped by instruction type
+        calls = defaultdict(list)
+        for dialogue in converted:
+            for turn in dialogue["turns"]:
+                instructions = turn.get("instructions", {})
+                responses = [v for k, v in turn.items() if k.endswith("_response") or k == "response"]
+                for inst in instructions.get("instructions", []):
+                    kwargs = {k: v for k, v in inst.items() if k != "instruction_id"}
+                    for response in responses:
+                        calls[inst["instruction_id"]].append((response, kwargs, instructions))
+
+        for inst_id in sorted(calls):
+            group = calls[inst_id]
+            results[f"validate_instruction[{inst_id}]"] = time_call(
+                lambda: [validate_instruction(r, inst_id, kw, ins) for r, kw, ins in group], len(group), repeat)
+            if inst_id in BULK_CHECKS:
+                pairs = [(r, dict(kw, instruction_id=inst_id)) for r, kw, _ in group]
+                results[f"validate_pairs[{inst_id}]"] = time_call(lambda: validate_pairs(pairs), len(pairs), repeat)
+    return results
+
+
+def run_benchmarks(paths: Sequence[str], output_path: str, repeat: int = 3) -> Dict:
+    """Benchmark the corpus and write the machine-readable results to output_path."""
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "notebooks": len(paths),
+            "repeat": repeat,
+        },
+        "benchmarks": benchmark_corpus(paths, repeat),
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def compare_results(baseline: Dict, current: Dict,
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict]:
+    """
+    Compare the per-item median time of every benchmark present in both reports.
+    return: List[Dict] - one {benchmark, baseline, current, change, regression} row per benchmark
+    """
+    rows = []
+    for name, base in baseline["benchmarks"].items():
+        cur = current["benchmarks"].get(name)
+        if cur is None or not base["per_item"]:
+            continue
+        change = cur["per_item"] / base["per_item"] - 1
+        rows.append({
+            "benchmark": name,
+            "baseline": base["per_item"],
+            "current": cur["per_item"],
+            "change": change,
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    lines = [f"{'benchmark':<60} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for row in rows:
+        flag = "  ❌ REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['benchmark']:<60} {row['baseline'] * 1e6:>10.1f}us {row['current'] * 1e6:>10.1f}us "
+                     f"{row['change'] * 100:>+7.1f}%{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,166 @@
+"""
+Reading and writing of the JSON reports and results.
+
+orjson is used when it is installed and the stdlib json module otherwise, orjson being an order
+of magnitude faster. Both keep non-ASCII text as is and indent by 2 spaces when pretty, but the
+bytes are not always the same: some floats are spelled differently (1e16 vs 1e+16), NaN and
+Infinity are written as null by orjson, and only the stdlib reads NaN/Infinity literals or a
+leading UTF-8 BOM. Reports parse to the same data either way; anything hashed (cache or turn
+keys) is encoded with the stdlib json module instead, so it does not depend on the backend.
+Reports are pretty by default or compact, and can be compressed with gzip or zstd
+(from the Python 3.14 stdlib or the zstandard package). A compressed file gets a .gz or .zst
+suffix after its name; readers detect the compression from the content itself, and
+read_json/find_json look for a file under any of its suffixes.
+"""
+import os
+import json
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, List, Optional
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+COMPRESSIONS = tuple(COMPRESSION_SUFFIXES)
+# gzip level 3 is within a few percent of the default 6 in size on these reports, and faster
+GZIP_LEVEL = 3
+ZSTD_LEVEL = 3
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+@lru_cache(maxsize=None)
+def _orjson():
+    try:
+        import orjson
+        return orjson
+    except ImportError:
+        return None
+
+
+def json_backend() -> str:
+    """Name of the JSON library in use: "orjson" or "json"."""
+    return "orjson" if _orjson() is not None else "json"
+
+
+def dumps(obj: Any, pretty: bool = True) -> bytes:
+    """UTF-8 JSON of obj, indented by 2 spaces if pretty, otherwise without any whitespace."""
+    orjson = _orjson()
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+        except TypeError:
+            # Non-string keys or integers beyond 64 bits, which only the stdlib serializes
+            pass
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data) -> Any:
+    """Parse JSON from bytes or str; invalid JSON raises a ValueError."""
+    orjson = _orjson()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _zstd():
+    try:
+        from compression import zstd
+        return zstd.compress, zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression needs Python 3.14+ or the zstandard package") from None
+    return (lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data))
+
+
+def zstd_available() -> bool:
+    try:
+        _zstd()
+        return True
+    except ImportError:
+        return False
+
+
+def compress(data: bytes, compression: Optional[str]) -> bytes:
+    """data compressed with "gzip" or "zstd", or unchanged for None."""
+    if compression is None:
+        return data
+    if compression == "gzip":
+        import gzip
+        # mtime=0 so the same report always compresses to the same bytes
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if compression == "zstd":
+        return _zstd()[0](data, ZSTD_LEVEL)
+    raise ValueError(f"Unknown compression: {compression} (expected one of {', '.join(COMPRESSIONS)})")
+
+
+def decompress(data: bytes) -> bytes:
+    """data decompressed if it is gzip or zstd compressed, otherwise unchanged."""
+    if data[:2] == _GZIP_MAGIC:
+        import gzip
+        return gzip.decompress(data)
+    if data[:4] == _ZSTD_MAGIC:
+        return _zstd()[1](data)
+    return data
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w"):
+    """
+    Open path for writing ("w" for UTF-8 text, "wb" for bytes) through a temporary file in the
+    same directory that replaces path only once it is complete, so readers never see a half-written file.
+    """
+    # A fixed name, so the next write of an interrupted file also replaces its leftover temporary
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def json_variants(path: str) -> List[str]:
+    """path and its compressed variants, in the order readers look for them."""
+    return [path] + [path + suffix for suffix in COMPRESSION_SUFFIXES.values()]
+
+
+def find_json(path: str) -> Optional[str]:
+    """The existing one of path, path.gz and path.zst, or None."""
+    for candidate in json_variants(path):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def remove_json(path: str) -> None:
+    """Remove path and its compressed variants, where they exist."""
+    for candidate in json_variants(path):
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+
+def write_json(path: str, obj: Any, pretty: bool = True, compression: Optional[str] = None) -> str:
+    """
+    Atomically write obj as JSON to path, plus the compression's suffix, and remove the
+    file's other variants left by earlier runs so readers find only this one.
+    return: str - the path written
+    """
+    target = path + COMPRESSION_SUFFIXES.get(compression, "")
+    data = compress(dumps(obj, pretty), compression)
+    with atomic_write(target, "wb") as f:
+        f.write(data)
+    for candidate in json_variants(path):
+        if candidate != target and os.path.exists(candidate):
+            os.remove(candidate)
+    return target
+
+
+def read_json(path: str) -> Any:
+    """Load the JSON at path, or at its .gz/.zst variant, whatever its compression."""
+    with open(find_json(path) or path, "rb") as f:
+        return loads(decompress(f.read()))
@@ -1,91 +1,320 @@
 import os
 import sys
-import json
-from notebook_processing.processor import process_notebook, process_notebook_with_metadata_report
-from validators.validator import validate_instruction, validate_notebook_schema, extract_notebook_sections_as_dict
-from data_loader import template_json
-
-def run_validation(input_json_path: str, output_log_path: str) -> None:
-    """Run validation on the input JSON and save results to output path."""
-    with open(input_json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    dialogues = [data] if isinstance(data, dict) else data
-    results = []
-
-    for d_index, dialogue in enumerate(dialogues):
-        dialogue_id = dialogue.get("dialogue_metadata", {}).get("dialogue_id", f"dialogue_{d_index}")
-        for t_index, turn in enumerate(dialogue["turns"]):
-            instructions = turn.get("instructions", {})
-            instruction_list = instructions.get("instructions", [])
-            all_responses = {k: v for k, v in turn.items() if k.endswith("_response") or k == "response"}
-
-            for label, response in all_responses.items():
-                turn_results = []
-                for inst in instruction_list:
-                    inst_id = inst.get("instruction_id")
-                    if not inst_id:
-                        continue
-                    # Get all kwargs except instruction_id
-                    kwargs = {k: v for k, v in inst.items() if k != "instruction_id"}
-                    valid, message = validate_instruction(response, inst_id, kwargs, instructions)
-                    turn_results.append({
-                        "instruction": inst_id,
-                        "status": "Passed" if valid else "Failed",
-                        "message": message
-                    })
-
-                results.append({
-                    "dialogue_id": dialogue_id,
-                    "turn_index": t_index + 1,
-                    "response_type": label,
-                    "prompt": turn["prompt"][:100],
-                    "results": turn_results
-                })
-
-    with open(output_log_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-
-    print(f"✅ Validation complete. Log saved to: {output_log_path}")
-
-def run_batch_processing(input_dir: str, output_base_dir: str) -> None:
-    """Process all notebooks in the input directory and validate their outputs."""
-    ipynb_files = [f for f in os.listdir(input_dir) if f.endswith(".ipynb")]
-    if not ipynb_files:
-        print("No .ipynb files found in input folder.")
-        return
-
-    for ipynb_file in ipynb_files:
-        base_name = os.path.splitext(ipynb_file)[0]
-        input_path = os.path.join(input_dir, ipynb_file)
-        output_dir = os.path.join(output_base_dir, base_name)
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Step 1: Convert notebook to json and get metadata change report
-        print(f"\n📘 Processing notebook: {ipynb_file}")
-        converted, metadata_report = process_notebook_with_metadata_report(input_path, dialogue_id=base_name)
-        converted_path = os.path.join(output_dir, "converted_output.json")
-        with open(converted_path, "w", encoding="utf-8") as f:
-            json.dump(converted, f, indent=2, ensure_ascii=False)
-        print(f"✅ Converted JSON saved to: {converted_path}")
-        
-        log_filename = os.path.join(output_dir, "notebook_validation.log")
-        notebook = extract_notebook_sections_as_dict(input_path)
-        validate_notebook_schema(notebook, template_json, log_filename)
-
-        # Save metadata change report
-        metadata_report_path = os.path.join(output_dir, "metadata_change_report.json")
-        with open(metadata_report_path, "w", encoding="utf-8") as f:
-            json.dump(metadata_report, f, indent=2, ensure_ascii=False)
-
-        # Step 2: Validate and export report
-        validation_txt_path = os.path.join(output_dir, "validation_report.json")
-        run_validation(converted_path, validation_txt_path)
+import argparse
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from pipeline import validate_dialogues, run_notebook_pipeline, write_notebook_outputs
+from batch_processing.worker_pool import run_worker_pool, order_largest_first, DEFAULT_NOTEBOOK_TIMEOUT
+from batch_processing.result_cache import ResultCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_BYTES
+from batch_processing.checkpoint_journal import CheckpointJournal, content_hash
+from batch_processing.discovery import iter_notebooks, read_notebook, notebook_output_name, notebook_dialogue_id
+from service.client import ValidationServiceClient, DEFAULT_SERVICE_URL, DEFAULT_BATCH_SIZE
+from timing import PipelineTimer, BatchTimingSummary, format_summary, stage, print_startup_profile
+from json_io import read_json, write_json, zstd_available, COMPRESSIONS
+
+if TYPE_CHECKING:
+    from batch_processing.jsonl_sink import JsonlSink
+
+BATCH_TIMINGS_FILE = "batch_timings.json"
+
+def run_validation(input_json_path: str, output_log_path: str, profile: bool = False,
+                   pretty: bool = True, compression: Optional[str] = None) -> Optional[Dict]:
+    """
+    Run validation on the input JSON (plain, .gz or .zst) and save results to output path.
+    The log is indented if pretty, and compressed with compression ("gzip" or "zstd", adding
+    .gz or .zst to output path) if given.
+    With profile=True the per-stage and per-instruction timings are also saved next to the log
+    (as <log name>_timings.json) and returned.
+    """
+    timer = PipelineTimer() if profile else None
+    with stage(timer, "read"):
+        data = read_json(input_json_path)
+
+    with stage(timer, "validate"):
+        results = validate_dialogues(data, timer)
+
+    with stage(timer, "write"):
+        log_path = write_json(output_log_path, results, pretty, compression)
+
+    print(f"✅ Validation complete. Log saved to: {log_path}")
+    if timer is None:
+        return None
+    timings = timer.report()
+    write_json(os.path.splitext(output_log_path)[0] + "_timings.json", timings)
+    return timings
+
+def process_single_notebook(notebook: Dict, output_dir: Optional[str], dialogue_id: str,
+                            cache: Optional[ResultCache] = None, strict: bool = False,
+                            profile: bool = False, incremental: bool = False, pretty: bool = True,
+                            compression: Optional[str] = None) -> Optional[Dict]:
+    """
+    Convert, schema-check and validate one notebook (as found by batch_processing.discovery),
+    writing its reports to output_dir in the JSON format set by pretty and compression.
+    Without an output_dir nothing is written and the in-memory result is returned instead.
+    With an output_dir only the list of written files ("outputs") and the notebook's content hash
+    ("content_hash") are returned, plus the timings for the batch summary with profile=True.
+    With incremental=True only the turns changed since the previous run into output_dir are reprocessed.
+    """
+    print(f"\n📘 Processing notebook: {notebook['name']}")
+    if notebook["member"] is None:
+        result = run_notebook_pipeline(notebook["path"], dialogue_id=dialogue_id, output_dir=output_dir, cache=cache,
+                                       strict=strict, profile=profile, incremental=incremental,
+                                       pretty=pretty, compression=compression)
+    else:
+        result = run_notebook_pipeline(notebook["name"], dialogue_id=dialogue_id, output_dir=output_dir, cache=cache,
+                                       strict=strict, profile=profile, incremental=incremental,
+                                       raw=read_notebook(notebook), pretty=pretty, compression=compression)
+    if output_dir is None:
+        return result
+    returned = {"outputs": result["outputs"], "content_hash": result["content_hash"]}
+    if profile:
+        returned["timings"] = result["timings"]
+        returned["timing_samples"] = result["timing_samples"]
+    return returned
+
+def process_notebooks_remotely(service, notebooks: Iterable[Tuple[str, Dict, Optional[str]]],
+                               sink: Optional["JsonlSink"] = None, strict: bool = False,
+                               journal: Optional[CheckpointJournal] = None, pretty: bool = True,
+                               compression: Optional[str] = None) -> None:
+    """
+    Validate (name, discovered notebook, output dir) notebooks on a running validation service
+    (a service.client.ValidationServiceClient), a batch at a time, and write the returned results here.
+    notebooks may be a generator; only one batch is read at a time.
+    Written notebooks are recorded in journal, if given. pretty and compression set the
+    format of the written JSON files.
+    """
+    health = service.health() or {}
+    batch_size = max(1, health.get("max_pending", DEFAULT_BATCH_SIZE))
+    notebooks = iter(notebooks)
+    total = failed = 0
+    while True:
+        chunk = list(islice(notebooks, batch_size))
+        if not chunk:
+            break
+        total += len(chunk)
+        contents = [(file_name, read_notebook(notebook)) for file_name, notebook, _ in chunk]
+        raw_by_name = dict(contents)
+        for (file_name, _, output_dir), item in zip(chunk, service.validate_batch(contents, strict)):
+            print(f"\n📘 Processing notebook: {file_name}")
+            if item["status"] != "ok":
+                print(f"❌ {file_name}: {item['error']}")
+                failed += 1
+            elif sink is not None:
+                sink.write(item["result"])
+            else:
+                outputs = write_notebook_outputs(item["result"], output_dir, pretty, compression)
+                if journal is not None:
+                    journal.record(file_name, content_hash(raw_by_name[file_name]), outputs, strict)
+    if total:
+        print(f"\n📊 Batch complete: {total - failed}/{total} notebooks processed by the validation service")
+
+def run_batch_processing(input_dir: str, output_base_dir: str, jobs: int = 1,
+                         timeout: Optional[float] = DEFAULT_NOTEBOOK_TIMEOUT,
+                         cache: Optional[ResultCache] = None,
+                         sink: Optional["JsonlSink"] = None, strict: bool = False,
+                         profile: bool = False, incremental: bool = False, service=None,
+                         stage_workers: Optional[Dict[str, int]] = None, queue_size: Optional[int] = None,
+                         resume: bool = False, include: Optional[List[str]] = None,
+                         exclude: Optional[List[str]] = None, pretty: bool = True,
+                         compression: Optional[str] = None) -> None:
+    """
+    Process all notebooks under the input directory and validate their outputs.
+    Notebooks are found recursively and inside .zip/.tar archives (see batch_processing.discovery),
+    optionally filtered by include/exclude globs, and each one's reports go to the matching
+    relative directory under output_base_dir. The directory tree is streamed rather than listed
+    up front, except with jobs > 1 where the notebooks are collected to be sorted by size.
+    With jobs > 1 the notebooks are spread over a pool of worker processes, largest first,
+    and a notebook that fails, crashes or exceeds `timeout` seconds does not stop the batch.
+    With a ResultCache, notebooks unchanged since a previous run reuse their stored results.
+    With a JsonlSink, results are streamed into its JSONL files instead of per-notebook directories.
+    With strict=True every notebook must also pass nbformat schema validation.
+    Per-notebook JSON reports are indented if pretty, and compressed with compression ("gzip"
+    or "zstd") if given; see json_io.
+    With profile=True each notebook's report gets a timings section and a p50/p95/p99 summary
+    of the batch is printed and saved as batch_timings.json in output_base_dir.
+    With incremental=True (per-notebook directories only) each notebook reuses the unchanged
+    turns of its previous run.
+    With a service (service.client.ValidationServiceClient) the notebooks are validated by the
+    running validation service instead; jobs, timeout, cache, profile and incremental do not apply.
+    With stage_workers (a possibly empty {stage name: workers} dict) the batch runs as the staged
+    pipeline of batch_processing.stage_pipeline: reads and writes on their own threads, the CPU-bound
+    stages on a pool of `jobs` processes, connected by queues of queue_size notebooks. There is no
+    per-notebook timeout in that mode.
+    With per-notebook directories, every notebook whose files are all written is recorded in the
+    checkpoint journal of output_base_dir (batch_journal.jsonl). With resume=True the notebooks the
+    journal records as finished, with the same content and rules and with their files still in
+    place, are skipped; interrupted ones are processed again.
+    """
+    notebooks = iter_notebooks(input_dir, include, exclude)
+    journal = CheckpointJournal(output_base_dir) if sink is None else None
+    summary = BatchTimingSummary() if profile else None
+    counts = {"discovered": 0, "skipped": 0}
+
+    def iter_tasks():
+        for notebook in notebooks:
+            counts["discovered"] += 1
+            name = notebook["name"]
+            output_dir = os.path.join(output_base_dir, notebook_output_name(notebook)) if sink is None else None
+            # Only a resumed batch hashes notebooks up front; otherwise each run hashes the bytes it reads
+            if resume and journal is not None and journal.is_complete(name, content_hash(read_notebook(notebook)),
+                                                                        strict):
+                counts["skipped"] += 1
+                continue
+            yield name, (notebook, output_dir, notebook_dialogue_id(notebook), cache, strict, profile, incremental,
+                         pretty, compression)
+
+    def collect(name: str, result: Optional[Dict]) -> None:
+        outputs = result.pop("outputs", None)
+        if outputs is not None:
+            # Written by this process's notebook runs; the staged pipeline keeps its own journal entries
+            journal.record(name, result.pop("content_hash"), outputs, strict)
+        if summary is not None:
+            summary.add(result["timings"], result.pop("timing_samples"))
+        if sink is not None:
+            sink.write(result)
+
+    try:
+        if service is not None:
+            process_notebooks_remotely(service, ((name, args[0], args[1]) for name, args in iter_tasks()),
+                                       sink, strict, journal, pretty, compression)
+        elif stage_workers is not None:
+            from batch_processing.stage_pipeline import run_staged_batch, format_stage_report, DEFAULT_QUEUE_SIZE
+            on_result = collect if sink is not None or summary is not None else None
+            report = run_staged_batch(notebooks, output_base_dir if sink is None else None, jobs, stage_workers,
+                                      queue_size or DEFAULT_QUEUE_SIZE, cache, strict, profile, incremental,
+                                      on_result, journal, resume, report_interval=5.0,
+                                      pretty=pretty, compression=compression)
+            counts["discovered"], counts["skipped"] = report["discovered"], report["skipped"]
+            processed = report["discovered"] - report["skipped"]
+            if processed:
+                print("\n" + format_stage_report(report))
+                print(f"\n📊 Batch complete: {processed - len(report['failures'])}/{processed} notebooks processed in stages")
+            for failure in report["failures"]:
+                print(f"❌ {failure['name']}: failed in {failure['stage']} - {failure['error']}")
+        elif jobs <= 1:
+            for name, args in iter_tasks():
+                collect(name, process_single_notebook(*args))
+        else:
+            # Collected to schedule the largest notebooks first; tar members are held in memory until then
+            tasks = list(iter_tasks())
+            if len(tasks) == 1:
+                collect(tasks[0][0], process_single_notebook(*tasks[0][1]))
+            elif tasks:
+                results = run_worker_pool(process_single_notebook, order_largest_first(tasks), jobs, timeout,
+                                          on_result=collect)
+                failed = [r for r in results if r["status"] != "ok"]
+                print(f"\n📊 Batch complete: {len(results) - len(failed)}/{len(results)} notebooks processed with {jobs} workers")
+                for r in failed:
+                    print(f"❌ {r['name']}: {r['status']} after {r['elapsed']}s - {r['error']}")
+        if not counts["discovered"]:
+            print("No .ipynb files found in input folder.")
+        elif counts["skipped"]:
+            print(f"⏭️ Skipped {counts['skipped']} notebooks finished by a previous run")
+    finally:
+        if journal is not None:
+            journal.close()
+        if sink is not None:
+            sink.flush()
+        if cache is not None:
+            cache.prune()
+        if summary is not None and summary.notebooks:
+            batch_timings = summary.summary()
+            os.makedirs(output_base_dir, exist_ok=True)
+            write_json(os.path.join(output_base_dir, BATCH_TIMINGS_FILE), batch_timings)
+            print("\n" + format_summary(batch_timings))
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python main.py <input_directory>")
-        sys.exit(1)
-    
-    input_dir = sys.argv[1]
-    run_batch_processing(input_dir, input_dir) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Convert and validate the Jupyter notebooks in a directory.")
+    parser.add_argument("input_dir", help="Directory containing the .ipynb files to process, searched recursively "
+                                          "and inside .zip/.tar archives")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of notebooks to process in parallel (default: 1, one at a time)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_NOTEBOOK_TIMEOUT,
+                        help="Per-notebook timeout in seconds when running in parallel")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory of the result cache used to skip unchanged notebooks")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="Maximum size of the result cache before old entries are evicted")
+    parser.add_argument("--no-cache", action="store_true", help="Process every notebook without reading or writing the cache")
+    parser.add_argument("--rebuild-cache", action="store_true", help="Ignore cached results and overwrite them")
+    parser.add_argument("--output-format", choices=["dirs", "jsonl"], default="dirs",
+                        help="Write one directory per notebook (dirs) or append to a few JSONL streams (jsonl)")
+    parser.add_argument("--compress", nargs="?", const="gzip", choices=COMPRESSIONS, default=None,
+                        help="Compress the JSON reports, or the JSONL streams with --output-format jsonl, "
+                             "with gzip (default) or zstd (reports only; needs Python 3.14+ or zstandard)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Write the per-notebook JSON reports without indentation")
+    parser.add_argument("--strict-nbformat", action="store_true",
+                        help="Validate every notebook against the nbformat schema (slower)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-stage and per-instruction timings and print a batch summary")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-extract and re-validate the turns that changed since the previous run")
+    parser.add_argument("--server", metavar="URL", nargs="?", const=DEFAULT_SERVICE_URL,
+                        help="Validate on a running validation service (python -m service.server, "
+                             f"default {DEFAULT_SERVICE_URL}); falls back to local processing if none answers")
+    parser.add_argument("--export-table", metavar="PATH",
+                        help="After the run, export all results as one flat table (.parquet, .arrow or .csv)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip the notebooks that batch_journal.jsonl records as finished and unchanged, "
+                             "and redo the rest (per-notebook directories only)")
+    parser.add_argument("--staged", action="store_true",
+                        help="Run the batch as a pipeline of stages (read, parse, validate, write) "
+                             "connected by bounded queues, overlapping disk I/O with validation")
+    parser.add_argument("--stage-workers", metavar="SPEC",
+                        help="Workers per stage with --staged, e.g. read=8,validate=4 "
+                             "(default: 4 for read and write, --jobs for the others)")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="Notebooks each stage's input queue holds with --staged before the stage before it waits")
+    parser.add_argument("--include", metavar="GLOB", action="append",
+                        help="Only process notebooks whose path relative to input_dir matches GLOB "
+                             "(e.g. 'batch-*/*.ipynb'); repeatable")
+    parser.add_argument("--exclude", metavar="GLOB", action="append",
+                        help="Skip notebooks and folders whose relative path matches GLOB; repeatable")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Run the command under python -X importtime and print where its startup time goes")
+    args = parser.parse_args()
+
+    if args.startup_profile:
+        sys.exit(print_startup_profile([os.path.abspath(__file__)] + [a for a in sys.argv[1:] if a != "--startup-profile"]))
+
+    if args.resume and args.output_format != "dirs":
+        parser.error("--resume needs --output-format dirs")
+    if args.compress == "zstd" and (args.output_format != "dirs" or not zstd_available()):
+        parser.error("--compress zstd needs --output-format dirs and Python 3.14+ or the zstandard package")
+
+    stage_workers = None
+    if args.staged or args.stage_workers:
+        from batch_processing.stage_pipeline import parse_stage_workers
+        try:
+            stage_workers = parse_stage_workers(args.stage_workers)
+        except ValueError as e:
+            parser.error(str(e))
+
+    service = None
+    if args.server:
+        service = ValidationServiceClient(args.server)
+        if service.health() is None:
+            print(f"⚠️ No validation service at {args.server}, processing locally")
+            service = None
+
+    cache = None
+    if not args.no_cache and service is None:
+        cache = ResultCache(args.cache_dir, max_bytes=args.cache_size_mb * 1024 * 1024, rebuild=args.rebuild_cache)
+    sink = None
+    if args.output_format == "jsonl":
+        from batch_processing.jsonl_sink import JsonlSink
+        sink = JsonlSink(args.input_dir, compress=args.compress is not None)
+    try:
+        run_batch_processing(args.input_dir, args.input_dir, jobs=args.jobs, timeout=args.timeout,
+                             cache=cache, sink=sink, strict=args.strict_nbformat,
+                             profile=args.profile, incremental=args.incremental, service=service,
+                             stage_workers=stage_workers, queue_size=args.queue_size, resume=args.resume,
+                             include=args.include, exclude=args.exclude,
+                             pretty=not args.compact, compression=args.compress)
+    finally:
+        if sink is not None:
+            sink.close()
+    if args.export_table:
+        from batch_processing.columnar_export import export_output_tree
+        export_output_tree(args.input_dir, args.export_table)
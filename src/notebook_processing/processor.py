@@ -1,30 +1,46 @@
-import nbformat
 import json
 import re
 import os
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional, Union
 import copy
+from notebook_processing.reader import load_notebook, markdown_cells
+
+# Cell header such as **[user]**, **[turn_metadata]** or **[assistant_nova]**
+TAG_PATTERN = re.compile(r"\*\*\[(.*?)\]\*\*")
+JSON_BLOCK_PATTERN = re.compile(r"```(?:json)?\n(.*?)```", re.DOTALL)
 
 def get_cell_text(cell: Dict) -> str:
     """Extract text content from a notebook cell."""
     return ''.join(cell['source']) if isinstance(cell['source'], list) else cell['source']
 
-def detect_tag(cell_text: str) -> Tuple[Optional[str], Optional[str]]:
-    """Detect and return the tag type and model tag from cell text."""
-    match = re.match(r"\*\*\[(.*?)\]\*\*", cell_text.strip())
-    if not match:
-        return None, None
-    tag = match.group(1)
+def classify_tag(tag: str) -> Tuple[Optional[str], Optional[str]]:
+    """Map a cell tag to its tag type and model tag."""
     if tag == "user": return "user", None
     if tag == "turn_metadata": return "metadata", None
     if tag == "assistant": return "assistant", None
     if tag.startswith("assistant_"): return "assistant_model", tag.split("_", 1)[1]
     return None, None
 
+def split_tagged_cell(cell_text: str) -> Tuple[Optional[str], Optional[str], str]:
+    """Return (tag_type, model_tag, text after the tag), checking the **[ prefix before any regex."""
+    text = cell_text.strip()
+    if not text.startswith("**["):
+        return None, None, ""
+    match = TAG_PATTERN.match(text)
+    if not match:
+        return None, None, ""
+    tag_type, model_tag = classify_tag(match.group(1))
+    return tag_type, model_tag, text[match.end():]
+
+def detect_tag(cell_text: str) -> Tuple[Optional[str], Optional[str]]:
+    """Detect and return the tag type and model tag from cell text."""
+    tag_type, model_tag, _ = split_tagged_cell(cell_text)
+    return tag_type, model_tag
+
 def extract_json_from_metadata_cell(source_text: str) -> Dict:
     """Extract JSON data from metadata cell."""
     try:
-        match = re.search(r"```(?:json)?\n(.*?)```", source_text, re.DOTALL)
+        match = JSON_BLOCK_PATTERN.search(source_text)
         if not match: return {}
         json_str = match.group(1).strip()
         return json.loads(json_str)
@@ -65,6 +81,96 @@ def validate_and_fix_consecutive_metadata_items(prev_instr: List[Dict], curr_ins
 
     return list(metadata), change_details
 
+# A tagged markdown cell as (tag_type, model_tag, text after the tag)
+TaggedCell = Tuple[str, Optional[str], str]
+
+def iter_turn_cells(nb: Dict) -> Iterator[List[TaggedCell]]:
+    """
+    Group the tagged markdown cells (the first cell is skipped) into turns: a user cell starts
+    a new turn once the current one has a user, metadata or assistant cell. Model response
+    cells seen before any of those belong to the turn that follows them.
+    """
+    cells = []
+    has_content = False
+    for cell_text in markdown_cells(nb, start=1):
+        tag_type, model_tag, body = split_tagged_cell(cell_text)
+        if not tag_type:
+            continue
+        if tag_type == "user" and has_content:
+            yield cells
+            cells = []
+        cells.append((tag_type, model_tag, body))
+        has_content = has_content or tag_type != "assistant_model"
+    if has_content:
+        yield cells
+
+def extract_turn(cells: List[TaggedCell], turn_idx: int,
+                 prev_instr: Optional[List[Dict]]) -> Tuple[Dict, List[Dict], Optional[List[Dict]]]:
+    """
+    Build one turn from its tagged cells. turn_idx is the 0-based turn number and prev_instr the
+    instructions of the latest metadata cell before the turn, against which instruction changes
+    are reported.
+    return: (turn, metadata change report entries, latest instructions after the turn)
+    """
+    current_turn = {}
+    assistant_models = {}
+    changes = []
+    for tag_type, model_tag, body in cells:
+        if tag_type == "metadata":
+            instruction_data = extract_json_from_metadata_cell(body)
+            curr_instr = instruction_data.get("instructions", [])
+            # The first turn can only add instructions; later turns are compared with the previous metadata
+            if turn_idx == 0:
+                updated_metadata = ["add"]
+                change_details = [{"change": "add", "instruction_id": instr.get("instruction_id", "")}
+                                  for instr in curr_instr]
+            else:
+                updated_metadata, change_details = validate_and_fix_consecutive_metadata_items(prev_instr, curr_instr)
+            prev_instr = curr_instr
+            current_turn["instructions"] = {
+                "instruction_change": updated_metadata,
+                "instructions": curr_instr
+            }
+            changes.append({
+                "turn_index": turn_idx + 1,
+                "changes": change_details
+            })
+            continue
+
+        # Remove any further **[...]** tags from the content, but only run the regex if one is present
+        content = (TAG_PATTERN.sub("", body) if "**[" in body else body).strip()
+        if tag_type == "user":
+            current_turn["prompt"] = content
+        elif tag_type == "assistant":
+            current_turn["response"] = content
+        elif tag_type == "assistant_model":
+            assistant_models[model_tag] = content
+
+    for k, v in assistant_models.items():
+        current_turn[f"{k}_response"] = v
+    return current_turn, changes, prev_instr
+
+def iter_turns(nb: Dict) -> Iterator[Tuple[Dict, List[Dict]]]:
+    """
+    Single pass over the notebook's markdown cells (the first cell is skipped) that yields
+    each turn as soon as it is complete, together with the metadata change report entries
+    ({turn_index, changes}) produced while reading it.
+    """
+    prev_instr = None
+    for turn_idx, cells in enumerate(iter_turn_cells(nb)):
+        turn, changes, prev_instr = extract_turn(cells, turn_idx, prev_instr)
+        yield turn, changes
+
+def build_dialogue(turns: List[Dict], dialogue_id: str) -> Dict:
+    """Wrap extracted turns in the converted dialogue structure."""
+    return {
+        "turns": turns,
+        "dialogue_metadata": {
+            "dialogue_id": dialogue_id,
+            "dialogue_length": len(turns)
+        }
+    }
+
 def process_notebook(file_path: str, dialogue_id: Optional[str] = None) -> Dict:
     """Process a Jupyter notebook and convert it to a structured format of:
     {
@@ -86,124 +192,30 @@ def process_notebook(file_path: str, dialogue_id: Optional[str] = None) -> Dict:
         }
     }
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        nb = nbformat.read(f, as_version=4)
-
-    turns = []
-    current_turn = {}
-    assistant_models = {}
-    instruction_list = []
-    # Skip the first cell
-    for cell in nb['cells'][1:]:
-        if cell['cell_type'] != 'markdown':
-            continue
-        cell_text = get_cell_text(cell)
-        tag_type, model_tag = detect_tag(cell_text)
-        if not tag_type:
-            continue
-        content = re.sub(r"\*\*\[.*?\]\*\*", "", cell_text).strip()
-        
-        if tag_type == "user":
-            if current_turn:
-                for k, v in assistant_models.items():
-                    current_turn[f"{k}_response"] = v
-                turns.append(current_turn)
-                current_turn = {}
-                assistant_models = {}
-            current_turn["prompt"] = content
-        elif tag_type == "metadata":
-            instruction_data = extract_json_from_metadata_cell(cell_text)
-            curr_instr = instruction_data.get("instructions", [])
-            # if the first metadata cell, check if it has only "add", else, pass both previous and current metadata
-            if len(turns) == 0:
-                updated_metadata = ["add"]
-            else:
-                updated_metadata, _ = validate_and_fix_consecutive_metadata_items(instruction_list[-1], curr_instr)
-            instruction_list.append(curr_instr)
-            current_turn["instructions"] = {
-                "instruction_change": updated_metadata,
-                "instructions": curr_instr
-            }
-        elif tag_type == "assistant":
-            current_turn["response"] = content
-        elif tag_type == "assistant_model":
-            assistant_models[model_tag] = content
+    converted, _ = process_notebook_with_metadata_report(file_path, dialogue_id)
+    return converted
 
-    if current_turn:
-        for k, v in assistant_models.items():
-            current_turn[f"{k}_response"] = v
-        turns.append(current_turn)
+def read_notebook(file_path: str, strict: bool = False) -> Dict:
+    """Read and parse a Jupyter notebook once so every pipeline stage can share it."""
+    with open(file_path, "rb") as f:
+        return parse_notebook(f.read(), strict)
 
-    return {
-        "turns": turns,
-        "dialogue_metadata": {
-            "dialogue_id": dialogue_id or os.path.basename(file_path),
-            "dialogue_length": len(turns)
-        }
-    } 
+def parse_notebook(raw: Union[str, bytes], strict: bool = False) -> Dict:
+    """Parse notebook content that has already been read into memory (nbformat-validated if strict)."""
+    return load_notebook(raw, strict)
 
 def process_notebook_with_metadata_report(file_path: str, dialogue_id: Optional[str] = None) -> Tuple[Dict, List[Dict]]:
     """
     Process a Jupyter notebook and return both the structured format and a metadata change report.
     The report is a list of dicts: {turn_index, changes: [ {change, instruction_id}, ... ]}
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        nb = nbformat.read(f, as_version=4)
+    return convert_notebook_with_metadata_report(read_notebook(file_path), dialogue_id or os.path.basename(file_path))
 
+def convert_notebook_with_metadata_report(nb: Dict, dialogue_id: str) -> Tuple[Dict, List[Dict]]:
+    """Same as process_notebook_with_metadata_report, but for an already parsed notebook."""
     turns = []
-    current_turn = {}
-    assistant_models = {}
-    instruction_list = []
     metadata_report = []
-    turn_idx = 0
-    for cell in nb['cells'][1:]:
-        if cell['cell_type'] != 'markdown':
-            continue
-        cell_text = get_cell_text(cell)
-        tag_type, model_tag = detect_tag(cell_text)
-        if not tag_type:
-            continue
-        content = re.sub(r"\*\*\[.*?\]\*\*", "", cell_text).strip()
-        if tag_type == "user":
-            if current_turn:
-                for k, v in assistant_models.items():
-                    current_turn[f"{k}_response"] = v
-                turns.append(current_turn)
-                current_turn = {}
-                assistant_models = {}
-                turn_idx += 1
-            current_turn["prompt"] = content
-        elif tag_type == "metadata":
-            instruction_data = extract_json_from_metadata_cell(cell_text)
-            curr_instr = instruction_data.get("instructions", [])
-            if len(turns) == 0:
-                updated_metadata = ["add"]
-                change_details = [{"change": "add", "instruction_id": instr.get("instruction_id", "")}
-                                 for instr in curr_instr]
-            else:
-                updated_metadata, change_details = validate_and_fix_consecutive_metadata_items(
-                    instruction_list[-1], curr_instr)
-            instruction_list.append(curr_instr)
-            current_turn["instructions"] = {
-                "instruction_change": updated_metadata,
-                "instructions": curr_instr
-            }
-            metadata_report.append({
-                "turn_index": turn_idx + 1,
-                "changes": change_details
-            })
-        elif tag_type == "assistant":
-            current_turn["response"] = content
-        elif tag_type == "assistant_model":
-            assistant_models[model_tag] = content
-    if current_turn:
-        for k, v in assistant_models.items():
-            current_turn[f"{k}_response"] = v
-        turns.append(current_turn)
-    return {
-        "turns": turns,
-        "dialogue_metadata": {
-            "dialogue_id": dialogue_id or os.path.basename(file_path),
-            "dialogue_length": len(turns)
-        }
-    }, metadata_report 
\ No newline at end of file
+    for turn, changes in iter_turns(nb):
+        turns.append(turn)
+        metadata_report.extend(changes)
+    return build_dialogue(turns, dialogue_id), metadata_report
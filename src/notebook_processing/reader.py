@@ -0,0 +1,33 @@
+import json
+from typing import Dict, Iterator, Union
+
+
+def load_notebook(raw: Union[str, bytes], strict: bool = False) -> Dict:
+    """
+    Parse raw .ipynb content into a plain dict.
+    By default this is a bare json.loads; nbformat (slow to import and to validate) is only
+    used when strict=True, which raises on notebooks that fail the nbformat schema, or when
+    an old (pre-v4) notebook has to be upgraded.
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    if strict:
+        import nbformat
+        nb = nbformat.reads(raw, as_version=4)
+        nbformat.validate(nb)
+        return nb
+
+    nb = json.loads(raw)
+    if nb.get("nbformat", 4) < 4:
+        import nbformat
+        return nbformat.reads(raw, as_version=4)
+    return nb
+
+
+def markdown_cells(nb: Dict, start: int = 0) -> Iterator[str]:
+    """Yield the joined source of every markdown cell in nb['cells'][start:]."""
+    for cell in nb.get("cells", [])[start:]:
+        if cell.get("cell_type") != "markdown":
+            continue
+        source = cell.get("source", "")
+        yield source if isinstance(source, str) else "".join(source)
@@ -0,0 +1,3 @@
+"""
+Client for the Nova model behind the LLM gateway, and a local stub of the gateway for testing.
+"""
@@ -0,0 +1,319 @@
+import os
+import ssl
+import json
+import time
+import queue
+import random
+import asyncio
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from nova.response_cache import NovaResponseCache, ReplayMiss, request_key, DEFAULT_NOVA_CACHE_DIR
+
+NOVA_URL = "https://kong.turing.com/api/llm-gateway"
+NOVA_MODEL = "us.amazon.nova-premier-v1:0"
+NOVA_PROVIDER = "Amazon"
+DEFAULT_SYSTEM_CONTENT = "You are a chatbot"
+DEFAULT_PARAMS = {"temperature": 0.7, "seed": 42, "top_p": 1, "top_k": 40, "max_tokens": 1000}
+
+DEFAULT_MAX_CONNECTIONS = 8
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 16.0
+# Gateway statuses worth retrying: rate limited or a transient server-side failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+SUCCESS_STATUSES = (200, 201)
+
+
+class NovaError(Exception):
+    """The gateway answered with a non-success status (after any retries)."""
+
+    def __init__(self, status: int, text: str):
+        super().__init__(f"{status} - {text}")
+        self.status = status
+        self.text = text
+
+
+def build_payload(user_content: str, system_content: str = DEFAULT_SYSTEM_CONTENT,
+                  messages: Optional[List[Dict[str, str]]] = None, model: str = NOVA_MODEL,
+                  **params: Any) -> Dict[str, Any]:
+    """
+    Gateway request body. messages, when given, replaces the default system + user pair.
+    params override DEFAULT_PARAMS (temperature, seed, top_p, top_k, max_tokens).
+    """
+    if messages is None:
+        messages = [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": user_content},
+        ]
+    return {
+        "modelName": model,
+        "provider": NOVA_PROVIDER,
+        "messages": messages,
+        "params": {**DEFAULT_PARAMS, **params},
+        "images": [],
+    }
+
+
+def nova_headers() -> Dict[str, str]:
+    """Gateway credentials, read from the environment on every call so they can be rotated."""
+    return {
+        "x-api-key": os.getenv("TURING_API_KEY") or "",
+        "x-api-gw-key": os.getenv("TURING_API_GW_KEY") or "",
+        "Authorization": os.getenv("TURING_AUTH_TOKEN") or "",
+        "Content-Type": "application/json",
+    }
+
+
+def response_content(data: Dict[str, Any]) -> str:
+    return data["choices"][0]["message"]["content"]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` requests per second on average, with bursts of up to
+    `capacity` requests. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token. return: float - seconds spent waiting for it"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one host. At most max_connections requests are in flight
+    at once; idle connections are reused most recently used first.
+    """
+
+    def __init__(self, url: str, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT):
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.timeout = timeout
+        self.ssl_context = ssl.create_default_context() if self.https else None
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def post(self, body: bytes, headers: Dict[str, str]) -> Tuple[int, Optional[str], bytes]:
+        """POST body to the pool's URL. return: (status, Retry-After header, response body)"""
+        with self._slots:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._connect(), False
+            while True:
+                try:
+                    conn.request("POST", self.path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    conn.close()
+                    # The server closed an idle keep-alive connection: retry once on a fresh one
+                    if not reused:
+                        raise
+                    conn, reused = self._connect(), False
+                except Exception:
+                    conn.close()
+                    raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._idle.put(conn)
+            return response.status, response.getheader("Retry-After"), data
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class NovaClient:
+    """
+    Synchronous gateway client over a keep-alive connection pool.
+    Requests are rate limited by an optional token bucket (rate_limit requests per second) and
+    retried with full-jitter exponential backoff on 429/5xx and connection errors, honouring
+    the gateway's Retry-After header. With a NovaResponseCache, successful responses are stored
+    and identical requests (same model, messages and params) are answered from it.
+    Safe to share between threads.
+    """
+
+    def __init__(self, url: str = NOVA_URL, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 rate_limit: Optional[float] = None, burst: Optional[float] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 cache: Optional[NovaResponseCache] = None):
+        self.url = url
+        self.cache = cache
+        self.max_connections = max_connections
+        self.pool = ConnectionPool(url, max_connections, timeout)
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {"requests": 0, "retries": 0, "errors": 0, "rate_limited_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, field: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            self.stats[field] += amount
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        try:
+            if retry_after is not None:
+                return min(self.backoff_max, float(retry_after))
+        except ValueError:
+            pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send one gateway request and return its decoded JSON response.
+        Raises NovaError for a non-success status, or the last connection error, once retries run out.
+        In replay mode a request missing from the cache raises ReplayMiss without being sent.
+        """
+        key = None
+        if self.cache is not None:
+            key = request_key(payload)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            if self.cache.replay:
+                raise ReplayMiss(f"No recorded Nova response for request {key}")
+        body = json.dumps(payload).encode("utf-8")
+        for attempt in range(self.max_retries + 1):
+            if self.bucket is not None:
+                self._count("rate_limited_seconds", self.bucket.acquire())
+            self._count("requests")
+            retry_after = None
+            try:
+                status, retry_after, data = self.pool.post(body, nova_headers())
+            except (OSError, http.client.HTTPException):
+                if attempt == self.max_retries:
+                    self._count("errors")
+                    raise
+            else:
+                if status in SUCCESS_STATUSES:
+                    response = json.loads(data)
+                    if key is not None:
+                        self.cache.put(key, response)
+                    return response
+                if status not in RETRY_STATUSES or attempt == self.max_retries:
+                    self._count("errors")
+                    raise NovaError(status, data.decode("utf-8", errors="replace"))
+            self._count("retries")
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def complete(self, user_content: str, **kwargs: Any) -> str:
+        """Response text for one prompt; kwargs are passed to build_payload."""
+        return response_content(self.chat(build_payload(user_content, **kwargs)))
+
+    def complete_many(self, prompts: Sequence[str], concurrency: Optional[int] = None,
+                      **kwargs: Any) -> List[Any]:
+        """
+        Complete many prompts concurrently, up to `concurrency` at a time (default: the pool size).
+        return: List - the response text, or the exception raised, for each prompt in order
+        """
+        def complete_or_error(prompt: str) -> Any:
+            try:
+                return self.complete(prompt, **kwargs)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=concurrency or self.max_connections) as executor:
+            return list(executor.map(complete_or_error, prompts))
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class AsyncNovaClient:
+    """
+    asyncio front-end of NovaClient: requests run on a private thread pool of `concurrency`
+    threads sharing the client's connection pool, rate limiter and retry policy, so the event
+    loop never blocks on the network.
+    """
+
+    def __init__(self, client: Optional[NovaClient] = None, concurrency: Optional[int] = None, **client_kwargs: Any):
+        self.client = client or NovaClient(**client_kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency or self.client.max_connections)
+
+    async def chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.client.chat, payload)
+
+    async def complete(self, user_content: str, **kwargs: Any) -> str:
+        return response_content(await self.chat(build_payload(user_content, **kwargs)))
+
+    async def complete_many(self, prompts: Sequence[str], **kwargs: Any) -> List[Any]:
+        """Like NovaClient.complete_many: the response text or the exception for each prompt."""
+        return await asyncio.gather(*(self.complete(p, **kwargs) for p in prompts), return_exceptions=True)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.client.close()
+
+    async def __aenter__(self) -> "AsyncNovaClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+_default_client: Optional[NovaClient] = None
+_default_client_lock = threading.Lock()
+
+
+def default_client() -> NovaClient:
+    """
+    Process-wide client, created on first use so its connections and cache survive Streamlit
+    reruns. Configured from the environment:
+    NOVA_URL (default NOVA_URL), NOVA_RATE_LIMIT (requests per second),
+    NOVA_CACHE_MODE (read-write, record, replay or off; default read-write),
+    NOVA_CACHE_DIR and NOVA_CACHE_TTL (seconds).
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            rate_limit = os.getenv("NOVA_RATE_LIMIT")
+            cache_mode = os.getenv("NOVA_CACHE_MODE", "read-write")
+            cache = None
+            if cache_mode != "off":
+                cache_kwargs = {"ttl": float(os.environ["NOVA_CACHE_TTL"])} if os.getenv("NOVA_CACHE_TTL") else {}
+                cache = NovaResponseCache(os.getenv("NOVA_CACHE_DIR", DEFAULT_NOVA_CACHE_DIR), cache_mode, **cache_kwargs)
+            _default_client = NovaClient(os.getenv("NOVA_URL", NOVA_URL),
+                                         rate_limit=float(rate_limit) if rate_limit else None, cache=cache)
+        return _default_client
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_NOVA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "task_parser_nova")
+DEFAULT_NOVA_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_NOVA_CACHE_TTL = 7 * 24 * 3600.0
+# Entries written between two automatic evictions
+PRUNE_INTERVAL = 256
+
+# read-write: serve stored responses, call the gateway on a miss and store the answer
+# record: always call the gateway and overwrite the stored answer
+# replay: serve stored responses only; a miss raises ReplayMiss instead of calling the gateway
+CACHE_MODES = ("read-write", "record", "replay")
+
+
+class ReplayMiss(LookupError):
+    """Replay mode was asked for a request that was never recorded."""
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Hash of everything that decides a gateway answer: model, provider, messages and params."""
+    canonical = json.dumps([payload.get("modelName"), payload.get("provider"), payload.get("messages"),
+                            payload.get("params"), payload.get("images") or []],
+                           sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class NovaResponseCache:
+    """
+    On-disk cache of gateway responses keyed by request_key. Entries older than ttl seconds are
+    treated as misses (except in replay mode, which serves every recording), and the oldest
+    entries are evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_NOVA_CACHE_DIR, mode: str = "read-write",
+                 ttl: Optional[float] = DEFAULT_NOVA_CACHE_TTL,
+                 max_bytes: int = DEFAULT_NOVA_CACHE_MAX_BYTES):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown Nova cache mode {mode!r}, expected one of {', '.join(CACHE_MODES)}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stored": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == "replay"
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            self.stats[field] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expire_before(self) -> Optional[float]:
+        """Entries created before this time are expired; None when nothing expires."""
+        if self.ttl is None or self.replay:
+            return None
+        return time.time() - self.ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored response for key, or None on a miss (always a miss in record mode)."""
+        if self.mode == "record":
+            self._count("misses")
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        expire_before = self._expire_before()
+        if expire_before is not None and entry["created"] < expire_before:
+            self._count("expired")
+            return None
+        self._count("hits")
+        return entry["response"]
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """Store a response atomically; every PRUNE_INTERVAL entries the cache is pruned."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "response": response}, f,
+                          ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self.stats["stored"] += 1
+            prune = self.stats["stored"] % PRUNE_INTERVAL == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Remove expired entries, then the oldest ones until the cache fits in max_bytes;
+        return how many were removed. An entry's mtime is its creation time.
+        """
+        entries, total = [], 0
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        expire_before = self._expire_before()
+        removed = 0
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes and (expire_before is None or mtime >= expire_before):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
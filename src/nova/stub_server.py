@@ -0,0 +1,139 @@
+"""
+Local stand-in for the LLM gateway, returning responses of the same shape as the real one.
+Used to exercise and load-test the Nova client without network access or API keys.
+
+Run from the src directory:
+
+    python -m nova.stub_server [--port 8765] [--latency 0.05] [--error-rate 0.1]
+    python -m nova.stub_server --load-test 500 [--concurrency 16] [--rate-limit 200]
+    python -m nova.stub_server --load-test 500 --cache-dir /tmp/nova_cache [--cache-mode replay]
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from nova.client import NovaClient, AsyncNovaClient
+from nova.response_cache import NovaResponseCache, CACHE_MODES
+
+
+def stub_response(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Gateway-shaped response echoing the last user message of the request."""
+    user_messages = [m.get("content", "") for m in payload.get("messages", []) if m.get("role") == "user"]
+    content = f"Stub response to: {user_messages[-1] if user_messages else ''}"
+    return {
+        "id": f"stub-{random.getrandbits(32):08x}",
+        "model": payload.get("modelName"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": sum(len(m.get("content", "").split()) for m in payload.get("messages", [])),
+                  "completion_tokens": len(content.split())},
+    }
+
+
+class StubGatewayHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this each response waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.stats["requests"] += 1
+            fail = server.random.random() < server.error_rate
+        if server.latency:
+            time.sleep(server.latency)
+        if fail:
+            status = server.random.choice([429, 503])
+            self._send(status, {"error": "stub failure"}, {"Retry-After": "0"} if status == 429 else {})
+            with server.lock:
+                server.stats["failures"] += 1
+            return
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._send(400, {"error": "invalid JSON"})
+            return
+        self._send(200, stub_response(payload))
+
+    def _send(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        encoded = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                      error_rate: float = 0.0, seed: Optional[int] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Serve the stub gateway from a background thread. Each request waits `latency` seconds and
+    fails with 429 or 503 with probability error_rate. Port 0 picks a free port.
+    return: (server, url) - call server.shutdown() when done; server.stats counts requests
+    """
+    server = ThreadingHTTPServer((host, port), StubGatewayHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.random = random.Random(seed)
+    server.lock = threading.Lock()
+    server.stats = {"requests": 0, "failures": 0}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api/llm-gateway"
+
+
+def run_load_test(url: str, requests: int, concurrency: int, rate_limit: Optional[float] = None,
+                  cache: Optional[NovaResponseCache] = None) -> Dict[str, Any]:
+    """Send `requests` prompts through the async client and report throughput, retries and cache hits."""
+    client = NovaClient(url, max_connections=concurrency, rate_limit=rate_limit, backoff_base=0.01, cache=cache)
+
+    async def run() -> list:
+        async with AsyncNovaClient(client, concurrency) as async_client:
+            return await async_client.complete_many([f"prompt {i}" for i in range(requests)])
+
+    started = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    failed = sum(isinstance(r, Exception) for r in results)
+    return {"prompts": requests, "failed": failed, "seconds": round(elapsed, 3),
+            "prompts_per_second": round(requests / elapsed, 1), **client.stats,
+            **({f"cache_{k}": v for k, v in cache.stats.items()} if cache is not None else {})}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the LLM gateway.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (0 picks a free one)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each response takes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/503")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the failure injection")
+    parser.add_argument("--load-test", type=int, metavar="N", help="Send N requests through the client, then exit")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests during the load test")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Client requests per second during the load test")
+    parser.add_argument("--cache-dir", default=None, help="Nova response cache used during the load test")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default="read-write", help="Mode of the response cache")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, args.latency, args.error_rate, args.seed)
+    if args.load_test:
+        cache = NovaResponseCache(args.cache_dir, args.cache_mode) if args.cache_dir else None
+        report = run_load_test(url, args.load_test, args.concurrency, args.rate_limit, cache)
+        server.shutdown()
+        print(f"📊 Load test: {json.dumps(report)}")
+        print(f"📊 Stub server: {json.dumps(server.stats)}")
+    else:
+        print(f"✅ Stub gateway listening on {url} (set NOVA_URL to use it from the app)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
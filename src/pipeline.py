@@ -0,0 +1,415 @@
+"""
+In-memory conversion and validation pipeline for a single notebook.
+
+The notebook is parsed once and the parsed structure is handed from stage to stage:
+conversion -> schema check -> instruction validation. Writing the per-notebook reports
+to disk is an optional sink at the end rather than a hand-off between stages.
+
+In incremental mode every turn gets a key hashing its cells and the instructions it is
+compared with, and a turn_manifest.json of those keys is written next to the reports.
+On the next run, turns whose key is in the manifest are taken from the previous reports
+instead of being extracted and validated again.
+"""
+import os
+import json
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from notebook_processing.processor import parse_notebook, iter_turn_cells, extract_turn, build_dialogue
+from validators.validator import (CompiledInstruction, compile_instruction, check_contradicting_instructions,
+                                  extract_notebook_sections, notebook_schema_logs)
+from validators.response_profile import ResponseProfile
+from validators.batch_validator import validate_pairs
+from validators.validation_memo import ValidationMemo, VALIDATION_MEMO, freeze_instruction, response_digest
+from data_loader import template_json
+from batch_processing.result_cache import rules_fingerprint
+from batch_processing.checkpoint_journal import content_hash
+from timing import PipelineTimer, stage
+from json_io import atomic_write, write_json, read_json, remove_json
+
+# Names of the files written by write_notebook_outputs
+CONVERTED_OUTPUT_FILE = "converted_output.json"
+SCHEMA_LOG_FILE = "notebook_validation.log"
+METADATA_REPORT_FILE = "metadata_change_report.json"
+VALIDATION_REPORT_FILE = "validation_report.json"
+TIMINGS_FILE = "timings.json"
+TURN_MANIFEST_FILE = "turn_manifest.json"
+
+
+def validate_turn(turn: Dict, turn_index: int, dialogue_id: str, timer: Optional[PipelineTimer] = None,
+                  memo: Optional[ValidationMemo] = VALIDATION_MEMO) -> List[Dict]:
+    """
+    Validate every response of one turn against the turn's instructions (timing each check if a timer is given).
+    A (response, instruction) pair already checked in this process, e.g. a carried-over instruction or
+    the same text under several response labels, is answered from memo without rescanning the text.
+    """
+    instructions = turn.get("instructions", {})
+    instruction_list = [inst for inst in instructions.get("instructions", []) if inst.get("instruction_id")]
+    all_responses = {k: v for k, v in turn.items() if k.endswith("_response") or k == "response"}
+    # Each instruction is compiled at most once per turn, and only if some response misses the memo
+    checks: List[Optional[CompiledInstruction]] = [None] * len(instruction_list)
+    frozen = [freeze_instruction(inst) for inst in instruction_list] if memo is not None else None
+    hits = 0
+
+    results = []
+    for label, response in all_responses.items():
+        # Every check reads the same lazily computed features of the response
+        profile = None
+        digest = response_digest(response) if memo is not None else None
+        turn_results = []
+        for i, inst in enumerate(instruction_list):
+            outcome = memo.get((digest, frozen[i])) if memo is not None else None
+            if outcome is not None:
+                hits += 1
+            else:
+                check = checks[i]
+                if check is None:
+                    check = checks[i] = compile_instruction(inst)
+                if profile is None:
+                    profile = ResponseProfile(response)
+                if timer is None:
+                    outcome = check(profile)
+                else:
+                    outcome = timer.time_instruction(check.instruction_id, check, profile)
+                if memo is not None:
+                    memo.put((digest, frozen[i]), outcome)
+            valid, message = outcome
+            turn_results.append({
+                "instruction": inst["instruction_id"],
+                "status": "Passed" if valid else "Failed",
+                "message": message
+            })
+
+        results.append({
+            "dialogue_id": dialogue_id,
+            "turn_index": turn_index,
+            "response_type": label,
+            "prompt": turn["prompt"][:100],
+            "results": turn_results
+        })
+    if timer is not None and memo is not None:
+        timer.count("memo_hits", hits)
+        timer.count("memo_misses", len(instruction_list) * len(all_responses) - hits)
+    return results
+
+
+def validate_cell(response: str, instructions: Any) -> Dict:
+    """
+    Validate one assistant response against a turn_metadata instructions object, for the single
+    cell view of the Streamlit app and the validation service.
+    return: Dict - {"response": first 100 characters, "results": [...]}, or {"error": message}
+    for instructions that are malformed or contradicting
+    """
+    if not isinstance(instructions, dict):
+        return {"error": "Instructions must be a JSON object"}
+    if "metadata" not in instructions or "instructions" not in instructions:
+        return {"error": "Instructions must contain 'metadata' and 'instructions' fields"}
+    if not isinstance(instructions["metadata"], list):
+        return {"error": "'metadata' must be a list"}
+    if not isinstance(instructions["instructions"], list):
+        return {"error": "'instructions' must be a list"}
+    for instruction in instructions["instructions"]:
+        if not isinstance(instruction, dict):
+            return {"error": "Each instruction must be an object"}
+        if "instruction_id" not in instruction:
+            return {"error": "Each instruction must have an 'instruction_id' field"}
+    contradiction_errors = check_contradicting_instructions(instructions["instructions"])
+    if contradiction_errors:
+        return {"error": "Contradicting instructions found: " + str(contradiction_errors)}
+
+    profile = ResponseProfile(response)
+    results = []
+    for instruction in instructions["instructions"]:
+        valid, message = compile_instruction(instruction)(profile)
+        results.append({
+            "instruction": instruction["instruction_id"],
+            "status": "Passed" if valid else "Failed",
+            "message": message
+        })
+    return {
+        "response": response[:100] + "..." if len(response) > 100 else response,
+        "results": results
+    }
+
+
+def validate_dialogues(data: Any, timer: Optional[PipelineTimer] = None) -> List[Dict]:
+    """Validate every response of every turn against the turn's instructions."""
+    dialogues = [data] if isinstance(data, dict) else data
+    results = []
+
+    for d_index, dialogue in enumerate(dialogues):
+        dialogue_id = dialogue.get("dialogue_metadata", {}).get("dialogue_id", f"dialogue_{d_index}")
+        for t_index, turn in enumerate(dialogue["turns"]):
+            results.extend(validate_turn(turn, t_index + 1, dialogue_id, timer))
+
+    return results
+
+
+def validate_corpus(data: Any) -> List[Dict]:
+    """
+    Same report as validate_dialogues, but every (response, instruction) pair of the corpus is
+    collected first and validated in bulk, grouped by instruction type (see validate_pairs).
+    """
+    dialogues = [data] if isinstance(data, dict) else data
+    results, pairs = [], []
+    for d_index, dialogue in enumerate(dialogues):
+        dialogue_id = dialogue.get("dialogue_metadata", {}).get("dialogue_id", f"dialogue_{d_index}")
+        for t_index, turn in enumerate(dialogue["turns"]):
+            instruction_list = [inst for inst in turn.get("instructions", {}).get("instructions", [])
+                                if inst.get("instruction_id")]
+            for label, response in turn.items():
+                if not (label.endswith("_response") or label == "response"):
+                    continue
+                turn_results = [{"instruction": inst["instruction_id"]} for inst in instruction_list]
+                pairs.extend((response, inst) for inst in instruction_list)
+                results.append({
+                    "dialogue_id": dialogue_id,
+                    "turn_index": t_index + 1,
+                    "response_type": label,
+                    "prompt": turn["prompt"][:100],
+                    "results": turn_results
+                })
+
+    outcomes = iter(validate_pairs(pairs))
+    for entry in results:
+        for turn_result in entry["results"]:
+            valid, message = next(outcomes)
+            turn_result["status"] = "Passed" if valid else "Failed"
+            turn_result["message"] = message
+    return results
+
+
+def turn_key(cells: List, turn_idx: int, prev_instr: Optional[List[Dict]]) -> str:
+    """
+    Hash of everything a turn's conversion and validation depend on: its tagged cells, whether
+    it is the first turn and the instructions its instruction_change is computed against.
+    """
+    # Canonical stdlib encoding, so the key is the same whichever JSON backend json_io uses
+    canonical = json.dumps([turn_idx == 0, prev_instr, cells], sort_keys=True, ensure_ascii=False,
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def load_previous_turns(output_dir: str, dialogue_id: str) -> Dict[str, Dict]:
+    """
+    The turns of the previous incremental run in output_dir, keyed by turn key, as
+    {turn, changes, validation}. Empty when there is no usable previous run: no manifest,
+    another dialogue_id, or conversion/validation rules that changed since.
+    """
+    try:
+        manifest = read_json(os.path.join(output_dir, TURN_MANIFEST_FILE))
+        if manifest["dialogue_id"] != dialogue_id or manifest["rules"] != rules_fingerprint():
+            return {}
+        turns = read_json(os.path.join(output_dir, CONVERTED_OUTPUT_FILE))["turns"]
+        metadata_report = read_json(os.path.join(output_dir, METADATA_REPORT_FILE))
+        validation_report = read_json(os.path.join(output_dir, VALIDATION_REPORT_FILE))
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+    changes, validation = defaultdict(list), defaultdict(list)
+    for entry in metadata_report:
+        changes[entry["turn_index"]].append(entry)
+    for entry in validation_report:
+        validation[entry["turn_index"]].append(entry)
+    return {key: {"turn": turn, "changes": changes[i + 1], "validation": validation[i + 1]}
+            for i, (key, turn) in enumerate(zip(manifest["turns"], turns))}
+
+
+def convert_parsed_notebook(nb: Dict, dialogue_id: str, timer: Optional[PipelineTimer] = None,
+                            previous_turns: Optional[Dict[str, Dict]] = None) -> Dict:
+    """
+    Conversion stage: extract every turn of a parsed notebook and its metadata changes.
+    With previous_turns (see load_previous_turns) unchanged turns are reused instead of
+    re-extracted, along with their validation entries.
+    return: Dict - {turns, metadata_report, reused_validation, turn_keys}, where
+            reused_validation[i] is None for every turn the validation stage must check
+    """
+    turns, metadata_report, reused_validation, turn_keys = [], [], [], []
+    prev_instr = None
+    with stage(timer, "convert"):
+        for cells in iter_turn_cells(nb):
+            turn_idx = len(turns)
+            previous = None
+            if previous_turns is not None:
+                turn_keys.append(turn_key(cells, turn_idx, prev_instr))
+                previous = previous_turns.get(turn_keys[-1])
+            if previous is None:
+                turn, changes, prev_instr = extract_turn(cells, turn_idx, prev_instr)
+                reused_validation.append(None)
+            else:
+                # Only the position of a reused turn can have changed
+                turn = previous["turn"]
+                changes = [dict(entry, turn_index=turn_idx + 1) for entry in previous["changes"]]
+                if "instructions" in turn:
+                    prev_instr = turn["instructions"]["instructions"]
+                reused_validation.append([dict(entry, turn_index=turn_idx + 1) for entry in previous["validation"]])
+            turns.append(turn)
+            metadata_report.extend(changes)
+    return {"turns": turns, "metadata_report": metadata_report, "reused_validation": reused_validation,
+            "turn_keys": turn_keys if previous_turns is not None else None}
+
+
+def validate_converted_notebook(conversion: Dict, dialogue_id: str, timer: Optional[PipelineTimer] = None) -> List[Dict]:
+    """Validation stage: the validation report of every converted turn that was not reused."""
+    validation_report = []
+    with stage(timer, "validate"):
+        for turn_idx, (turn, reused) in enumerate(zip(conversion["turns"], conversion["reused_validation"])):
+            if reused is None:
+                validation_report.extend(validate_turn(turn, turn_idx + 1, dialogue_id, timer))
+            else:
+                validation_report.extend(reused)
+    return validation_report
+
+
+def schema_check_notebook(nb: Dict, timer: Optional[PipelineTimer] = None) -> List[str]:
+    """Schema stage: the notebook_validation.log lines of a parsed notebook."""
+    with stage(timer, "schema_check"):
+        return notebook_schema_logs(extract_notebook_sections(nb), template_json)
+
+
+def assemble_result(dialogue_id: str, conversion: Dict, schema_log: List[str], validation_report: List[Dict]) -> Dict:
+    """The pipeline result of a notebook from the output of its conversion, schema and validation stages."""
+    result = {
+        "dialogue_id": dialogue_id,
+        "converted": build_dialogue(conversion["turns"], dialogue_id),
+        "metadata_report": conversion["metadata_report"],
+        "schema_log": schema_log,
+        "validation_report": validation_report
+    }
+    if conversion["turn_keys"] is not None:
+        reused = sum(entries is not None for entries in conversion["reused_validation"])
+        result["turn_manifest"] = {"dialogue_id": dialogue_id, "rules": rules_fingerprint(),
+                                   "turns": conversion["turn_keys"], "reused": reused}
+    return result
+
+
+def process_parsed_notebook(nb: Dict, dialogue_id: str, timer: Optional[PipelineTimer] = None,
+                            previous_turns: Optional[Dict[str, Dict]] = None) -> Dict:
+    """
+    Run every stage on an already parsed notebook: conversion, validation, schema check.
+    With previous_turns (see load_previous_turns) the run is incremental: unchanged turns are
+    reused instead of re-extracted and re-validated, and the result gets a "turn_manifest".
+    return: Dict - {dialogue_id, converted, metadata_report, schema_log, validation_report}
+    """
+    conversion = convert_parsed_notebook(nb, dialogue_id, timer, previous_turns)
+    validation_report = validate_converted_notebook(conversion, dialogue_id, timer)
+    return assemble_result(dialogue_id, conversion, schema_check_notebook(nb, timer), validation_report)
+
+
+def write_notebook_outputs(result: Dict, output_dir: str, pretty: bool = True,
+                           compression: Optional[str] = None) -> List[str]:
+    """
+    Disk sink: write the four per-notebook files produced by the batch CLI, each atomically.
+    The JSON files are indented if pretty, and compressed with compression ("gzip" or "zstd",
+    adding .gz or .zst to their names) if given; see json_io.
+    return: List[str] - the paths written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+
+    converted_path = write_json(os.path.join(output_dir, CONVERTED_OUTPUT_FILE), result["converted"],
+                                pretty, compression)
+    written.append(converted_path)
+    print(f"✅ Converted JSON saved to: {converted_path}")
+
+    schema_path = os.path.join(output_dir, SCHEMA_LOG_FILE)
+    with atomic_write(schema_path) as f:
+        f.writelines(line + '\n' for line in result["schema_log"])
+    written.append(schema_path)
+
+    written.append(write_json(os.path.join(output_dir, METADATA_REPORT_FILE), result["metadata_report"],
+                              pretty, compression))
+
+    validation_path = write_json(os.path.join(output_dir, VALIDATION_REPORT_FILE), result["validation_report"],
+                                 pretty, compression)
+    written.append(validation_path)
+    print(f"✅ Validation complete. Log saved to: {validation_path}")
+
+    if "timings" in result:
+        written.append(write_json(os.path.join(output_dir, TIMINGS_FILE), result["timings"], pretty, compression))
+
+    manifest_path = os.path.join(output_dir, TURN_MANIFEST_FILE)
+    if "turn_manifest" in result:
+        written.append(write_json(manifest_path, result["turn_manifest"], pretty, compression))
+    else:
+        # The reports were just rewritten, so a manifest of an earlier run no longer describes them
+        remove_json(manifest_path)
+    return written
+
+
+def lookup_cached_result(cache, raw: bytes, input_path: str, dialogue_id: str, strict: bool = False,
+                         incremental: bool = False, timer: Optional[PipelineTimer] = None):
+    """
+    Look a notebook's raw content up in a ResultCache (or none).
+    return: (cache key or None, cached result or None)
+    """
+    if cache is None:
+        return None, None
+    with stage(timer, "cache_lookup"):
+        key = cache.key(raw, dialogue_id, strict)
+        result = cache.get(key)
+        if incremental and result is not None and "turn_manifest" not in result:
+            # Stored by a non-incremental run: without turn keys the next run could not reuse anything
+            result = None
+    if result is not None:
+        print(f"♻️ Reusing cached results for: {os.path.basename(input_path)}")
+    return key, result
+
+
+def report_reused_turns(result: Dict, input_path: str) -> None:
+    reused = result.get("turn_manifest", {}).get("reused")
+    if reused:
+        print(f"♻️ Reused {reused}/{len(result['converted']['turns'])} unchanged turns of: {os.path.basename(input_path)}")
+
+
+def run_notebook_pipeline(input_path: str, dialogue_id: Optional[str] = None,
+                          output_dir: Optional[str] = None, cache=None, strict: bool = False,
+                          profile: bool = False, incremental: bool = False,
+                          raw: Optional[bytes] = None, pretty: bool = True,
+                          compression: Optional[str] = None) -> Dict:
+    """
+    Parse a notebook once, run conversion, schema check and validation in memory and,
+    if output_dir is given, write the per-notebook reports there.
+    With a ResultCache, an unchanged notebook reuses its stored result instead of being reprocessed.
+    With strict=True the notebook must also pass nbformat schema validation.
+    With profile=True the result gets a "timings" report (written as timings.json) and the
+    per-call "timing_samples" used for batch percentiles.
+    With incremental=True and an output_dir, only the turns that changed since the previous
+    incremental run into output_dir are re-extracted and re-validated.
+    With an output_dir the result also lists the files written there under "outputs", and gives
+    the notebook's content hash for the checkpoint journal under "content_hash".
+    If the notebook's content is passed as raw (e.g. an archive member), input_path only names it.
+    pretty and compression set the format of the written JSON files (see write_notebook_outputs).
+    """
+    timer = PipelineTimer() if profile else None
+    dialogue_id = dialogue_id or os.path.basename(input_path)
+    if raw is None:
+        with stage(timer, "read"):
+            with open(input_path, "rb") as f:
+                raw = f.read()
+
+    key, result = lookup_cached_result(cache, raw, input_path, dialogue_id, strict, incremental, timer)
+    if result is None:
+        with stage(timer, "parse"):
+            nb = parse_notebook(raw, strict)
+        previous_turns = None
+        if incremental and output_dir is not None:
+            with stage(timer, "load_previous"):
+                previous_turns = load_previous_turns(output_dir, dialogue_id)
+        result = process_parsed_notebook(nb, dialogue_id, timer, previous_turns)
+        report_reused_turns(result, input_path)
+        if cache is not None:
+            with stage(timer, "cache_store"):
+                cache.put(key, result)
+
+    if timer is not None:
+        # timings.json is written with the stages so far; the returned report also covers the write
+        result["timings"] = timer.report()
+    if output_dir is not None:
+        with stage(timer, "write"):
+            result["outputs"] = write_notebook_outputs(result, output_dir, pretty, compression)
+        result["content_hash"] = content_hash(raw)
+    if timer is not None:
+        result["timings"] = timer.report()
+        result["timing_samples"] = timer.samples()
+    return result
@@ -0,0 +1,3 @@
+"""
+Long-running validation service and its client.
+"""
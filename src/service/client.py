@@ -0,0 +1,111 @@
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+from json_io import dumps, loads
+
+if TYPE_CHECKING:
+    import http.client
+
+DEFAULT_SERVICE_URL = "http://127.0.0.1:8750"
+# Notebooks sent per /validate/batch request when the service does not say how many it accepts
+DEFAULT_BATCH_SIZE = 16
+
+
+class ServiceError(Exception):
+    """The validation service answered with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status} - {message}")
+        self.status = status
+        self.message = message
+
+
+class ValidationServiceClient:
+    """
+    Client of service.server over one keep-alive connection. Requests refused with 503
+    because the service is busy are retried after its Retry-After delay.
+    """
+
+    def __init__(self, url: str = DEFAULT_SERVICE_URL, timeout: float = 600.0, busy_retries: int = 30):
+        from urllib.parse import urlsplit
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.busy_retries = busy_retries
+        self._conn: Optional["http.client.HTTPConnection"] = None
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None,
+                 content_type: str = "application/json", timeout: Optional[float] = None) -> Tuple[int, Dict]:
+        # http.client (with ssl and email) is imported on first use to keep main.py's startup short
+        import http.client
+        for attempt in range(self.busy_retries + 1):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout or self.timeout)
+            try:
+                self._conn.request(method, path, body=body, headers={"Content-Type": content_type})
+                response = self._conn.getresponse()
+                data = loads(response.read() or b"{}")
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    raise
+                # The service may have closed an idle connection: reconnect once
+                continue
+            if response.will_close:
+                self.close()
+            if response.status == 503 and attempt < self.busy_retries:
+                time.sleep(float(response.getheader("Retry-After") or 1))
+                continue
+            return response.status, data
+        raise ServiceError(503, "Validation service stayed busy")
+
+    def _json(self, path: str, payload: Any) -> Dict:
+        status, data = self._request("POST", path, dumps(payload, pretty=False))
+        if status != 200:
+            raise ServiceError(status, data.get("error", ""))
+        return data
+
+    def health(self, timeout: float = 2.0) -> Optional[Dict]:
+        """The service's /health report, or None when no service answers."""
+        import http.client
+        try:
+            status, data = self._request("GET", "/health", timeout=timeout)
+        except (OSError, http.client.HTTPException, ValueError):
+            return None
+        finally:
+            # The probe's short timeout must not stick to the connection used for real work
+            self.close()
+        return data if status == 200 else None
+
+    def validate_cell(self, response: str, instructions: Any) -> Dict:
+        """{"response", "results"} for one cell; malformed or contradicting instructions raise ServiceError (422)."""
+        return self._json("/validate/cell", {"response": response, "instructions": instructions})
+
+    def validate_notebook(self, content: bytes, dialogue_id: str, strict: bool = False) -> Dict:
+        """The pipeline result for one notebook's raw .ipynb content."""
+        from urllib.parse import quote
+        path = f"/validate/notebook?dialogue_id={quote(dialogue_id)}&strict={int(strict)}"
+        status, data = self._request("POST", path, content, "application/x-ipynb+json")
+        if status != 200:
+            raise ServiceError(status, data.get("error", ""))
+        return data
+
+    def validate_batch(self, notebooks: Sequence[Tuple[str, bytes]], strict: bool = False) -> List[Dict]:
+        """
+        [{"name", "status", "result" or "error"}, ...] for (file name, raw content) pairs, in order.
+        A notebook that is not valid UTF-8 gets an error entry without being sent.
+        """
+        entries, errors = [], {}
+        for i, (name, content) in enumerate(notebooks):
+            try:
+                entries.append({"name": name, "content": content.decode("utf-8")})
+            except UnicodeDecodeError as e:
+                errors[i] = {"name": name, "status": "error", "error": f"UnicodeDecodeError: {e}"}
+        results = iter(self._json("/validate/batch", {"notebooks": entries, "strict": strict})["results"]
+                       if entries else ())
+        return [errors[i] if i in errors else next(results) for i in range(len(notebooks))]
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,285 @@
+"""
+Long-running validation service. A pool of worker processes imports the converter and the
+validators once at startup, so a request only pays for the validation itself.
+
+Run from the src directory:
+
+    python -m service.server [--host 127.0.0.1] [--port 8750] [--jobs N] [--max-pending N]
+
+Endpoints (JSON responses):
+
+    GET  /health              worker count, work in flight and requests served
+    POST /validate/cell       {"response": str, "instructions": {"metadata": [...], "instructions": [...]}}
+    POST /validate/notebook   raw .ipynb body, with optional ?dialogue_id=...&strict=1
+    POST /validate/batch      {"notebooks": [{"name": str, "content": str}, ...], "strict": bool}
+
+A notebook is answered with the in-memory pipeline result (converted, metadata_report,
+schema_log, validation_report); a batch with [{"name", "status", "result" or "error"}, ...].
+When more than max_pending notebooks or cells are queued, new requests are refused with
+503 and a Retry-After header instead of piling up.
+"""
+import os
+import time
+import signal
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from typing import Any, Callable, Dict, Optional, Tuple
+from json_io import dumps, loads
+
+DEFAULT_SERVICE_HOST = "127.0.0.1"
+DEFAULT_SERVICE_PORT = 8750
+DEFAULT_MAX_BODY_BYTES = 256 * 1024 * 1024
+DEFAULT_REQUEST_TIMEOUT = 300.0
+# Seconds a refused client is asked to wait before retrying
+RETRY_AFTER_SECONDS = 1
+
+
+def _warm_worker() -> None:
+    """Worker initializer: import the whole pipeline before the first task arrives."""
+    import pipeline  # noqa: F401
+
+
+def _validate_notebook(content: Any, dialogue_id: str, strict: bool) -> Dict:
+    from pipeline import process_parsed_notebook
+    from notebook_processing.processor import parse_notebook
+    return process_parsed_notebook(parse_notebook(content, strict), dialogue_id)
+
+
+def _validate_cell(response: str, instructions: Any) -> Dict:
+    from pipeline import validate_cell
+    return validate_cell(response, instructions)
+
+
+class Overloaded(Exception):
+    """More work is queued than the service accepts."""
+
+
+class ValidationService:
+    """
+    The worker pool plus admission control: every notebook or cell takes one of max_pending
+    slots until its work is done, and a request that does not fit is refused at once.
+    """
+
+    def __init__(self, jobs: int, max_pending: int, timeout: float = DEFAULT_REQUEST_TIMEOUT):
+        self.jobs = jobs
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.stats = {"requests": 0, "notebooks": 0, "cells": 0, "rejected": 0, "errors": 0}
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_warm_worker)
+        # Start every worker now rather than on the first requests
+        for future in [executor.submit(_warm_worker) for _ in range(self.jobs)]:
+            future.result()
+        return executor
+
+    def admit(self, cost: int) -> None:
+        with self.lock:
+            if self.pending + cost > self.max_pending:
+                self.stats["rejected"] += 1
+                raise Overloaded(f"{self.pending} items in flight, at most {self.max_pending} accepted")
+            self.pending += cost
+            self.stats["requests"] += 1
+
+    def release(self, cost: int) -> None:
+        with self.lock:
+            self.pending -= cost
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        """
+        Run fn(*args) on the pool for a slot taken with admit. The slot is released once the
+        future is done, not when a caller stops waiting for it, so timed-out work still counts.
+        """
+        try:
+            try:
+                future = self.executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); replace the pool and try once more
+                with self.lock:
+                    self.executor = self._new_executor()
+                future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.release(1)
+            raise
+        future.add_done_callback(lambda _: self.release(1))
+        return future
+
+    def run(self, fn: Callable, *args: Any) -> Dict:
+        """submit and wait up to the service's timeout, cancelling the work if it has not started by then."""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def health(self) -> Dict:
+        with self.lock:
+            return {"status": "ok", "jobs": self.jobs, "pending": self.pending, "max_pending": self.max_pending,
+                    "uptime": round(time.time() - self.started, 1), **self.stats}
+
+    def count(self, field: str, amount: int = 1) -> None:
+        with self.lock:
+            self.stats[field] += amount
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    @property
+    def service(self) -> ValidationService:
+        return self.server.service
+
+    def do_GET(self) -> None:
+        if urlsplit(self.path).path == "/health":
+            self._send(200, self.service.health())
+        else:
+            self._send(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        routes = {"/validate/cell": self._cell, "/validate/notebook": self._notebook, "/validate/batch": self._batch}
+        route = routes.get(url.path)
+        length = int(self.headers.get("Content-Length", 0))
+        if route is None or length > self.server.max_body_bytes:
+            # The body is left unread, so the connection cannot be reused
+            self.close_connection = True
+            if route is None:
+                self._send(404, {"error": f"Unknown endpoint {url.path}"}, {"Connection": "close"})
+            else:
+                self._send(413, {"error": f"Request body over {self.server.max_body_bytes} bytes"}, {"Connection": "close"})
+            return
+        body = self.rfile.read(length)
+        try:
+            status, data = route(body, {k: v[-1] for k, v in parse_qs(url.query).items()})
+        except Overloaded as e:
+            self._send(503, {"error": str(e)}, {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return
+        except TimeoutError:
+            status, data = 504, {"error": f"Not finished within {self.service.timeout}s"}
+        except ValueError as e:
+            status, data = 400, {"error": f"Invalid request: {e}"}
+        except Exception as e:
+            self.service.count("errors")
+            status, data = 500, {"error": f"{type(e).__name__}: {e}"}
+        self._send(status, data)
+
+    def _cell(self, body: bytes, query: Dict[str, str]) -> Tuple[int, Dict]:
+        payload = loads(body)
+        if not isinstance(payload, dict) or not isinstance(payload.get("response"), str):
+            raise ValueError("expected {\"response\": str, \"instructions\": {...}}")
+        self.service.admit(1)
+        report = self.service.run(_validate_cell, payload["response"], payload.get("instructions"))
+        self.service.count("cells")
+        return (422 if "error" in report else 200), report
+
+    def _notebook(self, body: bytes, query: Dict[str, str]) -> Tuple[int, Dict]:
+        dialogue_id = query.get("dialogue_id", "notebook")
+        strict = query.get("strict", "0").lower() in ("1", "true", "yes")
+        self.service.admit(1)
+        try:
+            result = self.service.run(_validate_notebook, body, dialogue_id, strict)
+        except (TimeoutError, BrokenProcessPool):
+            raise
+        except Exception as e:
+            # The notebook could not be parsed or converted
+            return 422, {"error": f"{type(e).__name__}: {e}"}
+        self.service.count("notebooks")
+        return 200, result
+
+    def _batch(self, body: bytes, query: Dict[str, str]) -> Tuple[int, Dict]:
+        payload = loads(body)
+        notebooks = payload.get("notebooks") if isinstance(payload, dict) else None
+        if not isinstance(notebooks, list) or not all(isinstance(n, dict) and "content" in n for n in notebooks):
+            raise ValueError("expected {\"notebooks\": [{\"name\": str, \"content\": str}, ...]}")
+        if len(notebooks) > self.service.max_pending:
+            return 413, {"error": f"Batch of {len(notebooks)} notebooks, at most {self.service.max_pending} per request"}
+        strict = bool(payload.get("strict", False))
+        self.service.admit(len(notebooks))
+        names = [n.get("name") or f"notebook_{i}" for i, n in enumerate(notebooks)]
+        futures = []
+        try:
+            # Names may be relative paths (sub/dir/a.ipynb); the dialogue id is the file name, as in local runs
+            for name, n in zip(names, notebooks):
+                futures.append(self.service.submit(_validate_notebook, n["content"],
+                                                   os.path.splitext(os.path.basename(name))[0], strict))
+        except BaseException:
+            # submit released the failed notebook's slot; the ones never submitted are released here
+            self.service.release(len(notebooks) - len(futures) - 1)
+            raise
+        # One deadline for the whole batch, rather than the timeout again for every notebook
+        deadline = time.monotonic() + self.service.timeout
+        results = []
+        for name, future in zip(names, futures):
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                results.append({"name": name, "status": "ok", "result": result})
+            except TimeoutError:
+                future.cancel()
+                results.append({"name": name, "status": "error",
+                                "error": f"Not finished within {self.service.timeout}s"})
+            except Exception as e:
+                results.append({"name": name, "status": "error", "error": f"{type(e).__name__}: {e}"})
+        self.service.count("notebooks", len(notebooks))
+        return 200, {"results": results}
+
+    def _send(self, status: int, data: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        encoded = dumps(data, pretty=False)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_service(host: str = DEFAULT_SERVICE_HOST, port: int = DEFAULT_SERVICE_PORT, jobs: Optional[int] = None,
+                  max_pending: Optional[int] = None, timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                  max_body_bytes: int = DEFAULT_MAX_BODY_BYTES) -> ThreadingHTTPServer:
+    """Start the worker pool and an HTTP server for it (not yet serving; call serve_forever)."""
+    jobs = jobs or os.cpu_count() or 1
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.max_body_bytes = max_body_bytes
+    server.service = ValidationService(jobs, max_pending or jobs * 4, timeout)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve notebook and cell validation over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Notebooks and cells accepted at once before refusing with 503 (default: 4 per worker)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT, help="Per-notebook timeout in seconds")
+    args = parser.parse_args()
+
+    server = start_service(args.host, args.port, args.jobs, args.max_pending, args.timeout)
+    print(f"✅ Validation service listening on http://{args.host}:{server.server_address[1]} "
+          f"with {args.jobs} workers")
+    # A plain kill (SIGTERM) shuts down like Ctrl-C, so the worker processes are stopped too
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
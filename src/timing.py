@@ -0,0 +1,190 @@
+"""
+Opt-in timing instrumentation for the pipeline (--profile).
+
+A PipelineTimer records wall and CPU time per pipeline stage and per instruction ID for one
+notebook; a BatchTimingSummary aggregates many of them into p50/p95/p99 figures. When profiling
+is off the pipeline passes timer=None and the hooks reduce to a None check.
+
+print_startup_profile (--startup-profile) reruns a command under python -X importtime and
+reports which imports its startup time goes to.
+"""
+import sys
+import math
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Shared no-op context returned by stage() when profiling is off
+_NO_TIMING = nullcontext()
+PERCENTILES = (50, 95, 99)
+
+
+class PipelineTimer:
+    """Wall and CPU time per pipeline stage and per instruction ID."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.instructions: Dict[str, List[Tuple[float, float]]] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault(name, [0.0, 0.0])
+            totals[0] += time.perf_counter() - wall
+            totals[1] += time.process_time() - cpu
+
+    def time_instruction(self, inst_id: str, check: Callable, *args: Any) -> Any:
+        """Run check(*args) and record its wall and CPU time under inst_id."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        outcome = check(*args)
+        self.instructions.setdefault(inst_id, []).append(
+            (time.perf_counter() - wall, time.process_time() - cpu))
+        return outcome
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Add to an event counter (e.g. validation memo hits) reported next to the timings."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self) -> Dict:
+        """Totals per stage and per instruction ID, in seconds."""
+        return {
+            "stages": {name: {"wall": wall, "cpu": cpu} for name, (wall, cpu) in self.stages.items()},
+            "instructions": {
+                inst_id: {
+                    "calls": len(calls),
+                    "wall": sum(w for w, _ in calls),
+                    "cpu": sum(c for _, c in calls),
+                    "max_wall": max(w for w, _ in calls),
+                }
+                for inst_id, calls in self.instructions.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def samples(self) -> Dict[str, List[float]]:
+        """Per-call wall times by instruction ID, for batch-level percentiles."""
+        return {inst_id: [w for w, _ in calls] for inst_id, calls in self.instructions.items()}
+
+
+def stage(timer: Optional[PipelineTimer], name: str):
+    """Time a block as `name` when a timer is given; otherwise a no-op context."""
+    return timer.stage(name) if timer is not None else _NO_TIMING
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    summary = {"count": len(ordered), "total": sum(ordered)}
+    for q in PERCENTILES:
+        summary[f"p{q}"] = percentile(ordered, q)
+    return summary
+
+
+class BatchTimingSummary:
+    """Aggregates the timings of every notebook in a batch."""
+
+    def __init__(self):
+        self.notebooks = 0
+        self.stage_walls: Dict[str, List[float]] = {}
+        self.stage_cpu: Dict[str, float] = {}
+        self.instruction_samples: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def add(self, timings: Dict, samples: Dict[str, List[float]]) -> None:
+        self.notebooks += 1
+        for name, totals in timings["stages"].items():
+            self.stage_walls.setdefault(name, []).append(totals["wall"])
+            self.stage_cpu[name] = self.stage_cpu.get(name, 0.0) + totals["cpu"]
+        for inst_id, walls in samples.items():
+            self.instruction_samples.setdefault(inst_id, []).extend(walls)
+        for name, amount in timings.get("counters", {}).items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self) -> Dict:
+        """Per-notebook stage time and per-call instruction time distributions, in seconds."""
+        stages = {}
+        for name, walls in self.stage_walls.items():
+            stages[name] = _distribution(walls)
+            stages[name]["cpu_total"] = self.stage_cpu[name]
+        return {
+            "notebooks": self.notebooks,
+            "stages": stages,
+            "instructions": {inst_id: _distribution(walls)
+                             for inst_id, walls in sorted(self.instruction_samples.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+def format_summary(summary: Dict) -> str:
+    lines = [f"⏱️ Timing summary over {summary['notebooks']} notebooks (p50 / p95 / p99)"]
+    for title, section, unit, scale in (("Stages (per notebook)", "stages", "ms", 1e3),
+                                        ("Instructions (per call)", "instructions", "us", 1e6)):
+        lines.append(f"{title}:")
+        for name, dist in _by_total(summary[section]):
+            lines.append(f"  {name:<50} {dist['p50'] * scale:>9.1f} / {dist['p95'] * scale:>9.1f} / "
+                         f"{dist['p99'] * scale:>9.1f} {unit}  (total {dist['total']:.3f}s)")
+    if summary.get("counters"):
+        lines.append("Counters: " + ", ".join(f"{name} {amount}" for name, amount in summary["counters"].items()))
+    return "\n".join(lines)
+
+
+def _by_total(section: Dict[str, Dict]) -> List[Tuple[str, Dict]]:
+    """Order entries by total time, slowest first."""
+    return sorted(section.items(), key=lambda item: item[1]["total"], reverse=True)
+
+
+def parse_import_times(stderr: str) -> Tuple[List[Tuple[str, int, int, int]], List[str]]:
+    """
+    Split python -X importtime output from the rest of a stderr stream.
+    return: ([(module, depth, self us, cumulative us), ...], other stderr lines)
+    """
+    imports, other = [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            other.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The column header
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        imports.append((module, (len(name) - len(module) - 1) // 2, int(fields[0]), int(fields[1])))
+    return imports, other
+
+
+def format_startup_profile(imports: List[Tuple[str, int, int, int]], wall: float, top: int = 15) -> str:
+    total = sum(cumulative for _, depth, _, cumulative in imports if depth == 0)
+    lines = [f"⏱️ Startup profile: {wall * 1e3:.1f} ms wall, {total / 1e3:.1f} ms importing {len(imports)} modules"]
+    for title, column in (("Slowest imports (cumulative, with their own imports)", 3), ("Slowest modules (self)", 2)):
+        lines.append(f"{title}:")
+        for entry in sorted(imports, key=lambda entry: entry[column], reverse=True)[:top]:
+            lines.append(f"  {entry[0]:<50} {entry[column] / 1e3:>7.1f} ms")
+    return "\n".join(lines)
+
+
+def print_startup_profile(argv: List[str], top: int = 15) -> int:
+    """
+    Run `python -X importtime <argv>` in a child process, let its output through and print the
+    import-time breakdown of its startup afterwards.
+    return: int - the child's exit status
+    """
+    import subprocess
+    started = time.perf_counter()
+    child = subprocess.run([sys.executable, "-X", "importtime", *argv], stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - started
+    imports, other = parse_import_times(child.stderr)
+    if other:
+        print("\n".join(other), file=sys.stderr)
+    print("\n" + format_startup_profile(imports, wall, top))
+    return child.returncode
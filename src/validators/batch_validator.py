@@ -0,0 +1,112 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from validators.response_profile import ResponseProfile
+from validators.validator import CompiledInstruction, compile_instruction, count_verdict, validate_instruction
+
+Verdict = Optional[Tuple[bool, str]]
+
+
+def _bulk_no_comma(texts: List[str], pairs: List[Tuple[int, Dict]]) -> List[Verdict]:
+    # The result only depends on whether there is a comma, so the compiled check runs twice in all
+    check = compile_instruction({"instruction_id": "punctuation:no_comma"})
+    verdicts = {True: check(","), False: check("")}
+    has_comma = [',' in text for text in texts]
+    return [verdicts[has_comma[i]] for i, _ in pairs]
+
+
+def _bulk_case(inst_type: str, predicate: Callable[[str], bool], example: str):
+    """
+    Bulk check for a change_case type whose result only depends on predicate(response), which
+    holds for example. Like no_comma, the compiled check runs twice in all.
+    """
+    def bulk(texts: List[str], pairs: List[Tuple[int, Dict]]) -> List[Verdict]:
+        # The check takes no kwargs, so its two possible verdicts cover every pair
+        check = compile_instruction({"instruction_id": inst_type})
+        verdicts = {True: check(example), False: check("")}
+        holds = list(map(predicate, texts))
+        return [verdicts[holds[i]] for i, _ in pairs]
+    return bulk
+
+
+def _bulk_number_characters(texts: List[str], pairs: List[Tuple[int, Dict]]) -> List[Verdict]:
+    lengths = list(map(len, map(str.strip, texts)))
+    verdicts = []
+    for i, inst in pairs:
+        try:
+            verdicts.append(count_verdict(lengths[i], inst["relation"], inst["num_chars"], "characters"))
+        except Exception:
+            verdicts.append(None)
+    return verdicts
+
+
+def _bulk_letter_frequency(texts: List[str], pairs: List[Tuple[int, Dict]]) -> List[Verdict]:
+    lowered = list(map(str.lower, texts))
+    verdicts = []
+    for i, inst in pairs:
+        try:
+            letter = inst["letter"].lower()
+            verdicts.append(count_verdict(lowered[i].count(letter), inst["let_relation"], inst["let_frequency"],
+                                          f"'{letter}' (case-insensitive)"))
+        except Exception:
+            verdicts.append(None)
+    return verdicts
+
+
+# Counting checks evaluated for a whole instruction group at once: the feature is computed in one
+# pass over the group's distinct responses, then compared per pair without building a profile or
+# a compiled check. A bulk check returns the same (valid, message) as the compiled check, or None
+# for pairs whose kwargs make the check raise; those go to the compiled check for its exact error.
+BULK_CHECKS: Dict[str, Callable[[List[str], List[Tuple[int, Dict]]], List[Verdict]]] = {
+    "punctuation:no_comma": _bulk_no_comma,
+    "length_constraints:number_characters": _bulk_number_characters,
+    "keywords:letter_frequency": _bulk_letter_frequency,
+    "change_case:all_caps": _bulk_case("change_case:all_caps", str.isupper, "A"),
+    "change_case:lowercase": _bulk_case("change_case:lowercase", str.islower, "a"),
+}
+
+
+def validate_pairs(pairs: Sequence[Tuple[str, Dict[str, Any]]]) -> List[Tuple[bool, str]]:
+    """
+    Validate many (response, instruction dict) pairs at once, e.g. every pair of a corpus.
+    Pairs are grouped by instruction_id. The counting checks in BULK_CHECKS are evaluated for
+    a whole group at once; every other pair shares one ResponseProfile per distinct response
+    and one compiled check per instruction dict. A pair whose instruction_id is missing or not
+    a string is validated on its own with validate_instruction.
+    The results are the same as validate_instruction's.
+    return: List[Tuple[bool, str]] - (valid, message) for each pair, in input order
+    """
+    groups: Dict[str, List[int]] = defaultdict(list)
+    results: List[Tuple[bool, str]] = [None] * len(pairs)
+    for i, (response, instruction) in enumerate(pairs):
+        inst_type = instruction.get("instruction_id")
+        if isinstance(inst_type, str):
+            groups[inst_type].append(i)
+        else:
+            # Cannot be grouped (or may be unhashable); validate_instruction reports the error
+            results[i] = validate_instruction(response, inst_type,
+                                              {k: v for k, v in instruction.items() if k != "instruction_id"})
+
+    profiles: Dict[str, ResponseProfile] = {}
+    for inst_type, indices in groups.items():
+        bulk_check = BULK_CHECKS.get(inst_type)
+        if bulk_check is not None:
+            text_index: Dict[str, int] = {}
+            for i in indices:
+                text_index.setdefault(pairs[i][0], len(text_index))
+            verdicts = bulk_check(list(text_index), [(text_index[pairs[i][0]], pairs[i][1]) for i in indices])
+            for i, verdict in zip(indices, verdicts):
+                results[i] = verdict
+            indices = [i for i, verdict in zip(indices, verdicts) if verdict is None]
+
+        # Pairs that share an instruction dict (all responses of a turn) share its compiled check
+        compiled: Dict[int, CompiledInstruction] = {}
+        for i in indices:
+            response, instruction = pairs[i]
+            check = compiled.get(id(instruction))
+            if check is None:
+                check = compiled[id(instruction)] = compile_instruction(instruction)
+            profile = profiles.get(response)
+            if profile is None:
+                profile = profiles[response] = ResponseProfile(response)
+            results[i] = check(profile)
+    return results
@@ -0,0 +1,83 @@
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from data_loader import conflict_dict
+
+
+class ConflictIndex:
+    """
+    Conflicting instruction pairs as bitmasks. Every instruction ID known to the conflict table
+    gets a bit (in sorted ID order); a set of instructions becomes one int, and the set has a
+    conflict when the conflict mask of one of its members shares a bit with it.
+    """
+
+    def __init__(self, conflicts: Dict[str, List[str]]):
+        self.ids = sorted(set(conflicts) | {other for others in conflicts.values() for other in others})
+        self.positions = {inst_id: i for i, inst_id in enumerate(self.ids)}
+        self.bits = {inst_id: 1 << i for inst_id, i in self.positions.items()}
+        # masks[i] has bit j set when instruction i lists instruction j as conflicting
+        self.masks = [0] * len(self.ids)
+        for inst_id, others in conflicts.items():
+            for other in others:
+                self.masks[self.positions[inst_id]] |= self.bits[other]
+        # Conflicting pairs per instruction set mask, filled on first use (a corpus has few distinct sets)
+        self._pairs: Dict[int, List[Tuple[str, str]]] = {}
+
+    def mask(self, instruction_ids: Iterable[str]) -> int:
+        """Bitmask of a set of instruction IDs; IDs without known conflicts are left out."""
+        mask = 0
+        for inst_id in instruction_ids:
+            mask |= self.bits.get(inst_id, 0)
+        return mask
+
+    def _members(self, mask: int) -> Iterator[int]:
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def has_conflict(self, mask: int) -> bool:
+        return bool(self.conflicting_pairs(mask))
+
+    def conflicting_pairs(self, mask: int) -> List[Tuple[str, str]]:
+        """
+        Every conflicting pair within mask as (first, second), in sorted ID order. Each pair
+        appears once; the first ID is one that lists the second as conflicting.
+        """
+        pairs = self._pairs.get(mask)
+        if pairs is None:
+            pairs = self._pairs[mask] = []
+            for i in self._members(mask):
+                for j in self._members(self.masks[i] & mask):
+                    # A pair listed both ways is reported once, from its lower ID
+                    if i < j or not self.masks[j] >> i & 1:
+                        pairs.append((self.ids[i], self.ids[j]))
+        return pairs
+
+    def conflicting_turns(self, turns: Iterable[Tuple[Any, Iterable[str]]]) -> Iterator[Tuple[Any, List[Tuple[str, str]]]]:
+        """
+        One pass over (key, instruction IDs) items, e.g. every turn of a corpus keyed by
+        (dialogue_id, turn_index); yields (key, conflicting pairs) for the items with a conflict.
+        """
+        for key, instruction_ids in turns:
+            pairs = self.conflicting_pairs(self.mask(instruction_ids))
+            if pairs:
+                yield key, pairs
+
+
+# Built once at import time from conflicting_instructions.json (data_loader.conflict_dict)
+CONFLICT_INDEX = ConflictIndex(conflict_dict)
+
+
+def corpus_conflicts(dialogues: Iterable[Dict]) -> List[Dict]:
+    """
+    Every turn of a converted corpus that contains a conflicting instruction pair.
+    return: List[Dict] - {dialogue_id, turn_index, conflicts: [[id, id], ...]} per conflicting turn
+    """
+    def turns():
+        for d_index, dialogue in enumerate(dialogues):
+            dialogue_id = dialogue.get("dialogue_metadata", {}).get("dialogue_id", f"dialogue_{d_index}")
+            for t_index, turn in enumerate(dialogue["turns"]):
+                ids = (inst.get("instruction_id") for inst in turn.get("instructions", {}).get("instructions", []))
+                yield (dialogue_id, t_index + 1), ids
+
+    return [{"dialogue_id": dialogue_id, "turn_index": turn_index, "conflicts": [list(pair) for pair in pairs]}
+            for (dialogue_id, turn_index), pairs in CONFLICT_INDEX.conflicting_turns(turns())]
@@ -0,0 +1,59 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """
+    Count whole-word, case-insensitive occurrences of several keywords in one scan.
+
+    The counts are the same as running re.findall(r'\\b<keyword>\\b', text, re.IGNORECASE)
+    once per keyword. A single alternation (guarded by the keywords' first letters) finds
+    every position where some keyword matches; at those positions a second pattern with one
+    optional lookahead group per keyword reports which keywords match there, so keywords
+    that overlap (e.g. "gamma" and "gamma ray") are all counted.
+    """
+
+    def __init__(self, keywords: Tuple[str, ...]):
+        self.keywords = keywords
+        # Identical keywords share a group; slots maps each input keyword to its group
+        unique = list(dict.fromkeys(keywords))
+        self._slots = [unique.index(kw) for kw in keywords]
+        self._group_count = len(unique)
+        self._candidates = None
+        self._groups = None
+        if not unique:
+            return
+
+        alternatives = "|".join(rf"\b{re.escape(kw)}\b" for kw in unique)
+        guard = ""
+        if all(unique):
+            guard = "(?=[" + "".join(sorted({re.escape(kw[0]) for kw in unique})) + "])"
+        self._candidates = re.compile(f"{guard}(?={alternatives})", re.IGNORECASE)
+        self._groups = re.compile("".join(rf"(?=(?:\b({re.escape(kw)})\b)?)" for kw in unique), re.IGNORECASE)
+
+    def counts(self, text: str) -> List[int]:
+        """Return the number of non-overlapping matches of each keyword, in input order."""
+        totals = [0] * self._group_count
+        if self._candidates is not None:
+            ends = [-1] * self._group_count
+            match_groups = self._groups.match
+            for candidate in self._candidates.finditer(text):
+                match = match_groups(text, candidate.start())
+                for i in range(self._group_count):
+                    start = match.start(i + 1)
+                    # Like findall, a keyword's next match may not overlap its previous one
+                    if start != -1 and start >= ends[i]:
+                        totals[i] += 1
+                        ends[i] = match.end(i + 1)
+        return [totals[slot] for slot in self._slots]
+
+
+@lru_cache(maxsize=1024)
+def _cached_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def get_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """Return the matcher for a keyword list, compiling it only the first time the list is seen."""
+    return _cached_matcher(tuple(kw.strip() for kw in keywords))
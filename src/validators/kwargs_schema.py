@@ -0,0 +1,56 @@
+from typing import Any, Callable, Dict, Set, Tuple
+from data_loader import template_json
+
+# A compiled kwarg: (name, check, expected type as named in error messages)
+KwargCheck = Tuple[str, Callable[[Any], bool], str]
+
+
+def _is_str_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+# Kwarg types of the instruction template, with the check and the name used in error messages
+KWARG_TYPES: Dict[str, Tuple[Callable[[Any], bool], str]] = {
+    "int": (lambda value: isinstance(value, int), "int"),
+    "str": (lambda value: isinstance(value, str), "str"),
+    "list(str)": (_is_str_list, "list of str"),
+}
+
+
+def compile_kwarg_type(spec: str) -> Tuple[Callable[[Any], bool], str]:
+    """(check, expected) for a template type: int, str, list(str) or an enum like {at least, equal to, less than}."""
+    if spec.startswith("{") and spec.endswith("}"):
+        values = tuple(value.strip() for value in spec[1:-1].split(","))
+        allowed = frozenset(values)
+        return (lambda value: isinstance(value, str) and value in allowed,
+                "one of " + ", ".join(f"'{value}'" for value in values))
+    try:
+        return KWARG_TYPES[spec]
+    except KeyError:
+        raise ValueError(f"Unknown kwarg type in the instruction template: {spec!r}") from None
+
+
+class KwargsSchema:
+    """
+    The instruction template compiled into one entry per instruction ID: the set of keys the
+    instruction must have and a (kwarg, check, expected) tuple per kwarg, in template order.
+    Checking an instruction is one lookup in `entries`; a new instruction type only needs a
+    template entry.
+    """
+
+    def __init__(self, template: Dict):
+        self.template = template
+        self.entries: Dict[str, Tuple[Set[str], Tuple[KwargCheck, ...]]] = {}
+        for instr in template.get("instructions", []):
+            checks = tuple((kwarg, *compile_kwarg_type(spec)) for kwarg, spec in instr.items()
+                           if kwarg != "instruction_id")
+            self.entries[instr["instruction_id"]] = (set(instr.keys()), checks)
+
+
+# Compiled once at import time from instruction.json (data_loader.template_json)
+KWARGS_SCHEMA = KwargsSchema(template_json)
+
+
+def kwargs_schema_for(template: Dict) -> KwargsSchema:
+    """The compiled schema of template, reusing KWARGS_SCHEMA for the default template."""
+    return KWARGS_SCHEMA if template is KWARGS_SCHEMA.template else KwargsSchema(template)
@@ -0,0 +1,85 @@
+import re
+from functools import cached_property, lru_cache
+from typing import List, Tuple
+
+# Patterns shared by the instruction checks as (source, flags). Each is compiled by pattern()
+# the first time a check needs it, so importing the validators compiles nothing.
+NUMBERED_ITEM_PATTERN = (r'^\s*\d+\.', re.MULTILINE)
+BULLET_POINT_PATTERN = (r'^[*-•]\s', re.MULTILINE)
+PLACEHOLDER_PATTERN = (r'\[.*?\]', 0)
+WORD_PATTERN = (r'\b(?=\S*[A-Za-z0-9])\S+\b', 0)
+
+
+@lru_cache(maxsize=None)
+def pattern(spec: Tuple[str, int]) -> "re.Pattern[str]":
+    return re.compile(*spec)
+
+
+class ResponseProfile:
+    """
+    Lazily computed features of a single response.
+    Every feature is computed on first access and then cached, so all instructions
+    checked against the same response share one tokenization, one lowercased copy, etc.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+    @cached_property
+    def stripped(self) -> str:
+        return self.text.strip()
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Whitespace-separated tokens, as returned by str.split()."""
+        return self.text.split()
+
+    @cached_property
+    def alpha_tokens(self) -> List[str]:
+        """Tokens made only of letters."""
+        return [w for w in self.tokens if w.isalpha()]
+
+    @cached_property
+    def lines(self) -> List[str]:
+        """Lines of the stripped response."""
+        return self.stripped.splitlines()
+
+    @cached_property
+    def is_upper(self) -> bool:
+        return self.text.isupper()
+
+    @cached_property
+    def is_lower(self) -> bool:
+        return self.text.islower()
+
+    @cached_property
+    def has_comma(self) -> bool:
+        return ',' in self.text
+
+    @cached_property
+    def all_caps_word_count(self) -> int:
+        return sum(1 for w in self.tokens if w.isupper())
+
+    @cached_property
+    def lowercase_word_count(self) -> int:
+        return sum(1 for w in self.tokens if w.islower())
+
+    @cached_property
+    def word_count(self) -> int:
+        return len(pattern(WORD_PATTERN).findall(self.text))
+
+    @cached_property
+    def numbered_item_count(self) -> int:
+        return len(pattern(NUMBERED_ITEM_PATTERN).findall(self.text))
+
+    @cached_property
+    def bullet_point_count(self) -> int:
+        return len(pattern(BULLET_POINT_PATTERN).findall(self.text))
+
+    @cached_property
+    def placeholder_count(self) -> int:
+        return len(pattern(PLACEHOLDER_PATTERN).findall(self.text))
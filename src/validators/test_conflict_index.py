@@ -0,0 +1,52 @@
+import random
+from data_loader import conflict_dict
+from validators.conflict_index import CONFLICT_INDEX, ConflictIndex, corpus_conflicts
+
+ALL_IDS = sorted(set(conflict_dict) | {other for others in conflict_dict.values() for other in others})
+
+
+def quadratic_pairs(conflicts, instruction_ids):
+    """The original loop: every listed conflict of every member, each unordered pair once."""
+    ids = set(instruction_ids)
+    pairs = set()
+    for instr_id in ids:
+        for conflicting_id in conflicts.get(instr_id, []):
+            if conflicting_id in ids:
+                pairs.add(frozenset((instr_id, conflicting_id)))
+    return pairs
+
+
+def index_pairs(index, instruction_ids):
+    pairs = index.conflicting_pairs(index.mask(instruction_ids))
+    assert len(pairs) == len(set(map(frozenset, pairs))), "a pair is reported twice"
+    return set(map(frozenset, pairs))
+
+
+def test_pairs_match_quadratic_loop():
+    rng = random.Random(0)
+    for _ in range(2000):
+        ids = rng.sample(ALL_IDS + ["unknown:a", "unknown:b"], rng.randint(0, 8))
+        assert index_pairs(CONFLICT_INDEX, ids) == quadratic_pairs(conflict_dict, ids), ids
+
+
+def test_one_way_conflicts():
+    conflicts = {"a": ["b"], "b": [], "c": ["a", "d"], "d": ["c"]}
+    index = ConflictIndex(conflicts)
+    for ids in (["a", "b"], ["b", "a"], ["a", "c"], ["c", "d"], ["a", "b", "c", "d"], ["b", "d"], []):
+        assert index_pairs(index, ids) == quadratic_pairs(conflicts, ids)
+    # The first ID of a pair lists the second, and a pair listed both ways comes from its lower ID
+    assert index.conflicting_pairs(index.mask(["d", "c", "b", "a"])) == [("a", "b"), ("c", "a"), ("c", "d")]
+
+
+def test_corpus_conflicts():
+    dialogues = [{"dialogue_metadata": {"dialogue_id": "d1"}, "turns": [
+        {"instructions": {"instructions": [{"instruction_id": "change_case:all_caps"},
+                                           {"instruction_id": "change_case:lowercase"}]}},
+        {"instructions": {"instructions": [{"instruction_id": "change_case:all_caps"}]}},
+    ]}, {"turns": [{"instructions": {"instructions": [{"instruction_id": "change_case:lowercase"},
+                                                      {"instruction_id": "change_case:all_caps"}]}}]}]
+    pair = ["change_case:all_caps", "change_case:lowercase"]
+    assert corpus_conflicts(dialogues) == [
+        {"dialogue_id": "d1", "turn_index": 1, "conflicts": [pair]},
+        {"dialogue_id": "dialogue_1", "turn_index": 1, "conflicts": [pair]},
+    ]
@@ -0,0 +1,36 @@
+import re
+import random
+import pytest
+from validators.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+
+def findall_counts(text, keywords):
+    return [len(re.findall(r'\b' + re.escape(kw.strip()) + r'\b', text, flags=re.IGNORECASE)) for kw in keywords]
+
+
+@pytest.mark.parametrize("text, keywords", [
+    ("Gamma rays and a gamma ray burst. GAMMA!", ["gamma", "gamma ray", "ray"]),
+    ("aaaa aa a", ["aa", "a", "aaa"]),
+    ("x-ray x ray xray", ["x-ray", "x", "ray", "xray"]),
+    ("The end. the END", ["the end", "end", "the"]),
+    ("C++ and c# and .NET", ["C++", "c#", ".net", "and"]),
+    ("dup dup dup", ["dup", "dup", " dup "]),
+    ("nothing here", []),
+    ("empty keyword", [""]),
+    ("ünïcode Ünïcode straße STRASSE", ["ünïcode", "straße"]),
+])
+def test_counts_match_findall(text, keywords):
+    assert get_keyword_matcher(keywords).counts(text) == findall_counts(text, keywords)
+
+
+def test_random_texts_match_findall():
+    rng = random.Random(0)
+    vocabulary = ["a", "ab", "b", "ab c", "c", "a-b", "ba", "abc", "A", "B C"]
+    for _ in range(500):
+        text = " ".join(rng.choice(vocabulary + [".", ",", "-", "\n"]) for _ in range(rng.randint(0, 30)))
+        keywords = tuple(rng.sample(vocabulary, rng.randint(1, 5)))
+        assert KeywordMatcher(keywords).counts(text) == findall_counts(text, keywords), (text, keywords)
+
+
+def test_matcher_is_cached_per_keyword_list():
+    assert get_keyword_matcher(["alpha", "beta "]) is get_keyword_matcher(("alpha", "beta"))
@@ -0,0 +1,93 @@
+import pytest
+from data_loader import template_json
+from validators.kwargs_schema import KWARGS_SCHEMA, KwargsSchema, compile_kwarg_type, kwargs_schema_for
+from validators.validator import (instruction_schema_issues, validate_keys_against_template,
+                                  validate_instruction_kwargs_datatype)
+
+RELATION_ERROR = "'relation' must be one of 'at least', 'equal to', 'less than'"
+
+VALID_TURNS = [
+    {"metadata": {"add"}, "instructions": [
+        {"instruction_id": "length_constraints:number_words", "relation": "at least", "num_words": 5},
+        {"instruction_id": "keywords:existence", "keywords": ["a", "b"]},
+        {"instruction_id": "startend:wrap_checker", "wrap_phrase": "**"},
+        {"instruction_id": "punctuation:no_comma"}]},
+    {"metadata": {"modify"}, "instructions": [
+        {"instruction_id": "keywords:letter_frequency", "letter": "a", "let_relation": "less than",
+         "let_frequency": 2}]},
+]
+
+
+def test_valid_turns_have_no_issues():
+    assert instruction_schema_issues(VALID_TURNS) == ([], [])
+    assert validate_keys_against_template(template_json, VALID_TURNS) == []
+    assert validate_instruction_kwargs_datatype(VALID_TURNS) == []
+
+
+def test_key_and_type_issues_keep_original_messages():
+    turns = [{"metadata": ["add"], "instructions": [
+        {"instruction_id": "unknown:thing"},
+        {"instruction_id": "length_constraints:number_words", "num_words": "5", "extra": 1},
+        {"instruction_id": "keywords:existence", "keywords": ["a", 1]},
+        {"instruction_id": "punctuation:no_comma", "extra": True},
+        {"instruction_id": 5}]}]
+    key_issues, type_issues = instruction_schema_issues(turns)
+    assert key_issues == [{"TURN 1": {
+        "unknown:thing": {"error": "instruction_id not in template"},
+        "length_constraints:number_words": {"missing_keys": ["relation"], "extra_keys": ["extra"]},
+        "punctuation:no_comma": {"missing_keys": [], "extra_keys": ["extra"]},
+        5: {"error": "instruction_id not in template"},
+    }}]
+    assert type_issues == [{"TURN 1": [
+        "metadata must be a list of strings.",
+        f"length_constraints:number_words: {RELATION_ERROR}",
+        "length_constraints:number_words: 'num_words' must be int",
+        "keywords:existence: 'keywords' must be list of str",
+        "punctuation:no_comma: should not contain incorrect/extra fields",
+        "Missing or invalid instruction_id at index 4",
+    ]}]
+
+
+def test_relation_and_target_messages_follow_the_template():
+    turns = [{"metadata": {"add"}, "instructions": [
+        {"instruction_id": "length_constraints:number_words", "relation": "most", "num_words": 5},
+        {"instruction_id": "keywords:frequency", "keyword": "x", "relation": ["at least"], "frequency": 1},
+        {"instruction_id": "change_case:lowercase_word_frequency", "lowercase_relation": None,
+         "lowercase_frequency": 1},
+        {"instruction_id": "startend:wrap_checker", "wrap_phrase": 3},
+        {"instruction_id": "change_case:all_caps_target", "target_string": None},
+        "not a dict"]},
+        {"metadata": {"add"}, "instructions": "not a list"}]
+    assert instruction_schema_issues(turns) == ([], [
+        {"TURN 1": [
+            f"length_constraints:number_words: {RELATION_ERROR}",
+            f"keywords:frequency: {RELATION_ERROR}",
+            "change_case:lowercase_word_frequency: 'lowercase_relation' must be one of "
+            "'at least', 'equal to', 'less than'",
+            "startend:wrap_checker: 'wrap_phrase' must be str",
+            "change_case:all_caps_target: 'target_string' must be str",
+            "Instruction at index 5 is not a dict.",
+        ]},
+        {"TURN 2": ["instructions must be a list."]},
+    ])
+
+
+def test_compile_kwarg_type():
+    check, expected = compile_kwarg_type("{at least, equal to, less than}")
+    assert expected == "one of 'at least', 'equal to', 'less than'"
+    assert check("equal to") and not check("most") and not check(["at least"])
+    check, expected = compile_kwarg_type("list(str)")
+    assert expected == "list of str" and check(["a"]) and not check(["a", 1])
+    with pytest.raises(ValueError):
+        compile_kwarg_type("float")
+
+
+def test_custom_template():
+    assert kwargs_schema_for(template_json) is KWARGS_SCHEMA
+    template = {"instructions": [{"instruction_id": "custom:count", "count": "int"}]}
+    schema = kwargs_schema_for(template)
+    assert isinstance(schema, KwargsSchema) and schema is not KWARGS_SCHEMA
+    turns = [{"metadata": {"add"}, "instructions": [{"instruction_id": "custom:count", "count": "3"}]}]
+    assert instruction_schema_issues(turns, schema) == ([], [{"TURN 1": ["custom:count: 'count' must be int"]}])
+    assert validate_keys_against_template(template, [{"instructions": [{"instruction_id": "custom:count"}]}]) == [
+        {"TURN 1": {"custom:count": {"missing_keys": ["count"], "extra_keys": []}}}]
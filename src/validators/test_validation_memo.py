@@ -0,0 +1,68 @@
+from validators.validation_memo import ValidationMemo, freeze_instruction, response_digest
+from validators.validator import validate_instruction
+from pipeline import validate_turn
+
+INSTRUCTIONS = [
+    {"instruction_id": "length_constraints:number_words", "relation": "at least", "num_words": 5},
+    {"num_words": 5, "relation": "at least", "instruction_id": "length_constraints:number_words"},
+    # Same value, other types: 5.0 and "5" give other messages than 5
+    {"instruction_id": "length_constraints:number_words", "relation": "equal to", "num_words": 5.0},
+    {"instruction_id": "length_constraints:number_words", "relation": "equal to", "num_words": "5"},
+    {"instruction_id": "punctuation:no_comma"},
+    {"instruction_id": "keywords:existence", "keywords": ["alpha", "beta"]},
+    {"instruction_id": "change_case:lowercase"},
+    {"instruction_id": "startend:end_checker", "end_phrase": "beta"},
+]
+
+TURN = {
+    "prompt": "Write something",
+    "instructions": {"metadata": ["add"], "instructions": INSTRUCTIONS},
+    "response": "alpha, gamma and beta",
+    "nova_response": "ALPHA GAMMA DELTA EPSILON",
+    # The same text under another label
+    "gpt_response": "alpha, gamma and beta",
+}
+
+
+def expected_report():
+    report = []
+    for label in ("response", "nova_response", "gpt_response"):
+        results = []
+        for inst in INSTRUCTIONS:
+            kwargs = {k: v for k, v in inst.items() if k != "instruction_id"}
+            valid, message = validate_instruction(TURN[label], inst["instruction_id"], kwargs)
+            results.append({"instruction": inst["instruction_id"], "status": "Passed" if valid else "Failed",
+                            "message": message})
+        report.append({"dialogue_id": "d", "turn_index": 1, "response_type": label, "prompt": "Write something",
+                       "results": results})
+    return report
+
+
+def test_memo_hits_match_validate_instruction():
+    memo = ValidationMemo()
+    first = validate_turn(TURN, 1, "d", memo=memo)
+    # Already on the first run: the reordered instruction for each of the 3 responses, and the
+    # other instructions for the repeated response
+    assert memo.hits == 3 + len(INSTRUCTIONS) - 1
+    misses = memo.misses
+    second = validate_turn(TURN, 1, "d", memo=memo)
+    assert memo.misses == misses
+    assert first == second == validate_turn(TURN, 1, "d", memo=None) == expected_report()
+
+
+def test_freeze_instruction():
+    assert freeze_instruction(INSTRUCTIONS[0]) == freeze_instruction(INSTRUCTIONS[1])
+    assert len({freeze_instruction(inst) for inst in INSTRUCTIONS[:4]}) == 3
+    assert freeze_instruction({"instruction_id": "x", "n": 1}) != freeze_instruction({"instruction_id": "x", "n": True})
+
+
+def test_least_recently_used_entry_is_evicted():
+    memo = ValidationMemo(max_entries=2)
+    keys = [(response_digest(text), "{}") for text in ("a", "b", "c")]
+    memo.put(keys[0], (True, "No error"))
+    memo.put(keys[1], (True, "No error"))
+    assert memo.get(keys[0]) == (True, "No error")
+    memo.put(keys[2], (False, "x"))
+    assert memo.get(keys[1]) is None
+    assert memo.get(keys[0]) is not None and memo.get(keys[2]) == (False, "x")
+    assert memo.stats()["entries"] == 2
@@ -0,0 +1,113 @@
+import pytest
+from validators.validator import (validate_instruction, compile_instruction, find_conflicting_instructions,
+                                  check_contradicting_instructions)
+
+RESPONSE = ("HELLO World, this is a <<Title>> test.\n1. first\n2. second\n* bullet one\n* bullet two\n"
+            "[name] at [place]\nP.S. thanks")
+
+# (instruction ID, kwargs, response, result) - the results of the original if/eval chain
+VALID_INPUT_RESULTS = [
+    ("change_case:all_caps", {}, "HELLO WORLD", (True, "No error")),
+    ("change_case:all_caps", {}, RESPONSE, (False, "Response is not all uppercase.")),
+    ("change_case:lowercase", {}, RESPONSE, (False, "Response is not all lowercase.")),
+    ("change_case:alternating", {}, "hElLo wOrLd", (True, "No error")),
+    ("change_case:first_letter_cap", {}, RESPONSE, (False, "Not all words are first-letter capitalized.")),
+    ("change_case:capital_word_frequency", {"capital_relation": "at least", "capital_frequency": 2}, RESPONSE,
+     (True, "No error")),
+    ("change_case:lowercase_word_frequency", {"lowercase_relation": "less than", "lowercase_frequency": 3}, RESPONSE,
+     (False, "Expected less than 3 lowercase words, found 14.")),
+    ("change_case:all_caps_target", {"target_string": "hello"}, RESPONSE, (True, "No error")),
+    ("change_case:lowercase_target", {"target_string": "world"}, RESPONSE, (False, "'World' should be all lowercase.")),
+    ("change_case:first_letter_cap_target", {"target_string": "world"}, RESPONSE, (True, "No error")),
+    ("change_case:alternating_target", {"target_string": "test"}, RESPONSE,
+     (False, "'test' is not in alternating caps.")),
+    ("change_case:lowercase_target", {"target_string": "missing"}, RESPONSE,
+     (False, "Target 'missing' not found in response.")),
+    ("detectable_content:number_placeholders", {"relation": "equal to", "num_placeholders": 2}, RESPONSE,
+     (True, "No error")),
+    ("detectable_content:postscript", {"postscript_marker": "P.S."}, RESPONSE, (True, "No error")),
+    ("detectable_format:json_format", {}, '{"a": 1}', (True, "No error")),
+    ("detectable_format:json_format", {}, RESPONSE, (False, "Response is not valid JSON format.")),
+    ("detectable_format:multiple_sections", {"section_splitter": "Section", "relation": "at least", "num_sections": 2},
+     RESPONSE, (False, "Expected at least 2 sections, found 0.")),
+    ("detectable_format:numbered_list", {"relation": "equal to", "num_numbered_items": 2}, RESPONSE,
+     (True, "No error")),
+    ("detectable_format:number_bullet_lists", {"relation": "at least", "num_bullets": 3}, RESPONSE,
+     (False, "Expected at least 3 bullet points, found 2.")),
+    ("detectable_format:title", {}, RESPONSE, (False, "Title not wrapped in << >> on any line.")),
+    ("keywords:existence", {"keywords": ["hello", "absent"]}, RESPONSE, (False, "Missing keyword(s): ['absent']")),
+    ("keywords:frequency", {"keyword": "bullet", "relation": "equal to", "frequency": 2}, RESPONSE,
+     (True, "No error")),
+    ("keywords:forbidden_words", {"forbidden_words": ["test", "nothing"]}, RESPONSE,
+     (False, "Forbidden words found: ['test']")),
+    ("keywords:letter_frequency", {"letter": "T", "let_relation": "less than", "let_frequency": 3}, RESPONSE,
+     (False, "Expected less than 3 't' (case-insensitive), found 11.")),
+    ("punctuation:no_comma", {}, RESPONSE, (False, "Commas found in response.")),
+    ("length_constraints:number_characters", {"relation": "less than", "num_chars": 50}, RESPONSE,
+     (False, "Expected less than 50 characters, found 113.")),
+    ("length_constraints:number_words", {"relation": "at least", "num_words": 5}, RESPONSE, (True, "No error")),
+    ("length_constraints:number_words", {"relation": "equal to", "num_words": "5"}, "one two three four five",
+     (True, "No error")),
+    ("startend:start_checker", {"start_phrase": "hello"}, RESPONSE, (True, "No error")),
+    ("startend:end_checker", {"end_phrase": "thanks"}, RESPONSE, (True, "No error")),
+    ("startend:wrap_checker", {"wrap_phrase": "**"}, RESPONSE, (False, "Not wrapped with: **")),
+    ("startend:quotation", {}, '"quoted"', (True, "No error")),
+    ("unknown:instruction", {}, RESPONSE, (True, "No error")),
+]
+
+# Malformed kwargs: relations other than the three known ones compare as "less than", as the
+# old chain did; expected values are converted instead of eval()ed
+INVALID_INPUT_RESULTS = [
+    ({"relation": "most", "num_words": 9}, (True, "No error")),
+    ({"relation": ["at least"], "num_words": 9}, (True, "No error")),
+    ({"relation": "at least", "num_words": "3"}, (True, "No error")),
+    ({"relation": "at least", "num_words": "abc"},
+     (False, "Validation error: could not convert string to float: 'abc'")),
+    ({"relation": "at least", "num_words": "1 + 1"},
+     (False, "Validation error: could not convert string to float: '1 + 1'")),
+    ({"relation": "at least", "num_words": None},
+     (False, "Validation error: '>=' not supported between instances of 'int' and 'NoneType'")),
+    ({"relation": "at least"}, (False, "Validation error: 'num_words'")),
+    ({"num_words": 3}, (False, "Validation error: 'relation'")),
+]
+
+# The target is stripped and lowercased before it is searched for
+INVALID_TARGET_RESULTS = [
+    ("change_case:lowercase_target", {}, (False, "Validation error: 'target_string'")),
+    ("change_case:lowercase_target", {"target_string": None},
+     (False, "Validation error: 'NoneType' object has no attribute 'strip'")),
+    ("change_case:lowercase_target", {"target_string": 5},
+     (False, "Validation error: 'int' object has no attribute 'strip'")),
+    ("change_case:all_caps_target", {"target_string": "  TWO "}, (False, "'two' should be ALL CAPS.")),
+]
+
+
+@pytest.mark.parametrize("inst_type, kwargs, response, expected", VALID_INPUT_RESULTS)
+def test_valid_input_keeps_original_results(inst_type, kwargs, response, expected):
+    assert validate_instruction(response, inst_type, kwargs) == expected
+    assert compile_instruction({"instruction_id": inst_type, **kwargs})(response) == expected
+
+
+@pytest.mark.parametrize("kwargs, expected", INVALID_INPUT_RESULTS)
+def test_invalid_relation_kwargs(kwargs, expected):
+    assert validate_instruction("one two three four five", "length_constraints:number_words", kwargs) == expected
+
+
+@pytest.mark.parametrize("inst_type, kwargs, expected", INVALID_TARGET_RESULTS)
+def test_invalid_target_kwargs(inst_type, kwargs, expected):
+    assert validate_instruction("one two three four five", inst_type, kwargs) == expected
+
+
+def test_conflicting_pairs_order():
+    ids = ["punctuation:no_comma", "change_case:lowercase", "change_case:all_caps", "detectable_format:json_format",
+           "startend:quotation", "change_case:alternating"]
+    turns = [{"instructions": [{"instruction_id": i} for i in ids]},
+             {"instructions": [{"instruction_id": "punctuation:no_comma"}]},
+             {"instructions": [{"instruction_id": i} for i in reversed(ids)]}]
+    # Pairs in sorted ID order whatever the order of the instructions; turns without conflicts are left out
+    expected = [("change_case:all_caps", "change_case:alternating"),
+                ("change_case:all_caps", "change_case:lowercase"),
+                ("change_case:alternating", "change_case:lowercase")]
+    assert find_conflicting_instructions(turns) == [expected, expected]
+    assert check_contradicting_instructions(turns[0]["instructions"]) == {
+        f"{first} and {second} are contradicting" for first, second in expected}
@@ -0,0 +1,63 @@
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MEMO_ENTRIES = 65536
+
+# (response digest, canonical instruction) -> (valid, message)
+MemoKey = Tuple[bytes, str]
+
+
+def response_digest(response: str) -> bytes:
+    """Fixed-size digest of a response, so memo keys do not hold on to the response text."""
+    return hashlib.sha256(response.encode("utf-8", "surrogatepass")).digest()[:16]
+
+
+def freeze_instruction(instruction: Dict[str, Any]) -> str:
+    """
+    Canonical form of an instruction dict: key order does not matter, but value types do
+    (1, 1.0 and true can produce different messages).
+    """
+    return json.dumps(instruction, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=repr)
+
+
+class ValidationMemo:
+    """
+    Bounded memo of instruction check results keyed by (response digest, frozen instruction).
+    Least recently used entries are evicted once max_entries is reached. Not shared between
+    processes: each batch worker keeps its own memo across the notebooks it processes.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MEMO_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[MemoKey, Tuple[bool, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: MemoKey) -> Optional[Tuple[bool, str]]:
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: MemoKey, result: Tuple[bool, str]) -> None:
+        self.entries[key] = result
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries),
+                "max_entries": self.max_entries, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+# Process-wide memo used by pipeline.validate_turn
+VALIDATION_MEMO = ValidationMemo()
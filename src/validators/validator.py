@@ -1,11 +1,16 @@
 import re
 import string
 import json
-from typing import Dict, List, Tuple, Any
+import operator
+from typing import Dict, List, Tuple, Any, Callable, Union
 import copy
 import json
 import re
-from data_loader import conflict_dict
+from validators.conflict_index import CONFLICT_INDEX
+from validators.kwargs_schema import KwargsSchema, KWARGS_SCHEMA, kwargs_schema_for
+from validators.response_profile import ResponseProfile
+from validators.keyword_matcher import get_keyword_matcher
+from notebook_processing.reader import load_notebook, markdown_cells
 from collections import defaultdict
 
 # Map of expected kwargs for each instruction ID
@@ -52,23 +57,23 @@ def char_frequency(response: str, char: str) -> int:
 
 def count_numbered_items(response: str) -> int:
     """Count number of numbered items in response."""
-    return len(re.findall(r'^\s*\d+\.', response, re.MULTILINE))
+    return ResponseProfile(response).numbered_item_count
 
 def count_bullet_points(response: str) -> int:
     """Count number of bullet points in response."""
-    return len(re.findall(r'^[*-•]\s', response, re.MULTILINE))
+    return ResponseProfile(response).bullet_point_count
 
 def count_placeholders(response: str) -> int:
     """Count number of placeholders in response."""
-    return len(re.findall(r'\[.*?\]', response))
+    return ResponseProfile(response).placeholder_count
 
 def count_all_caps_words(response: str) -> int:
     """Count number of all-caps words in response."""
-    return sum(1 for w in response.split() if w.isupper())
+    return ResponseProfile(response).all_caps_word_count
 
 def count_lowercase_words(response: str) -> int:
     """Count number of lowercase words in response."""
-    return sum(1 for w in response.split() if w.islower())
+    return ResponseProfile(response).lowercase_word_count
 
 def word_frequency(response: str, word: str) -> int:
     """Count frequency of a word in response."""
@@ -77,226 +82,342 @@ def word_frequency(response: str, word: str) -> int:
 
 def keyword_frequency(response: str, keyword: str) -> int:
     """Count frequency of a keyword in response, ensuring it's a full word or phrase."""
-    pattern = r'\b' + re.escape(keyword.strip()) + r'\b'
-    return len(re.findall(pattern, response, flags=re.IGNORECASE))
+    return get_keyword_matcher((keyword,)).counts(response)[0]
 
-def validate_instruction(response: str, inst_type: str, kwargs: Dict[str, Any], all_instructions: Dict = None) -> Tuple[bool, str]:
-    """Validate a response against a specific instruction type and its kwargs."""
-    try:
-        if inst_type == "change_case:all_caps":
-            return (response.isupper(), "No error" if response.isupper() else "Response is not all uppercase.")
-
-        if inst_type == "change_case:lowercase":
-            return (response.islower(), "No error" if response.islower() else "Response is not all lowercase.")
-
-        if inst_type == "change_case:alternating":
-            valid = all(is_strict_alternating(w) for w in response.split() if w.isalpha())
-            return (valid, "No error" if valid else "Response is not strictly alternating caps.")
-
-        if inst_type == "change_case:first_letter_cap":
-            valid = all(w.istitle() for w in response.split() if w.isalpha())
-            return (valid, "No error" if valid else "Not all words are first-letter capitalized.")
-
-        if inst_type == "change_case:capital_word_frequency":
-            count = count_all_caps_words(response)
-            rel, val = kwargs['capital_relation'], kwargs['capital_frequency']
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (valid, "No error" if valid else f"Expected {rel} {val} all-cap words, found {count}.")
-
-        if inst_type == "change_case:lowercase_word_frequency":
-            count = count_lowercase_words(response)
-            rel, val = kwargs['lowercase_relation'], kwargs['lowercase_frequency']
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (valid, "No error" if valid else f"Expected {rel} {val} lowercase words, found {count}.")
+# Comparison used for each relation value; any other value is treated as "less than"
+RELATION_OPERATORS = {
+    "at least": operator.ge,
+    "equal to": operator.eq,
+    "less than": operator.lt,
+}
 
-        if "_target" in inst_type:
-            target = kwargs["target_string"].strip().lower()
-            target_escaped = re.escape(target)
-            pattern = rf'\b{target_escaped}\b'
-            matches = re.findall(pattern, response, re.IGNORECASE)
+def _as_number(value: Any) -> Any:
+    """Accept numeric strings such as "5" for relation values, as the old eval() did."""
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+def compare(count: int, relation: str, value: Any) -> bool:
+    """Compare a count against the expected value using the instruction's relation."""
+    # Unhashable relations (e.g. a list) also fall back to "less than" instead of failing the lookup
+    op = RELATION_OPERATORS.get(relation, operator.lt) if isinstance(relation, (str, type(None))) else operator.lt
+    return op(count, _as_number(value))
+
+def count_verdict(count: int, rel: str, val: Any, counted: str) -> Tuple[bool, str]:
+    """Result of a counting check; the failure message names what was counted."""
+    valid = compare(count, rel, val)
+    return (valid, "No error" if valid else f"Expected {rel} {val} {counted}, found {count}.")
+
+# Map of instruction ID -> factory that turns the instruction kwargs into a check(profile)
+INSTRUCTION_CHECKS: Dict[str, Callable[[Dict[str, Any]], Callable[[ResponseProfile], Tuple[bool, str]]]] = {}
+
+def register_check(*inst_types: str):
+    """Register a check factory for one or more instruction IDs."""
+    def decorator(factory):
+        for inst_type in inst_types:
+            INSTRUCTION_CHECKS[inst_type] = factory
+        return factory
+    return decorator
+
+def _pass(profile: ResponseProfile) -> Tuple[bool, str]:
+    return (True, "No error")
 
-            if not matches:
-                return (False, f"Target '{target}' not found in response.")
+@register_check("change_case:all_caps")
+def _all_caps(kwargs):
+    def check(profile):
+        return (profile.is_upper, "No error" if profile.is_upper else "Response is not all uppercase.")
+    return check
+
+@register_check("change_case:lowercase")
+def _lowercase(kwargs):
+    def check(profile):
+        return (profile.is_lower, "No error" if profile.is_lower else "Response is not all lowercase.")
+    return check
+
+@register_check("change_case:alternating")
+def _alternating(kwargs):
+    def check(profile):
+        valid = all(is_strict_alternating(w) for w in profile.alpha_tokens)
+        return (valid, "No error" if valid else "Response is not strictly alternating caps.")
+    return check
+
+@register_check("change_case:first_letter_cap")
+def _first_letter_cap(kwargs):
+    def check(profile):
+        valid = all(w.istitle() for w in profile.alpha_tokens)
+        return (valid, "No error" if valid else "Not all words are first-letter capitalized.")
+    return check
+
+@register_check("change_case:capital_word_frequency")
+def _capital_word_frequency(kwargs):
+    rel, val = kwargs['capital_relation'], kwargs['capital_frequency']
+    def check(profile):
+        return count_verdict(profile.all_caps_word_count, rel, val, "all-cap words")
+    return check
+
+@register_check("change_case:lowercase_word_frequency")
+def _lowercase_word_frequency(kwargs):
+    rel, val = kwargs['lowercase_relation'], kwargs['lowercase_frequency']
+    def check(profile):
+        return count_verdict(profile.lowercase_word_count, rel, val, "lowercase words")
+    return check
+
+# Case rule and failure message for each *_target instruction
+TARGET_CASE_CHECKS = {
+    "change_case:all_caps_target": (str.isupper, "'{}' should be ALL CAPS."),
+    "change_case:lowercase_target": (str.islower, "'{}' should be all lowercase."),
+    "change_case:alternating_target": (is_strict_alternating, "'{}' is not in alternating caps."),
+    "change_case:first_letter_cap_target": (str.istitle, "'{}' is not first-letter capitalized."),
+}
 
+def _compile_target(inst_type: str, kwargs: Dict[str, Any]) -> Callable[[ResponseProfile], Tuple[bool, str]]:
+    """Build the check for any instruction ID containing '_target'."""
+    target = kwargs["target_string"].strip().lower()
+    pattern = re.compile(rf'\b{re.escape(target)}\b', re.IGNORECASE)
+    case_check = TARGET_CASE_CHECKS.get(inst_type)
+
+    def check(profile):
+        matches = pattern.findall(profile.text)
+        if not matches:
+            return (False, f"Target '{target}' not found in response.")
+        if case_check:
+            predicate, message = case_check
             for match in matches:
                 raw_text = match.strip('"').strip("'")
-                if inst_type == "change_case:all_caps_target" and not raw_text.isupper():
-                    return (False, f"'{raw_text}' should be ALL CAPS.")
-                elif inst_type == "change_case:lowercase_target" and not raw_text.islower():
-                    return (False, f"'{raw_text}' should be all lowercase.")
-                elif inst_type == "change_case:alternating_target" and not is_strict_alternating(raw_text):
-                    return (False, f"'{raw_text}' is not in alternating caps.")
-                elif inst_type == "change_case:first_letter_cap_target" and not raw_text.istitle():
-                    return (False, f"'{raw_text}' is not first-letter capitalized.")
-
+                if not predicate(raw_text):
+                    return (False, message.format(raw_text))
+        return (True, "No error")
+    return check
+
+@register_check("detectable_content:number_placeholders")
+def _number_placeholders(kwargs):
+    rel, val = kwargs["relation"], kwargs["num_placeholders"]
+    def check(profile):
+        return count_verdict(profile.placeholder_count, rel, val, "placeholders")
+    return check
+
+@register_check("detectable_content:postscript")
+def _postscript(kwargs):
+    marker = kwargs.get("postscript_marker", "PS:").strip()
+    def check(profile):
+        for line in reversed(profile.lines):
+            if line.strip():
+                last_line = line.strip()
+                break
+        else:
+            last_line = ""
+
+        has_postscript = last_line.startswith(marker) and len(last_line) > len(marker)
+        return (
+            has_postscript,
+            "No error" if has_postscript else f"Postscript must start with '{marker}' and contain content. Found: '{last_line}'"
+        )
+    return check
+
+@register_check("detectable_format:json_format")
+def _json_format(kwargs):
+    def check(profile):
+        try:
+            response = profile.text
+            json_part = response[response.find("{"):response.rfind("}")+1]
+            json.loads(json_part)
             return (True, "No error")
-
-        if inst_type == "detectable_content:number_placeholders":
-            count = count_placeholders(response)
-            rel, val = kwargs["relation"], kwargs["num_placeholders"]
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (valid, "No error" if valid else f"Expected {rel} {val} placeholders, found {count}.")
-
-        if inst_type == "detectable_content:postscript":
-            marker = kwargs.get("postscript_marker", "PS:").strip()
-            lines = response.strip().splitlines()
-            for line in reversed(lines):
-                if line.strip():
-                    last_line = line.strip()
-                    break
-            else:
-                last_line = ""
-
-            has_postscript = last_line.startswith(marker) and len(last_line) > len(marker)
-            return (
-                has_postscript,
-                "No error" if has_postscript else f"Postscript must start with '{marker}' and contain content. Found: '{last_line}'"
-            )
-
-        if inst_type == "detectable_format:json_format":
-            try:
-                json_part = response[response.find("{"):response.rfind("}")+1]
-                json.loads(json_part)
-                return (True, "No error")
-            except:
-                return (False, "Response is not valid JSON format.")
-
-        if inst_type == "detectable_format:multiple_sections":
-            splitter = kwargs.get("section_splitter", "").strip()
-            rel = kwargs.get("relation")
-            val = kwargs.get("num_sections")
-            pattern = rf"^\s*[#>*\-]*\s*{re.escape(splitter)}\s+\d+\b"
-            sections = re.findall(pattern, response, re.MULTILINE | re.IGNORECASE)
-            valid = eval(f"{len(sections)} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (valid, "No error" if valid else f"Expected {rel} {val} sections, found {len(sections)}.")
-
-        if inst_type == "detectable_format:numbered_list":
-            count = count_numbered_items(response)
-            rel, val = kwargs["relation"], kwargs["num_numbered_items"]
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (valid, "No error" if valid else f"Expected {rel} {val} numbered items, found {count}.")
-
-        if inst_type == "detectable_format:number_bullet_lists":
-            count = count_bullet_points(response)
-            rel, val = kwargs["relation"], kwargs["num_bullets"]
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (valid, "No error" if valid else f"Expected {rel} {val} bullet points, found {count}.")
-
-        if inst_type == "detectable_format:title":
-            lines = response.strip().splitlines()
-            found_title = any(line.strip().startswith("<<") and line.strip().endswith(">>") for line in lines)
-            return (
-                found_title,
-                "No error" if found_title else "Title not wrapped in << >> on any line."
-            )
-
-        if inst_type == "keywords:existence":
-            missing = [kw for kw in kwargs["keywords"] if keyword_frequency(response, kw) == 0]
-            return (not missing, "No error" if not missing else f"Missing keyword(s): {missing}")
-
-        if inst_type == "keywords:frequency":
-            keyword = kwargs["keyword"].strip().lower()
-            count = keyword_frequency(response, keyword)
-            rel = kwargs["relation"]
-            val = kwargs["frequency"]
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (
-                valid,
-                "No error" if valid else f"Expected {rel} {val} of '{keyword}', found {count}."
-            )
-
-        if inst_type == "keywords:forbidden_words":
-            present = [w for w in kwargs["forbidden_words"] if keyword_frequency(response, w)]
-            return (not present, "No error" if not present else f"Forbidden words found: {present}")
-
-        if inst_type == "keywords:letter_frequency":
-            letter = kwargs["letter"].lower()
-            count = response.lower().count(letter)
-            rel, val = kwargs["let_relation"], kwargs["let_frequency"]
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (
-                valid,
-                "No error" if valid else f"Expected {rel} {val} '{letter}' (case-insensitive), found {count}."
-            )
-
-        if inst_type == "punctuation:no_comma":
-            return (',' not in response, "No error" if ',' not in response else "Commas found in response.")
-
-        if inst_type == "length_constraints:number_characters":
-            count = len(response.strip())
-            rel, val = kwargs["relation"], kwargs["num_chars"]
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (valid, "No error" if valid else f"Expected {rel} {val} characters, found {count}.")
-
-        if inst_type == "length_constraints:number_words":
-            count = len(re.compile(r'\b(?=\S*[A-Za-z0-9])\S+\b').findall(response))
-            rel, val = kwargs["relation"], kwargs["num_words"]
-            valid = eval(f"{count} {'>=' if rel == 'at least' else '==' if rel == 'equal to' else '<'} {val}")
-            return (valid, "No error" if valid else f"Expected {rel} {val} words, found {count}.")
-
-        if inst_type == "startend:start_checker":
-            starts_correctly = response.lstrip(string.punctuation + " ").lower().startswith(kwargs.get("start_phrase", "").lower())
+        except:
+            return (False, "Response is not valid JSON format.")
+    return check
+
+@register_check("detectable_format:multiple_sections")
+def _multiple_sections(kwargs):
+    splitter = kwargs.get("section_splitter", "").strip()
+    rel = kwargs.get("relation")
+    val = kwargs.get("num_sections")
+    pattern = re.compile(rf"^\s*[#>*\-]*\s*{re.escape(splitter)}\s+\d+\b", re.MULTILINE | re.IGNORECASE)
+    def check(profile):
+        return count_verdict(len(pattern.findall(profile.text)), rel, val, "sections")
+    return check
+
+@register_check("detectable_format:numbered_list")
+def _numbered_list(kwargs):
+    rel, val = kwargs["relation"], kwargs["num_numbered_items"]
+    def check(profile):
+        return count_verdict(profile.numbered_item_count, rel, val, "numbered items")
+    return check
+
+@register_check("detectable_format:number_bullet_lists")
+def _number_bullet_lists(kwargs):
+    rel, val = kwargs["relation"], kwargs["num_bullets"]
+    def check(profile):
+        return count_verdict(profile.bullet_point_count, rel, val, "bullet points")
+    return check
+
+@register_check("detectable_format:title")
+def _title(kwargs):
+    def check(profile):
+        found_title = any(line.strip().startswith("<<") and line.strip().endswith(">>") for line in profile.lines)
+        return (
+            found_title,
+            "No error" if found_title else "Title not wrapped in << >> on any line."
+        )
+    return check
+
+@register_check("keywords:existence")
+def _keywords_existence(kwargs):
+    keywords = kwargs["keywords"]
+    matcher = get_keyword_matcher(keywords)
+    def check(profile):
+        counts = matcher.counts(profile.text)
+        missing = [kw for kw, count in zip(keywords, counts) if count == 0]
+        return (not missing, "No error" if not missing else f"Missing keyword(s): {missing}")
+    return check
+
+@register_check("keywords:frequency")
+def _keywords_frequency(kwargs):
+    keyword = kwargs["keyword"].strip().lower()
+    matcher = get_keyword_matcher((keyword,))
+    rel = kwargs["relation"]
+    val = kwargs["frequency"]
+    def check(profile):
+        return count_verdict(matcher.counts(profile.text)[0], rel, val, f"of '{keyword}'")
+    return check
+
+@register_check("keywords:forbidden_words")
+def _forbidden_words(kwargs):
+    forbidden_words = kwargs["forbidden_words"]
+    matcher = get_keyword_matcher(forbidden_words)
+    def check(profile):
+        counts = matcher.counts(profile.text)
+        present = [w for w, count in zip(forbidden_words, counts) if count]
+        return (not present, "No error" if not present else f"Forbidden words found: {present}")
+    return check
+
+@register_check("keywords:letter_frequency")
+def _letter_frequency(kwargs):
+    letter = kwargs["letter"].lower()
+    rel, val = kwargs["let_relation"], kwargs["let_frequency"]
+    def check(profile):
+        return count_verdict(profile.lower.count(letter), rel, val, f"'{letter}' (case-insensitive)")
+    return check
+
+@register_check("punctuation:no_comma")
+def _no_comma(kwargs):
+    def check(profile):
+        has_comma = profile.has_comma
+        return (not has_comma, "No error" if not has_comma else "Commas found in response.")
+    return check
+
+@register_check("length_constraints:number_characters")
+def _number_characters(kwargs):
+    rel, val = kwargs["relation"], kwargs["num_chars"]
+    def check(profile):
+        return count_verdict(len(profile.stripped), rel, val, "characters")
+    return check
+
+@register_check("length_constraints:number_words")
+def _number_words(kwargs):
+    rel, val = kwargs["relation"], kwargs["num_words"]
+    def check(profile):
+        return count_verdict(profile.word_count, rel, val, "words")
+    return check
+
+@register_check("startend:start_checker")
+def _start_checker(kwargs):
+    start_phrase = kwargs.get("start_phrase", "").lower()
+    def check(profile):
+        starts_correctly = profile.text.lstrip(string.punctuation + " ").lower().startswith(start_phrase)
+        return (
+            starts_correctly,
+            "No error" if starts_correctly else "Response does not start with required phrase."
+        )
+    return check
+
+@register_check("startend:end_checker")
+def _end_checker(kwargs):
+    required = kwargs["end_phrase"].strip()
+    # Check if required phrase ends with punctuation
+    ends_with_punctuation = required[-1] in string.punctuation if required else False
+
+    def check(profile):
+        # Get the actual end of the response
+        actual_words = profile.text.lstrip(string.punctuation).strip().split()
+        if not actual_words:
+            return (False, "Empty response")
+
+        # If required phrase ends with punctuation, we need exact match
+        if ends_with_punctuation:
+            actual_phrase = " ".join(actual_words[-len(required.split()):])
+        else:
+            # If no punctuation, strip trailing punctuation and whitespace
+            actual_phrase = " ".join(actual_words).rstrip(string.punctuation + " ")[-len(required):]
+        if actual_phrase.lower() != required.lower():
             return (
-                starts_correctly,
-                "No error" if starts_correctly else "Response does not start with required phrase."
+                False,
+                f"End phrase mismatch: expected '{required}', but found '{actual_phrase}'"
             )
+        return (True, "No error")
+    return check
+
+@register_check("startend:wrap_checker")
+def _wrap_checker(kwargs):
+    wrap = kwargs["wrap_phrase"]
+    def check(profile):
+        stripped = profile.stripped
+        return (stripped.startswith(wrap) and stripped.endswith(wrap),
+                "No error" if stripped.startswith(wrap) else f"Not wrapped with: {wrap}")
+    return check
+
+@register_check("startend:quotation")
+def _quotation(kwargs):
+    def check(profile):
+        stripped = profile.stripped
+        return (stripped.startswith('"') and stripped.endswith('"'),
+                "No error" if stripped.startswith('"') else "Response not wrapped in double quotes.")
+    return check
+
+class CompiledInstruction:
+    """An instruction compiled once into a check that can be applied to any number of responses."""
+
+    __slots__ = ("instruction_id", "_check", "_error")
+
+    def __init__(self, inst_type: str, kwargs: Dict[str, Any]):
+        self.instruction_id = inst_type
+        self._check = _pass
+        self._error = None
+        try:
+            factory = INSTRUCTION_CHECKS.get(inst_type)
+            if factory is not None:
+                self._check = factory(kwargs)
+            elif "_target" in inst_type:
+                self._check = _compile_target(inst_type, kwargs)
+        except Exception as e:
+            self._error = f"Validation error: {str(e)}"
+
+    def __call__(self, response: Union[str, ResponseProfile]) -> Tuple[bool, str]:
+        """Check a response, given either as text or as a ResponseProfile shared with other checks."""
+        if self._error is not None:
+            return (False, self._error)
+        try:
+            profile = response if isinstance(response, ResponseProfile) else ResponseProfile(response)
+            return self._check(profile)
+        except Exception as e:
+            return (False, f"Validation error: {str(e)}")
+
+def compile_instruction(instruction: Dict[str, Any]) -> CompiledInstruction:
+    """Compile an instruction dict ({"instruction_id": ..., **kwargs}) into a reusable check."""
+    kwargs = {k: v for k, v in instruction.items() if k != "instruction_id"}
+    return CompiledInstruction(instruction["instruction_id"], kwargs)
 
-        if inst_type == "startend:end_checker":
-            required = kwargs["end_phrase"].strip()
-            # Check if required phrase ends with punctuation
-            ends_with_punctuation = required[-1] in string.punctuation if required else False
-            
-            # Get the actual end of the response
-            actual_words = response.lstrip(string.punctuation).strip().split()
-            if not actual_words:
-                return (False, "Empty response")
-                
-            # If required phrase ends with punctuation, we need exact match
-            if ends_with_punctuation:
-                actual_phrase = " ".join(actual_words[-len(required.split()):])
-                if actual_phrase.lower() != required.lower():
-                    return (
-                        False,
-                        f"End phrase mismatch: expected '{required}', but found '{actual_phrase}'"
-                    )
-            else:
-                # If no punctuation, strip trailing punctuation and whitespace
-                actual_phrase = " ".join(actual_words).rstrip(string.punctuation + " ")[-len(required):]
-                if actual_phrase.lower() != required.lower():
-                    return (
-                        False,
-                        f"End phrase mismatch: expected '{required}', but found '{actual_phrase}'"
-                    )
-            return (True, "No error")
-
-        if inst_type == "startend:wrap_checker":
-            wrap = kwargs["wrap_phrase"]
-            return (response.strip().startswith(wrap) and response.strip().endswith(wrap),
-                    "No error" if response.strip().startswith(wrap) else f"Not wrapped with: {wrap}")
-
-        if inst_type == "startend:quotation":
-            return (response.strip().startswith('"') and response.strip().endswith('"'),
-                    "No error" if response.strip().startswith('"') else "Response not wrapped in double quotes.")
-
-    except Exception as e:
-        return (False, f"Validation error: {str(e)}")
-
-    return (True, "No error")
+def validate_instruction(response: str, inst_type: str, kwargs: Dict[str, Any], all_instructions: Dict = None) -> Tuple[bool, str]:
+    """Validate a response against a specific instruction type and its kwargs."""
+    return CompiledInstruction(inst_type, kwargs)(response)
 
 def check_contradicting_instructions(instructions_list: List[Dict]) -> List[Dict]:
     """Check for contradicting instruction IDs in the list (order-insensitive)."""
-    errors, seen_pairs = set(), set()
-    # Collect all instruction IDs
-    ids = {inst["instruction_id"] for inst in instructions_list if isinstance(inst, dict) and "instruction_id" in inst}
-
-    # Check each instruction for conflicts
-    for instr_id in ids:
-        for conflicting_id in conflict_dict.get(instr_id, []):
-            pair = frozenset([instr_id, conflicting_id])
-            if conflicting_id in ids and pair not in seen_pairs:
-                errors.add(f"{instr_id} and {conflicting_id} are contradicting")
-                seen_pairs.add(pair)
-    return errors
+    ids = (inst["instruction_id"] for inst in instructions_list if isinstance(inst, dict) and "instruction_id" in inst)
+    pairs = CONFLICT_INDEX.conflicting_pairs(CONFLICT_INDEX.mask(ids))
+    return {f"{instr_id} and {conflicting_id} are contradicting" for instr_id, conflicting_id in pairs}
 
 def validate_instruction_schema(instructions: Dict) -> List[Dict]:
     """Validate the schema of instructions against expected arguments and check for contradicting instructions."""
@@ -358,16 +479,17 @@ def validate_instruction_schema(instructions: Dict) -> List[Dict]:
     return mismatches 
 
 def extract_notebook_sections_as_dict(ipynb_path):
-    with open(ipynb_path, 'r', encoding='utf-8') as file:
-        notebook_data = json.load(file)
+    with open(ipynb_path, 'rb') as file:
+        notebook_data = load_notebook(file.read())
+    return extract_notebook_sections(notebook_data)
 
-    result = defaultdict(list)
 
-    for cell in notebook_data.get('cells', []):
-        if cell.get('cell_type') != 'markdown':
-            continue
+def extract_notebook_sections(notebook_data):
+    """Group the markdown cells of an already parsed notebook by their **[tag]** header."""
+    result = defaultdict(list)
 
-        content = ''.join(cell.get('source', [])).strip()
+    for source in markdown_cells(notebook_data):
+        content = source.strip()
         split_lines = content.splitlines()
         if split_lines[0] == '# Metadata':
             result['task_metadata'].append(content)
@@ -382,14 +504,21 @@ def extract_notebook_sections_as_dict(ipynb_path):
 
 
 def validate_notebook_schema(notebook, template_json, log_filename):
+    logs = notebook_schema_logs(notebook, template_json)
+    with open(log_filename, "w", encoding="utf-8") as f:
+        f.writelines(line + '\n' for line in logs)
+
+
+def notebook_schema_logs(notebook, template_json):
+    """Run the notebook schema checks and return the log lines, the last being 'True' or 'False' on success."""
     logs = []
     try:
         dict_turn_metadata = turn_metadata_json_to_dict(notebook['turn_metadata'])
         correct_turn_metadata = compare_consecutive_metadata_items(dict_turn_metadata)
         
         conflicting_instructions = find_conflicting_instructions(dict_turn_metadata)
-        issues_in_keys_against_template = validate_keys_against_template(template_json, dict_turn_metadata)
-        issues_in_instruction_kwargs_datatype = validate_instruction_kwargs_datatype(dict_turn_metadata)
+        issues_in_keys_against_template, issues_in_instruction_kwargs_datatype = instruction_schema_issues(
+            dict_turn_metadata, kwargs_schema_for(template_json))
 
         logs.append(f'CONFLICTING INSTRUCTIONS FOUND - {conflicting_instructions}')
         logs.append(f'INSTRUCTION ARGUMENT MISMATCHES IN TURN JSON - {issues_in_keys_against_template}')
@@ -411,9 +540,7 @@ def validate_notebook_schema(notebook, template_json, log_filename):
             logs.append('False')
     except Exception as e:
         logs.append(f'Some error occurred while validating the notebook - {e}')
-    finally:
-        with open(log_filename, "w", encoding="utf-8") as f:
-            f.writelines(line + '\n' for line in logs)
+    return logs
 
 
 def turn_metadata_json_to_dict(turn_metadata):
@@ -475,193 +602,79 @@ def find_conflicting_instructions(dict_turn_metadata):
     conflicts_found = []
 
     for data in dict_turn_metadata:
-        instruction_ids = {instr["instruction_id"] for instr in data.get("instructions", [])}
-        current_conflicts = []
-
-        for instr_id in instruction_ids:
-            if instr_id in conflict_dict:
-                for conflicting_id in conflict_dict[instr_id]:
-                    if conflicting_id in instruction_ids:
-                        pair = tuple(sorted((instr_id, conflicting_id)))
-                        if pair not in current_conflicts:
-                            current_conflicts.append(pair)
-
-        if current_conflicts:
-            conflicts_found.append(current_conflicts)
+        pairs = CONFLICT_INDEX.conflicting_pairs(
+            CONFLICT_INDEX.mask(instr["instruction_id"] for instr in data.get("instructions", [])))
+        if pairs:
+            conflicts_found.append([tuple(sorted(pair)) for pair in pairs])
 
     return conflicts_found
 
 
-def validate_keys_against_template(template_json, dict_turn_metadata):
-    # Map template instruction_id to expected key set
-    template_keys = {
-        instr["instruction_id"]: set(instr.keys())
-        for instr in template_json.get("instructions", [])
-    }
-    idx, res = 1, []
-
-    for input_json in dict_turn_metadata:
-        mismatches = {}
-
-        # Check each instruction in input_json
-        for instr in input_json.get("instructions", []):
-            instr_id = instr.get("instruction_id")
-            input_keys = set(instr.keys())
-
-            if instr_id not in template_keys:
-                mismatches[instr_id] = {
-                    "error": "instruction_id not in template"
-                }
-            elif input_keys != template_keys[instr_id]:
-                mismatches[instr_id] = {
-                    "missing_keys": list(template_keys[instr_id] - input_keys),
-                    "extra_keys": list(input_keys - template_keys[instr_id])
-                }
-        res.append({f"TURN {idx}": mismatches}) if mismatches else ''
-        idx += 1
-    return res
-
-
-def validate_instruction_kwargs_datatype(dict_turn_metadata):
-    def is_valid_str(val):
-        return isinstance(val, str)
-
-    def is_valid_int(val):
-        return isinstance(val, int)
-
-    def is_valid_list_str(val):
-        return isinstance(val, list) and all(isinstance(i, str) for i in val)
+def instruction_schema_issues(dict_turn_metadata, schema: KwargsSchema = KWARGS_SCHEMA):
+    """
+    Check every turn's instructions against the compiled instruction template in one pass,
+    with one schema lookup per instruction.
+    return: (key issues, kwarg type issues) - per turn with issues, {"TURN n": {instruction_id: mismatch}}
+            for the keys missing or extra against the template and {"TURN n": [error, ...]} for
+            metadata and kwarg types
+    """
+    key_issues, type_issues = [], []
 
-    def is_valid_relation(val):
-        return val in valid_relations
+    for turn, data in enumerate(dict_turn_metadata, 1):
+        mismatches, errors = {}, []
 
-    valid_relations = {"at least", "equal to", "less than"}
-    turn, issues = 1, []
-
-    for data in dict_turn_metadata:
-        errors = []
-
-        # Check metadata
         if not isinstance(data.get("metadata"), set) or not all(isinstance(item, str) for item in data["metadata"]):
             errors.append("metadata must be a list of strings.")
 
-        # Check instructions
         instructions = data.get("instructions", [])
         if not isinstance(instructions, list):
             errors.append("instructions must be a list.")
-            return errors
+            instructions = []
 
-        for idx, inst in enumerate(instructions):
-            if not isinstance(inst, dict):
+        for idx, instr in enumerate(instructions):
+            if not isinstance(instr, dict):
                 errors.append(f"Instruction at index {idx} is not a dict.")
                 continue
 
-            iid = inst.get("instruction_id")
-            if not iid or not isinstance(iid, str):
+            instr_id = instr.get("instruction_id")
+            entry = schema.entries.get(instr_id)
+            checks = ()
+            if entry is None:
+                mismatches[instr_id] = {"error": "instruction_id not in template"}
+            else:
+                template_keys, checks = entry
+                if instr.keys() != template_keys:
+                    input_keys = set(instr.keys())
+                    mismatches[instr_id] = {
+                        "missing_keys": list(template_keys - input_keys),
+                        "extra_keys": list(input_keys - template_keys)
+                    }
+
+            if not instr_id or not isinstance(instr_id, str):
                 errors.append(f"Missing or invalid instruction_id at index {idx}")
-                continue
+            elif not checks:
+                # Instructions without kwargs (and unknown ones) carry nothing but their instruction_id
+                if len(instr) > 1:
+                    errors.append(f"{instr_id}: should not contain incorrect/extra fields")
+            else:
+                for kwarg, check, expected in checks:
+                    if not check(instr.get(kwarg)):
+                        errors.append(f"{instr_id}: '{kwarg}' must be {expected}")
 
-            def add_error(field, expected_type):
-                errors.append(f"{iid}: '{field}' must be {expected_type}")
-
-            # Validate per instruction_id
-            if iid == "length_constraints:number_characters":
-                if not is_valid_relation(inst.get("relation")):
-                    add_error("relation", "one of 'at least', 'equal to', 'less than'")
-                if not is_valid_int(inst.get("num_chars")):
-                    add_error("num_chars", "int")
-
-            elif iid == "keywords:existence":
-                if not is_valid_list_str(inst.get("keywords")):
-                    add_error("keywords", "list of str")
-
-            elif iid == "detectable_format:numbered_list":
-                if not is_valid_relation(inst.get("relation")):
-                    add_error("relation", "valid relation")
-                if not is_valid_int(inst.get("num_numbered_items")):
-                    add_error("num_numbered_items", "int")
-
-            elif iid == "keywords:frequency":
-                if not is_valid_str(inst.get("keyword")):
-                    add_error("keyword", "str")
-                if not is_valid_relation(inst.get("relation")):
-                    add_error("relation", "valid relation")
-                if not is_valid_int(inst.get("frequency")):
-                    add_error("frequency", "int")
-
-            elif iid == "length_constraints:number_words":
-                if not is_valid_relation(inst.get("relation")):
-                    add_error("relation", "valid relation")
-                if not is_valid_int(inst.get("num_words")):
-                    add_error("num_words", "int")
-
-            elif iid in {
-                "change_case:all_caps_target",
-                "change_case:lowercase_target",
-                "startend:wrap_checker",
-                "change_case:alternating_target",
-                "startend:end_checker",
-                "change_case:first_letter_cap_target",
-                "detectable_content:postscript",
-                "startend:start_checker"
-            }:
-                if not is_valid_str(
-                        inst.get("target_string") or inst.get("wrap_phrase") or inst.get("end_phrase") or inst.get(
-                            "start_phrase") or inst.get("postscript_marker")):
-                    add_error("target_string/wrap_phrase/etc", "str")
-
-            elif iid == "keywords:forbidden_words":
-                if not is_valid_list_str(inst.get("forbidden_words")):
-                    add_error("forbidden_words", "list of str")
-
-            elif iid == "change_case:lowercase_word_frequency":
-                if not is_valid_relation(inst.get("lowercase_relation")):
-                    add_error("lowercase_relation", "valid relation")
-                if not is_valid_int(inst.get("lowercase_frequency")):
-                    add_error("lowercase_frequency", "int")
-
-            elif iid == "keywords:letter_frequency":
-                if not is_valid_str(inst.get("letter")):
-                    add_error("letter", "str")
-                if not is_valid_relation(inst.get("let_relation")):
-                    add_error("let_relation", "valid relation")
-                if not is_valid_int(inst.get("let_frequency")):
-                    add_error("let_frequency", "int")
-
-            elif iid == "change_case:capital_word_frequency":
-                if not is_valid_relation(inst.get("capital_relation")):
-                    add_error("capital_relation", "valid relation")
-                if not is_valid_int(inst.get("capital_frequency")):
-                    add_error("capital_frequency", "int")
-
-            elif iid == "detectable_format:multiple_sections":
-                if not is_valid_str(inst.get("section_splitter")):
-                    add_error("section_splitter", "str")
-                if not is_valid_relation(inst.get("relation")):
-                    add_error("relation", "valid relation")
-                if not is_valid_int(inst.get("num_sections")):
-                    add_error("num_sections", "int")
-
-            elif iid == "detectable_format:number_bullet_lists":
-                if not is_valid_relation(inst.get("relation")):
-                    add_error("relation", "valid relation")
-                if not is_valid_int(inst.get("num_bullets")):
-                    add_error("num_bullets", "int")
-
-            elif iid == "detectable_content:number_placeholders":
-                if not is_valid_relation(inst.get("relation")):
-                    add_error("relation", "valid relation")
-                if not is_valid_int(inst.get("num_placeholders")):
-                    add_error("num_placeholders", "int")
+        if mismatches:
+            key_issues.append({f"TURN {turn}": mismatches})
+        if errors:
+            type_issues.append({f"TURN {turn}": errors})
+    return key_issues, type_issues
 
-            else:
-                # for simple instructions with just instruction_id
-                if len(inst) > 1:
-                    errors.append(f"{iid}: should not contain incorrect/extra fields")
 
-        issues.append({f'TURN {turn}': errors}) if errors else ''
-        turn += 1
-    return issues
+def validate_keys_against_template(template_json, dict_turn_metadata):
+    return instruction_schema_issues(dict_turn_metadata, kwargs_schema_for(template_json))[0]
+
+
+def validate_instruction_kwargs_datatype(dict_turn_metadata):
+    return instruction_schema_issues(dict_turn_metadata)[1]
+
 
 def analyze_instruction_statuses_by_turn(data):
     results_per_turn, frontier_fail_rates = [], []